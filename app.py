@@ -1,7 +1,9 @@
 import streamlit as st
 import yaml
 import os
-from profiling.orchestrator import Orchestrator
+import time
+from profiling.jobs import BATCH_STAGES, JobRunner
+from profiling.storage import TablePager
 
 # Load config
 with open("config/config.yaml") as f:
@@ -16,19 +18,64 @@ csv_file = st.sidebar.file_uploader("Input CSV", type=["csv"])
 output_dir = "outputs"
 os.makedirs(output_dir, exist_ok=True)
 
-if st.sidebar.button("Run Profiling") and domd_file and csv_file:
-    domd_path = os.path.join(output_dir, "domd.json")
-    csv_path = os.path.join(output_dir, "input.csv")
 
-    with open(domd_path, "wb") as f:
-        f.write(domd_file.read())
-    with open(csv_path, "wb") as f:
-        f.write(csv_file.read())
+def show_paged(key, path, page_sizes=(50, 100, 500, 1000)):
+    """Render one page of an output file; only the visible slice and columns are read."""
+    with TablePager(path) as pager:
+        left, mid, right = st.columns([1, 1, 3])
+        page_size = left.selectbox("Rows per page", page_sizes, key=f"{key}_size")
+        pages = max(1, -(-pager.num_rows // page_size))
+        page = mid.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+        columns = right.multiselect("Columns", pager.columns, default=pager.columns, key=f"{key}_columns")
+        start = (page - 1) * page_size
+        st.caption(f"Rows {start + 1}-{min(start + page_size, pager.num_rows)} of {pager.num_rows}")
+        st.dataframe(pager.page(start, start + page_size, columns or None), width='stretch')
+
+
+def output_path(name):
+    parquet = f"{output_dir}/{name}.parquet"
+    return parquet if os.path.exists(parquet) else f"{output_dir}/{name}.csv"
+
 
-    orchestrator = Orchestrator(config)
-    orchestrator.run(domd_path, csv_path, output_dir)
-    st.success("Profiling complete!")
+@st.cache_resource
+def get_runner():
+    # One runner per server process, shared by every session.
+    jobs_cfg = config.get("jobs") or {}
+    return JobRunner(config, root=jobs_cfg.get("root", os.path.join(output_dir, "jobs")), workers=jobs_cfg.get("workers", 2))
 
+
+runner = get_runner()
+
+if st.sidebar.button("Run Profiling") and domd_file and csv_file:
+    # Identical uploads map to the same job, so a finished one is returned immediately.
+    st.session_state["job_id"] = runner.submit(domd_file, csv_file, name=csv_file.name)
+
+jobs = runner.jobs()
+if jobs:
+    ids = [job["job_id"] for job in jobs]
+    labels = {job["job_id"]: f"{job.get('name')} ({job['state']})" for job in jobs}
+    current = st.session_state.get("job_id")
+    st.session_state["job_id"] = st.sidebar.selectbox(
+        "Jobs", ids, index=ids.index(current) if current in ids else 0, format_func=labels.get)
+
+job_id = st.session_state.get("job_id")
+status = runner.status(job_id) if job_id else None
+
+if status and status["state"] in ("queued", "running"):
+    done = [stage for stage in BATCH_STAGES if stage in (status.get("stages") or {})]
+    detail = f"{status.get('rows_done', 0)} rows processed" if status.get("rows_done") else "working"
+    st.progress(len(done) / len(BATCH_STAGES), text=f"{status['state'].capitalize()}: {status.get('stage') or 'starting'} ({detail})")
+    if st.button("Cancel job"):
+        runner.cancel(job_id)
+    time.sleep(1)
+    st.rerun()
+elif status and status["state"] == "failed":
+    st.error(f"Job failed: {status.get('error')}")
+elif status and status["state"] == "cancelled":
+    st.warning("Job was cancelled; run the same files again to restart it.")
+
+if status and status["state"] == "done":
+    output_dir = runner.job_dir(job_id)
     import json
     import pandas as pd
 
@@ -39,6 +86,20 @@ if st.sidebar.button("Run Profiling") and domd_file and csv_file:
     st.subheader("Summary")
     st.markdown("- Data profiling and cleaning completed successfully.")
     st.markdown("- See below for detected anomalies, generated cleaning script, and output data tables.")
+    try:
+        with open(f"{output_dir}/run_summary.json") as f:
+            routing = json.load(f)
+        st.markdown(
+            f"- {routing['rows_in']} rows in: {routing['skipped_llm']} passed DOMD pre-validation, "
+            f"{routing['sent_to_llm']} sent to the LLM for cleaning."
+        )
+        if routing.get("llm_requests"):
+            st.markdown(
+                f"- {routing['llm_requests']} cleaning requests, ~{routing['prompt_tokens_estimated']} prompt tokens "
+                f"({routing['prompt_tokens_per_row']} per row)."
+            )
+    except Exception:
+        pass
 
     st.markdown("---")
 
@@ -48,8 +109,14 @@ if st.sidebar.button("Run Profiling") and domd_file and csv_file:
         with open(f"{output_dir}/anomalies.json") as f:
             anomalies = json.load(f)
         if isinstance(anomalies, dict) and "anomalies" in anomalies:
-            st.write(f"Total anomalies detected: {len(anomalies['anomalies'])}")
-            st.table(pd.DataFrame({"Row Index": anomalies["anomalies"]}))
+            records = anomalies["anomalies"]
+            st.write(f"Total anomalies detected: {len(records)}")
+            page_size = 100
+            pages = max(1, -(-len(records) // page_size))
+            page = st.number_input(f"Anomaly page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{job_id}_anomalies_page")
+            start = (page - 1) * page_size
+            st.dataframe(pd.DataFrame(records[start:start + page_size], index=range(start, min(start + page_size, len(records)))),
+                         width='stretch')
         else:
             st.json(anomalies)
     except Exception as e:
@@ -71,8 +138,7 @@ if st.sidebar.button("Run Profiling") and domd_file and csv_file:
     # Clean Data Table
     st.subheader("Clean Data Table")
     try:
-        clean_df = pd.read_csv(f"{output_dir}/clean_data.csv")
-        st.dataframe(clean_df, width='stretch')
+        show_paged(f"{job_id}_clean", output_path("clean_data"))
     except Exception as e:
         st.error(f"Could not load clean data: {e}")
 
@@ -81,8 +147,7 @@ if st.sidebar.button("Run Profiling") and domd_file and csv_file:
     # Unclean Data Table
     st.subheader("Unclean Data Table (Anomalies)")
     try:
-        unclean_df = pd.read_csv(f"{output_dir}/unclean_data.csv")
-        st.dataframe(unclean_df, width='stretch')
+        show_paged(f"{job_id}_unclean", output_path("unclean_data"))
     except Exception as e:
         st.error(f"Could not load unclean data: {e}")
 
@@ -0,0 +1,143 @@
+"""Time the vectorized ConstraintPlan against the per-value enforcement it replaced.
+
+    python -m benchmarks.constraints --domd outputs/domd.json --csv outputs/input.csv --rows 150000
+
+With ``--csv`` the file's rows are repeated up to ``--rows``; otherwise
+synthetic rows are generated from the DOMD.
+"""
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import pandas as pd
+from profiling.constraints import ConstraintPlan
+from profiling.utils import load_json
+from .synthetic import synthetic_frame
+
+
+def legacy_enforce(df, domd):
+    """``ScriptGenerator._enforce_domd_constraints_generic`` as it was before the ConstraintPlan (the oracle)."""
+    moved = pd.DataFrame()
+    keep_mask = pd.Series([True] * len(df), index=df.index)
+    def handle_date(col, s):
+        fmt = "%Y%m%d" if "yyyy-mm-dd" not in col.get("constraints", "").lower() else "%Y-%m-%d"
+        def norm(v):
+            if pd.isnull(v): return None
+            v = str(v)
+            for f in ["%Y%m%d","%Y-%m-%d","%d%m%Y","%d/%m/%Y","%m/%d/%Y","%Y/%m/%d","%Y.%m.%d","%d.%m.%Y"]:
+                try: return datetime.strptime(v, f).strftime(fmt)
+                except: pass
+            d = re.sub(r"[^0-9]", "", v)
+            return d.zfill(8) if len(d)<=8 and fmt=="%Y%m%d" else (d[:8] if len(d)>8 and fmt=="%Y%m%d" else None)
+        normed = s.apply(norm)
+        def is_valid(v):
+            if pd.isnull(v): return False
+            vstr = str(v)
+            if not re.fullmatch(r"\d{8}", vstr): return False
+            try:
+                return datetime.strptime(vstr, fmt).date() <= datetime.now().date()
+            except Exception:
+                return False
+        valid = normed.apply(is_valid)
+        return normed, valid
+    def handle_currency(col, s):
+        canon = (col.get("allowed",[None])[0] or col.get("sample") or "GBP").upper()
+        normed = s.apply(lambda v: canon)
+        return normed, normed.notnull()
+    def handle_pad(col, s):
+        l, t, c = col.get("length"), col.get("type","string"), col.get("constraints","")
+        if not (l and isinstance(l,int)): return s, pd.Series([True]*len(s), index=s.index)
+        def pad(v):
+            if pd.isnull(v): return None
+            v = str(v)
+            if t in ["string","integer"]:
+                if "leading zero" in c.lower() or "pad" in c.lower(): v = v.zfill(l)
+                if len(v)>l: v = v[-l:]
+                if len(v)<l: v = v.zfill(l)
+                return v
+            return v
+        normed = s.apply(pad)
+        return normed, normed.notnull()
+    def handle_type(col, s):
+        t = col.get("type","string")
+        if t=="integer":
+            normed = s.apply(lambda v: int(v) if not pd.isnull(v) and str(v).isdigit() else None)
+            return normed, normed.notnull()
+        if t=="float":
+            normed = s.apply(lambda v: float(v) if not pd.isnull(v) and re.match(r"^-?\d+(\.\d+)?$",str(v)) else None)
+            return normed, normed.notnull()
+        return s, pd.Series([True]*len(s), index=s.index)
+    def handle_allowed(col, s):
+        a = col.get("allowed",None)
+        if not a: return s, pd.Series([True]*len(s), index=s.index)
+        normed = s.where(s.isin(a), None)
+        return normed, normed.notnull()
+    handlers = [
+        (lambda c: c.get("type") == "date" or ("yyyy" in c.get("constraints","")), handle_date),
+        (lambda c: c.get("type") == "string" and ("currency" in c.get("constraints","") or (c.get("allowed") and all(isinstance(a,str) and len(a)==3 for a in c.get("allowed"))) or (c.get("sample") and isinstance(c.get("sample"),str) and len(c.get("sample"))==3)), handle_currency),
+        (lambda c: c.get("length") is not None and isinstance(c.get("length"),int), handle_pad),
+        (lambda c: c.get("type") in ["integer","float"], handle_type),
+        (lambda c: c.get("allowed") is not None, handle_allowed)
+    ]
+    for col in domd["columns"]:
+        name = col["name"]
+        required = col.get("required", False)
+        nullable = col.get("nullable", True)
+        s = df[name] if name in df.columns else pd.Series([None]*len(df))
+        col_mask = pd.Series([True]*len(s), index=s.index)
+        for pred, h in handlers:
+            if pred(col):
+                s, valid = h(col, s)
+                col_mask &= valid
+        df[name] = s
+        if required and not nullable:
+            col_mask &= df[name].notnull()
+        keep_mask &= col_mask
+    moved = df[~keep_mask]
+    df = df[keep_mask]
+    return df.reset_index(drop=True), moved.reset_index(drop=True) if not moved.empty else pd.DataFrame()
+
+
+def bench_constraints(domd, df, repeat=1):
+    """Best-of-``repeat`` seconds of both implementations on copies of ``df``; outputs must match."""
+    timings = {}
+    for name, enforce in (("legacy", legacy_enforce), ("plan", lambda frame, d: ConstraintPlan(d).apply(frame))):
+        best = None
+        for _ in range(repeat):
+            frame = df.copy()
+            start = time.perf_counter()
+            kept, moved = enforce(frame, domd)
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        timings[name] = {"seconds": best, "kept": len(kept), "moved": len(moved)}
+    if (timings["legacy"]["kept"], timings["legacy"]["moved"]) != (timings["plan"]["kept"], timings["plan"]["moved"]):
+        raise AssertionError(f"ConstraintPlan disagrees with the legacy enforcement: {timings}")
+    timings["speedup"] = timings["legacy"]["seconds"] / timings["plan"]["seconds"]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--domd", default="outputs/domd.json")
+    parser.add_argument("--csv", help="Repeat this file's rows instead of generating synthetic ones")
+    parser.add_argument("--rows", type=int, default=150_000)
+    parser.add_argument("--violation-rate", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    domd = load_json(args.domd)
+    if args.csv:
+        source = pd.read_csv(args.csv, dtype=str)
+        df = pd.concat([source] * -(-args.rows // len(source)), ignore_index=True).head(args.rows).astype(object)
+    else:
+        df = synthetic_frame(domd, args.rows, args.violation_rate)
+    report = {"rows": len(df), "source": args.csv or "synthetic", "cpus": os.cpu_count(),
+              **bench_constraints(domd, df, args.repeat)}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
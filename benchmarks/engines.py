@@ -0,0 +1,68 @@
+"""Compare ExecutionEngine backends on one synthetic dataset.
+
+    python -m benchmarks.engines --domd outputs/domd.json --rows 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from profiling.executor import ENGINES
+from profiling.utils import load_json
+from .synthetic import write_synthetic_csv
+
+
+def bench_engines(domd, csv_path, backends, workers=0, partition_rows=250_000):
+    """Time load/enforce/save per backend; raises if any backend keeps or moves
+    a different number of rows than the pandas engine."""
+    results = {}
+    for name in backends:
+        engine = ENGINES[name](workers=workers, partition_rows=partition_rows)
+        timings = {}
+        start = time.perf_counter()
+        df = engine.load_csv(csv_path)
+        timings["load_s"] = time.perf_counter() - start
+        start = time.perf_counter()
+        kept, moved = engine.enforce_constraints(df, domd)
+        timings["enforce_s"] = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            engine.save_csv(kept, os.path.join(tmp, "clean_data.csv"))
+            timings["save_s"] = time.perf_counter() - start
+        timings["total_s"] = sum(timings.values())
+        timings.update({"rows": len(df), "kept": len(kept), "moved": len(moved),
+                        "rows_per_s": len(df) / timings["total_s"] if timings["total_s"] else None})
+        results[name] = timings
+    baseline = results.get("pandas")
+    if baseline is not None:
+        for name, timings in results.items():
+            if (timings["kept"], timings["moved"]) != (baseline["kept"], baseline["moved"]):
+                raise AssertionError(f"Engine '{name}' kept/moved {timings['kept']}/{timings['moved']} rows, "
+                                     f"pandas kept/moved {baseline['kept']}/{baseline['moved']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--domd", default="outputs/domd.json")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--violation-rate", type=float, default=0.05)
+    parser.add_argument("--backends", nargs="+", default=sorted(ENGINES))
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--partition-rows", type=int, default=250_000)
+    parser.add_argument("--output", help="Write the results JSON here as well")
+    args = parser.parse_args()
+
+    domd = load_json(args.domd)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = write_synthetic_csv(domd, os.path.join(tmp, "input.csv"), args.rows, args.violation_rate)
+        results = bench_engines(domd, csv_path, args.backends, args.workers, args.partition_rows)
+    report = {"rows": args.rows, "violation_rate": args.violation_rate, "cpus": os.cpu_count(), "engines": results}
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Offline end-to-end pipeline benchmark on DOMD-driven synthetic data.
+
+    python -m benchmarks.pipeline --domd outputs/domd.json --rows 10000 100000 1000000
+    python -m benchmarks.pipeline --rows 100000 --compare benchmarks/results/<earlier>.json
+
+Every LLM call goes to FakeLLMClient, so no API key is needed. Results are
+written as JSON (one file per run) for comparison between versions.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional
+from profiling.anomaly import AnomalyDetector
+from profiling.cleaning import ScriptGenerator
+from profiling.llm import FakeLLMClient
+from profiling.profiler import DataProfiler
+from profiling.utils import load_json
+from .synthetic import write_synthetic_csv
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+STAGES = ["load_csv", "profiler", "anomaly_detector", "detect_anomalies", "clean_data", "enforce_constraints"]
+
+
+def _rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS; it only ever grows.
+        scale = 1024 * 1024 if platform.system() == "Darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return None
+
+
+class RSSMonitor:
+    """Samples resident memory on a background thread; ``peak_mb`` is the stage peak."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak_mb: Optional[float] = None
+        self._stop = threading.Event()
+
+    def _sample(self) -> None:
+        rss = _rss_mb()
+        if rss is not None:
+            self.peak_mb = rss if self.peak_mb is None else max(self.peak_mb, rss)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "RSSMonitor":
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def _measure(fn: Callable[[], Any], rows: int, client: FakeLLMClient) -> Dict[str, Any]:
+    calls, prompt, completion = client.calls, client.prompt_tokens, client.completion_tokens
+    with RSSMonitor() as rss:
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+    llm_calls = client.calls - calls
+    return {
+        "seconds": seconds,
+        "rows": rows,
+        "rows_per_s": rows / seconds if seconds else None,
+        "peak_rss_mb": rss.peak_mb,
+        "llm_calls": llm_calls,
+        "prompt_tokens": client.prompt_tokens - prompt,
+        "completion_tokens": client.completion_tokens - completion,
+        "seconds_per_llm_call": seconds / llm_calls if llm_calls else None,
+    }
+
+
+def bench_pipeline(domd: Dict[str, Any], csv_path: str, client: FakeLLMClient, stages: List[str],
+                   llm_rows: int = 100_000, concurrency: int = 4, batch_size: int = 5,
+                   chunk_tokens: int = 8000, prompt_format: str = "json",
+                   batch_tokens: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Time each stage once on the same data. LLM stages see at most ``llm_rows`` rows."""
+    generator = ScriptGenerator(client=client, concurrency=concurrency, prompt_format=prompt_format,
+                                batch_tokens=batch_tokens)
+    results: Dict[str, Dict[str, Any]] = {}
+    frames: Dict[str, pd.DataFrame] = {}
+
+    def load():
+        frames["df"] = pd.read_csv(csv_path, dtype=str)
+    results["load_csv"] = _measure(load, 0, client)
+    df = frames.pop("df")
+    results["load_csv"]["rows"] = len(df)
+    results["load_csv"]["rows_per_s"] = len(df) / results["load_csv"]["seconds"]
+    llm_df = df.iloc[:llm_rows]
+
+    runners = {
+        "profiler": (lambda: DataProfiler(domd).update(df).result(), len(df)),
+        "anomaly_detector": (lambda: AnomalyDetector(random_state=0).detect_records(df, domd), len(df)),
+        # One whole-input prompt is what detect_anomalies does; chunked is its scalable form.
+        "detect_anomalies": (lambda: generator.detect_anomalies_chunked(llm_df, domd, max_tokens=chunk_tokens), len(llm_df)),
+        "clean_data": (lambda: generator.clean_data(llm_df, domd, batch_size=batch_size, prevalidate=True), len(llm_df)),
+        "enforce_constraints": (lambda: generator._enforce_domd_constraints_generic(df.copy(), domd), len(df)),
+    }
+    for stage in stages:
+        if stage in runners:
+            fn, rows = runners[stage]
+            results[stage] = _measure(fn, rows, client)
+            if stage == "clean_data":
+                results[stage]["routing"] = dict(generator.routing_stats)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Per-stage seconds ratio (current / baseline) for row counts present in both."""
+    lines = []
+    for rows, stages in report["runs"].items():
+        base = baseline.get("runs", {}).get(rows, {})
+        for stage, result in stages.items():
+            if stage in base and base[stage]["seconds"]:
+                ratio = result["seconds"] / base[stage]["seconds"]
+                lines.append(f"{rows:>10} rows  {stage:<20} {result['seconds']:9.3f}s  x{ratio:5.2f} vs baseline")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--domd", default="outputs/domd.json")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--violation-rate", type=float, default=0.05)
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--llm-rows", type=int, default=100_000, help="Cap on rows fed to the LLM stages")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM seconds per call")
+    parser.add_argument("--latency-per-1k-tokens", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--prompt-format", choices=["json", "compact"], default="json")
+    parser.add_argument("--batch-tokens", type=int, help="Token budget per clean_data request (overrides --batch-size)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", default="benchmarks/results")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    domd = load_json(args.domd)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "cpus": os.cpu_count(),
+        "args": vars(args),
+        "runs": {},
+    }
+    for rows in args.rows:
+        client = FakeLLMClient(latency=args.latency, latency_per_1k_tokens=args.latency_per_1k_tokens, seed=args.seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = write_synthetic_csv(domd, os.path.join(tmp, "input.csv"), rows, args.violation_rate, args.seed)
+            report["runs"][str(rows)] = bench_pipeline(
+                domd, csv_path, client, ["load_csv"] + [s for s in args.stages if s != "load_csv"],
+                llm_rows=args.llm_rows, concurrency=args.concurrency, batch_size=args.batch_size,
+                prompt_format=args.prompt_format, batch_tokens=args.batch_tokens,
+            )
+        for stage, result in report["runs"][str(rows)].items():
+            print(f"{rows:>10} rows  {stage:<20} {result['seconds']:9.3f}s  {result['rows_per_s'] or 0:12.0f} rows/s  "
+                  f"peak RSS {result['peak_rss_mb'] or 0:8.1f} MB  {result['llm_calls']} LLM calls")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"pipeline_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+    if args.compare:
+        print("\n".join(compare(report, load_json(args.compare))))
+
+
+if __name__ == "__main__":
+    main()
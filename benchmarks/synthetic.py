@@ -0,0 +1,90 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+from profiling.constraints import currency_code, is_currency_column
+
+VIOLATIONS = ["bad_date", "short_code", "wrong_currency", "null", "not_numeric"]
+
+
+def _scale(length: Any):
+    m = re.fullmatch(r"\s*(\d+)\s*,\s*(\d+)\s*", str(length))
+    return (int(m.group(1)), int(m.group(2))) if m else (7, 2)
+
+
+def _valid_column(col: Dict[str, Any], n: int, rng: np.random.Generator) -> np.ndarray:
+    t, length = col.get("type", "string"), col.get("length")
+    if col.get("allowed"):
+        return rng.choice(np.asarray([str(a) for a in col["allowed"]], dtype=object), n)
+    if t == "date":
+        fmt = "%Y-%m-%d" if "yyyy-mm-dd" in col.get("constraints", "").lower() else "%Y%m%d"
+        days = pd.to_timedelta(rng.integers(1, 730, n), unit="D")
+        return (pd.Timestamp(date.today()) - days).strftime(fmt).to_numpy(dtype=object)
+    if t == "integer":
+        digits = min(length, 6) if isinstance(length, int) else 4
+        return rng.integers(0, 10 ** digits, n).astype(str).astype(object)
+    if t == "float":
+        precision, scale = _scale(length)
+        whole = rng.integers(0, 10 ** max(precision - scale, 1), n)
+        frac = rng.integers(0, 10 ** scale, n) if scale else np.zeros(n, dtype=int)
+        text = whole.astype(str).astype(object)
+        return text + "." + pd.Series(frac.astype(str)).str.zfill(scale).to_numpy(dtype=object) if scale else text
+    if is_currency_column(col) and currency_code(col).isalpha():
+        return np.full(n, currency_code(col), dtype=object)
+    if isinstance(length, int) and length > 0:
+        digits = rng.integers(0, 10, (n, length)).astype(np.uint8) + ord("0")
+        return digits.view(f"S{length}").ravel().astype(str).astype(object)
+    return np.full(n, str(col.get("sample", "x")), dtype=object)
+
+
+def _violate(col: Dict[str, Any], values: np.ndarray, rows: np.ndarray, rng: np.random.Generator) -> None:
+    t = col.get("type", "string")
+    kinds = ["null"]
+    if t == "date":
+        kinds.append("bad_date")
+    if t in ("integer", "float"):
+        kinds.append("not_numeric")
+    if is_currency_column(col) and currency_code(col).isalpha():
+        kinds.append("wrong_currency")
+    elif t == "string" and isinstance(col.get("length"), int):
+        kinds.append("short_code")
+    picks = rng.choice(kinds, len(rows))
+    for kind in set(picks):
+        target = rows[picks == kind]
+        if kind == "null":
+            values[target] = None
+        elif kind == "bad_date":
+            values[target] = rng.choice(np.asarray(["2025-13-45", "02/07/2025", "2025030", "20991231", "ERR"], dtype=object), len(target))
+        elif kind == "not_numeric":
+            values[target] = rng.choice(np.asarray(["ERR", "'13'", "NA?", "1,5"], dtype=object), len(target))
+        elif kind == "wrong_currency":
+            values[target] = rng.choice(np.asarray(["USD", "gbp", "EURO", "£"], dtype=object), len(target))
+        elif kind == "short_code":
+            values[target] = pd.Series(values[target], dtype=object).str.lstrip("0").str[:-1].to_numpy(dtype=object)
+
+
+def synthetic_frame(domd: Dict[str, Any], rows: int, violation_rate: float = 0.05, seed: Optional[int] = 0) -> pd.DataFrame:
+    """Rows that satisfy every DOMD rule, except a ``violation_rate`` fraction of
+    rows that each get one injected violation in a random column."""
+    rng = np.random.default_rng(seed)
+    columns = domd["columns"]
+    data = {col["name"]: _valid_column(col, rows, rng) for col in columns}
+    bad = np.flatnonzero(rng.random(rows) < violation_rate)
+    target_col = rng.integers(0, len(columns), len(bad))
+    for i, col in enumerate(columns):
+        _violate(col, data[col["name"]], bad[target_col == i], rng)
+    return pd.DataFrame(data)
+
+
+def write_synthetic_csv(domd: Dict[str, Any], path: str, rows: int, violation_rate: float = 0.05,
+                        seed: int = 0, chunk_rows: int = 500_000) -> str:
+    """Write ``rows`` synthetic rows in bounded-memory chunks (10M rows is fine)."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        for i, start in enumerate(range(0, rows, chunk_rows)):
+            df = synthetic_frame(domd, min(chunk_rows, rows - start), violation_rate, seed + i)
+            df.to_csv(f, index=False, header=i == 0)
+    return path
@@ -1,29 +1,110 @@
+import os
+import joblib
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from .utils import domd_hash
+from .validation import compile_validator
 
 class AnomalyDetector:
-    """ML-based anomaly detection using Isolation Forest."""
-
-    def detect(self, df: pd.DataFrame) -> List[int]:
-        anomalies = set()
-        # Rule-based: missing values
-        for idx, row in df.iterrows():
-            if pd.isnull(row.get('id')) or pd.isnull(row.get('name')):
-                anomalies.add(idx)
-            if pd.isnull(row.get('age')) or (isinstance(row.get('age'), (int, float)) and row.get('age') < 0):
-                anomalies.add(idx)
-            email = str(row.get('email'))
-            if not email or '@' not in email or '.' not in email.split('@')[-1]:
-                anomalies.add(idx)
-        # ML-based: IsolationForest
-        numeric_df = df.select_dtypes(include="number").dropna()
-        if not numeric_df.empty and len(numeric_df) >= 2:
-            try:
-                clf = IsolationForest(random_state=42)
-                preds = clf.fit_predict(numeric_df)
-                ml_anomalies = numeric_df.index[preds == -1].tolist()
-                anomalies.update(ml_anomalies)
-            except Exception:
-                pass
-        return sorted(list(anomalies))
\ No newline at end of file
+    """DOMD-driven rule checks plus ML-based anomaly detection using Isolation Forest.
+
+    Rule checks are vectorized masks compiled from the DOMD column definitions.
+    The forest is fitted on a bounded random subsample, scored in chunks with
+    ``n_jobs`` workers, and can be persisted per DOMD under ``model_dir``.
+    """
+
+    def __init__(self, domd: Optional[Dict[str, Any]] = None, model_dir: Optional[str] = None,
+                 max_fit_rows: int = 100_000, score_chunk_rows: int = 200_000, n_jobs: int = -1,
+                 random_state: int = 42):
+        self.domd = domd
+        self.model_dir = model_dir
+        self.max_fit_rows = max_fit_rows
+        self.score_chunk_rows = score_chunk_rows
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self._models: Dict[str, Dict[str, Any]] = {}
+
+    def _numeric_frame(self, df: pd.DataFrame, domd: Optional[Dict[str, Any]]) -> pd.DataFrame:
+        if domd:
+            cols = [c["name"] for c in domd["columns"] if c.get("type") in ("integer", "float") and c["name"] in df.columns]
+            return df[cols].apply(pd.to_numeric, errors="coerce")
+        return df.select_dtypes(include="number")
+
+    def _model_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.model_dir, f"isolation_forest_{key}.joblib") if self.model_dir else None
+
+    def fit(self, df: pd.DataFrame, domd: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Fit the forest on at most ``max_fit_rows`` complete numeric rows and persist it."""
+        domd = domd or self.domd
+        numeric_df = self._numeric_frame(df, domd).dropna()
+        if numeric_df.empty or len(numeric_df) < 2 or numeric_df.shape[1] == 0:
+            return None
+        if len(numeric_df) > self.max_fit_rows:
+            numeric_df = numeric_df.sample(n=self.max_fit_rows, random_state=self.random_state)
+        clf = IsolationForest(random_state=self.random_state, n_jobs=self.n_jobs)
+        clf.fit(numeric_df.to_numpy())
+        model = {"columns": list(numeric_df.columns), "forest": clf}
+        key = domd_hash(domd) if domd else "schemaless"
+        self._models[key] = model
+        path = self._model_path(key)
+        if path:
+            os.makedirs(self.model_dir, exist_ok=True)
+            joblib.dump(model, path)
+        return model
+
+    def load(self, domd: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Return the fitted model for this DOMD from memory or ``model_dir``, if any."""
+        domd = domd or self.domd
+        key = domd_hash(domd) if domd else "schemaless"
+        if key not in self._models:
+            path = self._model_path(key)
+            if not (path and os.path.exists(path)):
+                return None
+            self._models[key] = joblib.load(path)
+        return self._models[key]
+
+    def _outliers(self, df: pd.DataFrame, domd: Optional[Dict[str, Any]]) -> np.ndarray:
+        model = self.load(domd) or self.fit(df, domd)
+        flags = np.zeros(len(df), dtype=bool)
+        if model is None:
+            return flags
+        numeric_df = self._numeric_frame(df, domd).reindex(columns=model["columns"])
+        complete = numeric_df.notnull().all(axis=1).to_numpy()
+        values = numeric_df.to_numpy()
+        for start in range(0, len(df), self.score_chunk_rows):
+            stop = start + self.score_chunk_rows
+            rows = np.flatnonzero(complete[start:stop]) + start
+            if len(rows):
+                flags[rows] = model["forest"].predict(values[rows]) == -1
+        return flags
+
+    def detect_records(self, df: pd.DataFrame, domd: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Anomaly objects in the ``anomalies.json`` shape; 'row' is the 0-based position."""
+        domd = domd or self.domd
+        anomalies = []
+        if domd:
+            for column, anomaly_type, failed in compile_validator(domd).failures(df):
+                rows = np.flatnonzero(failed)
+                if column not in df.columns:
+                    anomalies.extend({"row": int(row), "column": column, "anomaly_type": anomaly_type,
+                                      "details": "Required column is missing"} for row in rows)
+                    continue
+                anomalies.extend(
+                    {"row": int(row), "column": column, "anomaly_type": anomaly_type,
+                     "details": f"Value {value!r} violates DOMD {anomaly_type} constraint"}
+                    for row, value in zip(rows.tolist(), df[column].to_numpy()[rows])
+                )
+        try:
+            outliers = np.flatnonzero(self._outliers(df, domd))
+        except Exception as e:
+            print(f"IsolationForest anomaly detection failed: {e}")
+            outliers = []
+        for row in outliers:
+            anomalies.append({"row": int(row), "column": None, "anomaly_type": "outlier", "details": "IsolationForest outlier"})
+        return sorted(anomalies, key=lambda a: a["row"])
+
+    def detect(self, df: pd.DataFrame, domd: Optional[Dict[str, Any]] = None) -> List[int]:
+        positions = {a["row"] for a in self.detect_records(df, domd)}
+        return [df.index[p] for p in sorted(positions)]
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+def cache_key(model: str, messages: List[Dict[str, str]]) -> str:
+    """Content address of a chat request: model plus the exact system prompt,
+    DOMD and payload carried in ``messages``."""
+    blob = json.dumps({"model": model, "messages": messages}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Persistent SQLite store of LLM responses with TTL and LRU size eviction.
+
+    ``bypass`` skips lookups (every call is a miss) but still refreshes entries.
+    """
+
+    def __init__(self, path: str, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, bypass: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.bypass = bypass
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, value TEXT, size INTEGER, created REAL, accessed REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if self.bypass:
+                self.stats["misses"] += 1
+                return None
+            row = self._db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._delete([key])
+                self._db.commit()
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.stats["hits"] += 1
+            return row[0]
+
+    def put(self, key: str, model: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            # The insert opens the write transaction, so the totals ``_evict`` reads
+            # include writes from every other connection to the same file.
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, value, size, now, now),
+            )
+            self.stats["writes"] += 1
+            self._evict(now)
+            self._db.commit()
+
+    def _delete(self, keys: List[str]) -> None:
+        self._db.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k in keys])
+        self.stats["evictions"] += len(keys)
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_seconds is not None:
+            expired = self._db.execute(
+                "SELECT key FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+            ).fetchall()
+            if expired:
+                self._delete([k for k, in expired])
+        if self.max_entries is None and self.max_bytes is None:
+            return
+        while True:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            if not ((self.max_entries is not None and count > self.max_entries) or
+                    (self.max_bytes is not None and total > self.max_bytes)):
+                break
+            # Drop least recently used entries in small chunks until under both limits.
+            oldest = self._db.execute(
+                "SELECT key FROM responses ORDER BY accessed LIMIT ?", (max(1, count // 20),)
+            ).fetchall()
+            if not oldest:
+                break
+            self._delete([k for k, in oldest])
+
+    def snapshot(self) -> Dict[str, int]:
+        """Copy of ``stats`` (hits, misses, writes, evictions) since this cache was opened."""
+        with self._lock:
+            return dict(self.stats)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
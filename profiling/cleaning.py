@@ -4,213 +4,372 @@ import pandas as pd
 import requests
 from mistralai import Mistral
 from dotenv import load_dotenv
+from .constraints import compile_constraints
+from .metrics import NULL_METRICS
+from .llm import LLMExecutor, LLMResponseError, RateLimiter, chunk_by_tokens, estimate_tokens, row_token_sizes
+from .prompts import compact_clean_messages, csv_row_token_sizes, encode_rows, failing_columns, parse_compact_response
+from .scripts import ROW_ID
+from .validation import compile_validator
 
 load_dotenv()
 
+# Joins the row identifiers of one LLM batch in a ``tag`` column.
+TAG_SEP = "\x1e"
+
 class ScriptGenerator:
-    def __init__(self):
+    def __init__(self, client=None, concurrency=1, requests_per_minute=None, tokens_per_minute=None, max_retries=3, cache=None, engine=None, metrics=None, cancel=None,
+                 prompt_format="json", batch_tokens=None, max_batch_rows=None):
         self.mistral_api_key = os.getenv("MISTRAL_API_KEY")
         self.mistral_model = "mistral-small-latest"
         self.mistral_small_model = "mistral-small-latest"
         self.codestral_model = "codestral-latest"
-        self.mistral_client = Mistral(api_key=self.mistral_api_key)
+        self.mistral_client = client if client is not None else Mistral(api_key=self.mistral_api_key)
+        self.metrics = metrics or NULL_METRICS
+        # concurrency > 1 switches clean_data to the pooled, retrying batch mode.
+        self.executor = LLMExecutor(
+            self.mistral_client,
+            concurrency=concurrency,
+            rate_limiter=RateLimiter(requests_per_minute, tokens_per_minute),
+            max_retries=max_retries,
+            cache=cache,
+            metrics=self.metrics,
+            cancel=cancel,
+        )
+        # Backend that runs the post-processing constraint enforcement.
+        self.engine = engine
+        self.routing_stats = {}
+        self.anomaly_failures = []
+        # compact: CSV rows plus the DOMD rules of failing columns; json: full DOMD and JSON records.
+        self.prompt_format = prompt_format
+        # Token budget per clean_data request (an int, or per model with a "default"); replaces batch_size.
+        self.batch_tokens = batch_tokens
+        self.max_batch_rows = max_batch_rows
+        self._request_tokens = []
 
 
-    def detect_anomalies(self, df, domd):
+    def _anomaly_messages(self, df, domd):
         input_text = (
             f"DOMD: {json.dumps(domd)}\n"
             f"Input Data Sample: {df.to_json(orient='records')}\n"
-            "Task: Analyze the input data and DOMD. Detect and list all anomalies, strictly enforcing every constraint in the DOMD for every row and column. Output MUST be a JSON object with a single key 'anomalies' containing a list of anomaly objects. Each anomaly object MUST contain 'row', 'column', 'anomaly_type', and 'details'. Do not include any markdown formatting or explanation."
+            "Task: Analyze the input data and DOMD. Detect and list all anomalies, strictly enforcing every constraint in the DOMD for every row and column. Output MUST be a JSON object with a single key 'anomalies' containing a list of anomaly objects. Each anomaly object MUST contain 'row', 'column', 'anomaly_type', and 'details', where 'row' is the 0-based position of the record in the Input Data Sample. Do not include any markdown formatting or explanation."
         )
-        messages = [
+        return [
             {"role": "system", "content": "You are a data profiling and anomaly detection expert. You must strictly enforce every constraint in the DOMD for every row and column. Output only valid JSON as specified, with no extra text."},
             {"role": "user", "content": input_text}
         ]
+
+    def _parse_anomaly_response(self, result):
+        import re
+        if not result:
+            raise LLMResponseError("Mistral returned empty response for anomaly detection.")
+        # Remove code block markers if present
+        code_match = re.search(r"```(?:json|JSON)?\n?(.*)```", result, re.DOTALL)
+        json_str = code_match.group(1).strip() if code_match else result.strip()
+        # Fix invalid escape sequences (e.g., \/ -> /)
+        json_str = json_str.replace(r'\/', '/')
+        # Remove any stray backslashes before quotes
+        json_str = re.sub(r'\\(["\'])', r'\1', json_str)
+        # Remove any invalid control characters
+        json_str = re.sub(r'[\x00-\x1F]+', '', json_str)
         try:
-            chat_response = self.mistral_client.chat.complete(
-                model=self.mistral_small_model,
-                messages=messages
-            )
-            result = chat_response.choices[0].message.content
+            anomalies_obj = json.loads(json_str)
+        except Exception as e:
+            raise LLMResponseError(f"Failed to decode JSON from Mistral output for anomaly detection. Output: {json_str} Error: {e}")
+        anomalies = anomalies_obj.get("anomalies", []) if isinstance(anomalies_obj, dict) else None
+        if not isinstance(anomalies, list):
+            raise LLMResponseError(f"Mistral output for anomalies was not a list. Output: {result}")
+        return anomalies
+
+    def detect_anomalies(self, df, domd):
+        messages = self._anomaly_messages(df, domd)
+        try:
+            return self.executor.complete(self.mistral_small_model, messages, parse=self._parse_anomaly_response)
+        except LLMResponseError as e:
+            print(e)
         except Exception as e:
             print(f"Mistral SDK call failed for anomaly detection: {e}")
+        return []
+
+    def detect_anomalies_from_profile(self, profile, domd):
+        """Column-level anomaly detection from DataProfiler statistics instead of raw rows."""
+        input_text = (
+            f"DOMD: {json.dumps(domd)}\n"
+            f"Column Profile: {json.dumps(profile, default=str)}\n"
+            "Task: The column profile summarizes the whole input (row and missing counts, approximate distinct counts, numeric moments and quantiles, most frequent values, min/max string length). Using only these statistics, list every anomaly where a column violates or is likely to violate a DOMD constraint. Output MUST be a JSON object with a single key 'anomalies' containing a list of anomaly objects. Each anomaly object MUST contain 'row' (null, since no individual rows are given), 'column', 'anomaly_type', and 'details'. Do not include any markdown formatting or explanation."
+        )
+        messages = [
+            {"role": "system", "content": "You are a data profiling and anomaly detection expert. You must strictly enforce every constraint in the DOMD for every column. Output only valid JSON as specified, with no extra text."},
+            {"role": "user", "content": input_text}
+        ]
+        try:
+            return self.executor.retry(lambda: self.executor.complete(self.mistral_small_model, messages, parse=self._parse_anomaly_response))
+        except Exception as e:
+            print(f"Profile-based anomaly detection failed: {e}")
             return []
+
+    def detect_anomalies_chunked(self, df, domd, max_tokens=8000):
+        """Map-reduce anomaly detection over token-budgeted row chunks.
+
+        Chunks run on the executor pool with retries; each chunk's 'row' values
+        are shifted back to global positions and the merged list is deduplicated.
+        Chunks that still fail are recorded in ``self.anomaly_failures``.
+        """
+        overhead = estimate_tokens(self._anomaly_messages(df.iloc[:0], domd))
+        bounds = chunk_by_tokens(row_token_sizes(df), max_tokens - overhead)
+
+        def run(bound):
+            start, end = bound
+            messages = self._anomaly_messages(df.iloc[start:end], domd)
+            try:
+                return self.executor.retry(lambda: self.executor.complete(self.mistral_small_model, messages, parse=self._parse_anomaly_response)), None
+            except Exception as e:
+                return [], str(e)
+
+        anomalies, seen = [], set()
+        self.anomaly_failures = []
+        for i, ((start, end), (chunk_anomalies, error)) in enumerate(zip(bounds, self.executor.map(run, bounds))):
+            if error is not None:
+                print(f"Anomaly detection failed for rows {start}-{end - 1}: {error}")
+                self.metrics.incr("anomaly_chunk_failures")
+                self.anomaly_failures.append({"chunk": i, "start_row": start, "end_row": end, "error": error})
+                continue
+            for anomaly in chunk_anomalies:
+                if not isinstance(anomaly, dict):
+                    continue
+                anomaly = dict(anomaly)
+                try:
+                    anomaly["row"] = int(anomaly.get("row")) + start
+                except (TypeError, ValueError):
+                    pass
+                key = json.dumps(anomaly, sort_keys=True, default=str)
+                if key not in seen:
+                    seen.add(key)
+                    anomalies.append(anomaly)
+        return anomalies
+
+    def _clean_messages(self, batch_df, domd):
+        input_data_str = batch_df.to_json(orient="records")
+        input_text = (
+            f"DOMD: {json.dumps(domd)}\n"
+            f"Input Data Sample: {input_data_str}\n"
+            "Task: Clean the input data strictly according to the DOMD. For every field, strictly enforce all constraints in the DOMD, including length, padding, type, allowed values, and required/nullable status. If a field requires padding (e.g., leading zeros), pad to the required length as specified in the DOMD. If a field is required and cannot be fixed, move the row to uncleaned. Do not hardcode any field-specific logic; follow only the DOMD. Your response MUST be a JSON object with two keys: 'cleaned' and 'uncleaned'. Each key should contain a list of data records (as JSON objects). No row or column in 'cleaned' may violate any DOMD constraint. Do not include any markdown formatting or explanation."
+        )
+        return [
+            {"role": "system", "content": "You are a data cleaning expert. You must strictly enforce every constraint in the DOMD for every row and column. For every field, follow the DOMD exactly: enforce length, padding, type, allowed values, and required/nullable status. If a field requires padding (e.g., leading zeros), pad to the required length as specified in the DOMD. Do not hardcode any field-specific logic; follow only the DOMD. Output only valid JSON as specified, with no extra text."},
+            {"role": "user", "content": input_text}
+        ]
+
+    def _batch_budget(self):
+        if isinstance(self.batch_tokens, dict):
+            return self.batch_tokens.get(self.mistral_model, self.batch_tokens.get("default"))
+        return self.batch_tokens
+
+    def _clean_request(self, batch_df, domd, columns=()):
+        """Messages and parser for one cleaning request; its estimated prompt size is recorded."""
+        if self.prompt_format == "compact":
+            messages = compact_clean_messages(batch_df, domd, columns)
+            header = encode_rows(batch_df.iloc[:0]).strip()
+
+            def parse(result):
+                # Tolerate a model that answers in the JSON format anyway.
+                try:
+                    return self._parse_clean_response(result)
+                except LLMResponseError:
+                    return parse_compact_response(result, header)
+        else:
+            messages, parse = self._clean_messages(batch_df, domd), self._parse_clean_response
+        tokens = estimate_tokens(messages)
+        self._request_tokens.append((len(batch_df), tokens))
+        self.metrics.incr("clean_requests")
+        self.metrics.incr("clean_request_rows", len(batch_df))
+        self.metrics.incr("clean_prompt_tokens_estimated", tokens)
+        return messages, parse
+
+    def _clean_batches(self, df, domd, batch_size):
+        """``(batch, rule columns)`` pairs: token-budgeted when ``batch_tokens`` is set, else ``batch_size`` rows."""
+        budget = self._batch_budget()
+        if budget:
+            compact = self.prompt_format == "compact"
+            # Prompt size without rows; with every DOMD rule, so it bounds the per-batch subsets.
+            empty = df.iloc[:0]
+            overhead = estimate_tokens(compact_clean_messages(empty, domd) if compact else self._clean_messages(empty, domd))
+            sizes = csv_row_token_sizes(df) if compact else row_token_sizes(df)
+            # The reply echoes every row, so each row counts twice against the budget.
+            bounds = chunk_by_tokens([2 * size for size in sizes], budget - overhead, self.max_batch_rows)
+        else:
+            bounds = [(start, min(start + batch_size, len(df))) for start in range(0, len(df), batch_size)]
+        columns = [()] * len(bounds)
+        if self.prompt_format == "compact" and bounds:
+            failing = failing_columns(df, domd)
+            columns = [tuple(failing.columns[failing.iloc[start:end].any().to_numpy()]) for start, end in bounds]
+        return [(df.iloc[start:end], cols) for (start, end), cols in zip(bounds, columns)]
+
+    def _request_summary(self):
+        rows = sum(n for n, _ in self._request_tokens)
+        tokens = [t for _, t in self._request_tokens]
+        return {
+            "llm_requests": len(tokens),
+            "prompt_tokens_estimated": sum(tokens),
+            "max_prompt_tokens_estimated": max(tokens, default=0),
+            "prompt_tokens_per_row": round(sum(tokens) / rows, 1) if rows else None,
+        }
+
+    def _parse_clean_response(self, result):
+        import re
         if not result:
-            print("Mistral returned empty response for anomaly detection.")
-            return []
+            raise LLMResponseError("Mistral returned empty response for data cleaning.")
+        # Remove code block markers if present
+        code_match = re.search(r"```(?:json|JSON)?\n?(.*)```", result, re.DOTALL)
+        json_str = code_match.group(1).strip() if code_match else result.strip()
         try:
-            import re
-            # Remove code block markers if present
-            code_match = re.search(r"```(?:json|JSON)?\n?(.*)```", result, re.DOTALL)
-            json_str = code_match.group(1).strip() if code_match else result.strip()
-            # Fix invalid escape sequences (e.g., \/ -> /)
-            json_str = json_str.replace(r'\/', '/')
-            # Remove any stray backslashes before quotes
-            json_str = re.sub(r'\\(["\'])', r'\1', json_str)
-            # Remove any invalid control characters
-            json_str = re.sub(r'[\x00-\x1F]+', '', json_str)
-            try:
-                anomalies_obj = json.loads(json_str)
-            except Exception as e2:
-                print(f"Second attempt to decode JSON failed. Output: {json_str} Error: {e2}")
-                anomalies_obj = {}
-            anomalies = anomalies_obj.get("anomalies", [])
-            if not isinstance(anomalies, list):
-                print(f"Mistral output for anomalies was not a list. Output: {result}")
-                anomalies = []
+            output = json.loads(json_str)
+        except ValueError as e:
+            raise LLMResponseError(f"Failed to decode JSON from Mistral output for data cleaning. Output was: {result} Error: {e}")
+        if not isinstance(output, dict):
+            raise LLMResponseError(f"Expected a JSON object from Mistral for data cleaning. Output was: {result}")
+        return output.get("cleaned", []), output.get("uncleaned", [])
+
+    def _clean_batch(self, batch_df, domd, columns=()):
+        """Sequential mode: a failed batch is passed through to cleaned as-is."""
+        messages, parse = self._clean_request(batch_df, domd, columns)
+        try:
+            return self.executor.complete(self.mistral_model, messages, parse=parse)
+        except LLMResponseError as e:
+            print(e)
         except Exception as e:
-            print(f"Failed to decode JSON from Mistral output for anomaly detection. Output was: {result} Error: {e}")
-            anomalies = []
-        return anomalies
+            print(f"Mistral SDK call failed for data cleaning: {e}")
+        self.metrics.incr("clean_batch_failures")
+        return batch_df.to_dict(orient="records"), []
 
-    def clean_data(self, df, domd, batch_size=5):
+    def _clean_batch_with_retry(self, batch_df, domd, columns=()):
+        """Concurrent mode: call and parse failures are retried with backoff; a batch
+        that still fails is routed to uncleaned rather than trusted as clean."""
+        messages, parse = self._clean_request(batch_df, domd, columns)
+        try:
+            return self.executor.retry(lambda: self.executor.complete(self.mistral_model, messages, parse=parse))
+        except Exception as e:
+            print(f"Data cleaning batch failed after {self.executor.max_retries} retries: {e}")
+            self.metrics.incr("clean_batch_failures")
+            return [], batch_df.to_dict(orient="records")
+
+    def clean_data(self, df, domd, batch_size=5, prevalidate=False, tag=None):
+        """Clean ``df`` by LLM batches and split it into (cleaned, uncleaned) frames.
+
+        ``tag`` names a column of row identifiers that is kept out of the
+        prompts; every output row carries it back, holding its own identifier
+        or, for LLM batches, the batch's identifiers joined by ``TAG_SEP``.
+        """
         cleaned_rows = []
         uncleaned_rows = []
-        num_rows = len(df)
-        for start in range(0, num_rows, batch_size):
-            batch_df = df.iloc[start:start+batch_size]
-            input_data_str = batch_df.to_json(orient="records")
-            input_text = (
-                f"DOMD: {json.dumps(domd)}\n"
-                f"Input Data Sample: {input_data_str}\n"
-                "Task: Clean the input data strictly according to the DOMD. For every field, strictly enforce all constraints in the DOMD, including length, padding, type, allowed values, and required/nullable status. If a field requires padding (e.g., leading zeros), pad to the required length as specified in the DOMD. If a field is required and cannot be fixed, move the row to uncleaned. Do not hardcode any field-specific logic; follow only the DOMD. Your response MUST be a JSON object with two keys: 'cleaned' and 'uncleaned'. Each key should contain a list of data records (as JSON objects). No row or column in 'cleaned' may violate any DOMD constraint. Do not include any markdown formatting or explanation."
-            )
-            messages = [
-                {"role": "system", "content": "You are a data cleaning expert. You must strictly enforce every constraint in the DOMD for every row and column. For every field, follow the DOMD exactly: enforce length, padding, type, allowed values, and required/nullable status. If a field requires padding (e.g., leading zeros), pad to the required length as specified in the DOMD. Do not hardcode any field-specific logic; follow only the DOMD. Output only valid JSON as specified, with no extra text."},
-                {"role": "user", "content": input_text}
-            ]
-            try:
-                chat_response = self.mistral_client.chat.complete(
-                    model=self.mistral_model,
-                    messages=messages
-                )
-                result = chat_response.choices[0].message.content
-            except Exception as e:
-                print(f"Mistral SDK call failed for data cleaning: {e}")
-                cleaned_rows.extend(batch_df.to_dict(orient="records"))
-                continue
-            if not result:
-                print("Mistral returned empty response for data cleaning.")
-                cleaned_rows.extend(batch_df.to_dict(orient="records"))
-                continue
-            try:
-                import re
-                # Remove code block markers if present
-                code_match = re.search(r"```(?:json|JSON)?\n?(.*)```", result, re.DOTALL)
-                json_str = code_match.group(1).strip() if code_match else result.strip()
-                output = json.loads(json_str)
-                cleaned_rows.extend(output.get("cleaned", []))
-                uncleaned_rows.extend(output.get("uncleaned", []))
-            except Exception as e:
-                print(f"Failed to decode JSON from Mistral output for data cleaning. Output was: {result} Error: {e}")
-                cleaned_rows.extend(batch_df.to_dict(orient="records"))
+        rows_in = len(df)
+        tags = None
+        if tag is not None:
+            tags = df[tag]
+            df = df.drop(columns=tag)
+        if prevalidate:
+            # Rows that already satisfy the DOMD skip the LLM; they still go
+            # through the post-processing enforcement below with everything else.
+            with self.metrics.stage("clean.prevalidate"):
+                passed = compile_validator(domd).valid_rows(df)
+                records = df[passed].to_dict(orient="records")
+                if tags is not None:
+                    for record, value in zip(records, tags[passed]):
+                        record[tag] = value
+                    tags = tags[~passed]
+                cleaned_rows.extend(records)
+                df = df[~passed]
+        batches = self._clean_batches(df, domd, batch_size)
+        self._request_tokens = []
+        self.metrics.incr("clean_batches", len(batches))
+        with self.metrics.stage("clean.llm_batches", batches=len(batches)):
+            if self.executor.concurrency > 1:
+                results = self.executor.map(lambda b: self._clean_batch_with_retry(b[0], domd, b[1]), batches)
+            else:
+                results = [self._clean_batch(b, domd, columns) for b, columns in batches]
+        self.routing_stats = {"rows_in": rows_in, "skipped_llm": rows_in - len(df), "sent_to_llm": len(df),
+                              **self._request_summary()}
+        for (batch, _), (cleaned, uncleaned) in zip(batches, results):
+            if tags is not None:
+                # The LLM may merge, split or drop rows, so outputs map to the whole batch.
+                group = TAG_SEP.join(tags.loc[batch.index])
+                cleaned = [{**record, tag: group} for record in cleaned if isinstance(record, dict)]
+                uncleaned = [{**record, tag: group} for record in uncleaned if isinstance(record, dict)]
+            cleaned_rows.extend(cleaned)
+            uncleaned_rows.extend(uncleaned)
         # Post-processing: strictly enforce DOMD constraints on clean data
         clean_df = pd.DataFrame(cleaned_rows)
         unclean_df = pd.DataFrame(uncleaned_rows)
         if not clean_df.empty:
-            clean_df, moved = self._enforce_domd_constraints_generic(clean_df, domd)
+            with self.metrics.stage("clean.enforce_constraints"):
+                clean_df, moved = self._enforce_domd_constraints_generic(clean_df, domd)
             if not moved.empty:
                 unclean_df = pd.concat([unclean_df, moved], ignore_index=True)
         return clean_df, unclean_df
 
+    def clean_data_with_script(self, df, domd, runner, code, batch_size=5, prevalidate=False, tag=None):
+        """Clean ``df`` with a validated registry script run by ``runner``.
+
+        Rows the script drops go to uncleaned; rows of partitions where the
+        script errors or times out fall back to the LLM batch path. ``tag``
+        works as in ``clean_data``; script output maps back row by row.
+        """
+        tags = None
+        if tag is not None:
+            tags = df[tag].to_numpy()
+            df = df.drop(columns=tag).reset_index(drop=True)
+        with self.metrics.stage("clean.script", rows=len(df)):
+            cleaned, dropped, failed = runner.run(code, df)
+        frames = []
+        for frame in (cleaned, dropped, failed):
+            if ROW_ID in frame.columns:
+                if tags is not None:
+                    frame[tag] = tags[frame[ROW_ID].to_numpy()]
+                frame = frame.drop(columns=ROW_ID)
+            frames.append(frame)
+        cleaned, dropped, failed = frames
+        self.metrics.incr("script_failed_rows", len(failed))
+        unclean_parts = [dropped]
+        if not cleaned.empty:
+            with self.metrics.stage("clean.enforce_constraints"):
+                cleaned, moved = self._enforce_domd_constraints_generic(cleaned, domd)
+            unclean_parts.append(moved)
+        sent_to_llm, requests = 0, {}
+        if not failed.empty:
+            llm_clean, llm_unclean = self.clean_data(failed, domd, batch_size=batch_size, prevalidate=prevalidate, tag=tag)
+            sent_to_llm = self.routing_stats["sent_to_llm"]
+            requests = {k: v for k, v in self.routing_stats.items() if k not in ("rows_in", "skipped_llm", "sent_to_llm")}
+            cleaned = pd.concat([cleaned, llm_clean], ignore_index=True)
+            unclean_parts.append(llm_unclean)
+        unclean_parts = [part for part in unclean_parts if not part.empty]
+        unclean_df = pd.concat(unclean_parts, ignore_index=True) if unclean_parts else pd.DataFrame()
+        self.routing_stats = {
+            "rows_in": len(df),
+            "skipped_llm": len(df) - sent_to_llm,
+            "sent_to_llm": sent_to_llm,
+            "script_rows": len(df) - len(failed),
+            **requests,
+        }
+        return cleaned, unclean_df
+
     def _enforce_domd_constraints_generic(self, df, domd):
-        import re
-        from datetime import datetime
-        moved = pd.DataFrame()
-        keep_mask = pd.Series([True] * len(df), index=df.index)
-        def handle_date(col, s):
-            fmt = "%Y%m%d" if "yyyy-mm-dd" not in col.get("constraints", "").lower() else "%Y-%m-%d"
-            def norm(v):
-                if pd.isnull(v): return None
-                v = str(v)
-                for f in ["%Y%m%d","%Y-%m-%d","%d%m%Y","%d/%m/%Y","%m/%d/%Y","%Y/%m/%d","%Y.%m.%d","%d.%m.%Y"]:
-                    try: return datetime.strptime(v, f).strftime(fmt)
-                    except: pass
-                d = re.sub(r"[^0-9]", "", v)
-                return d.zfill(8) if len(d)<=8 and fmt=="%Y%m%d" else (d[:8] if len(d)>8 and fmt=="%Y%m%d" else None)
-            normed = s.apply(norm)
-            def is_valid(v):
-                if pd.isnull(v): return False
-                vstr = str(v)
-                if not re.fullmatch(r"\d{8}", vstr): return False
-                try:
-                    return datetime.strptime(vstr, fmt).date() <= datetime.now().date()
-                except Exception:
-                    return False
-            valid = normed.apply(is_valid)
-            return normed, valid
-        def handle_currency(col, s):
-            canon = (col.get("allowed",[None])[0] or col.get("sample") or "GBP").upper()
-            normed = s.apply(lambda v: canon)
-            return normed, normed.notnull()
-        def handle_pad(col, s):
-            l, t, c = col.get("length"), col.get("type","string"), col.get("constraints","")
-            if not (l and isinstance(l,int)): return s, pd.Series([True]*len(s), index=s.index)
-            def pad(v):
-                if pd.isnull(v): return None
-                v = str(v)
-                if t in ["string","integer"]:
-                    if "leading zero" in c.lower() or "pad" in c.lower(): v = v.zfill(l)
-                    if len(v)>l: v = v[-l:]
-                    if len(v)<l: v = v.zfill(l)
-                    return v
-                return v
-            normed = s.apply(pad)
-            return normed, normed.notnull()
-        def handle_type(col, s):
-            t = col.get("type","string")
-            if t=="integer":
-                normed = s.apply(lambda v: int(v) if not pd.isnull(v) and str(v).isdigit() else None)
-                return normed, normed.notnull()
-            if t=="float":
-                normed = s.apply(lambda v: float(v) if not pd.isnull(v) and re.match(r"^-?\d+(\.\d+)?$",str(v)) else None)
-                return normed, normed.notnull()
-            return s, pd.Series([True]*len(s), index=s.index)
-        def handle_allowed(col, s):
-            a = col.get("allowed",None)
-            if not a: return s, pd.Series([True]*len(s), index=s.index)
-            normed = s.where(s.isin(a), None)
-            return normed, normed.notnull()
-        handlers = [
-            (lambda c: c.get("type") == "date" or ("yyyy" in c.get("constraints","")), handle_date),
-            (lambda c: c.get("type") == "string" and ("currency" in c.get("constraints","") or (c.get("allowed") and all(isinstance(a,str) and len(a)==3 for a in c.get("allowed"))) or (c.get("sample") and isinstance(c.get("sample"),str) and len(c.get("sample"))==3)), handle_currency),
-            (lambda c: c.get("length") is not None and isinstance(c.get("length"),int), handle_pad),
-            (lambda c: c.get("type") in ["integer","float"], handle_type),
-            (lambda c: c.get("allowed") is not None, handle_allowed)
-        ]
-        for col in domd["columns"]:
-            name = col["name"]
-            required = col.get("required", False)
-            nullable = col.get("nullable", True)
-            s = df[name] if name in df.columns else pd.Series([None]*len(df))
-            col_mask = pd.Series([True]*len(s), index=s.index)
-            for pred, h in handlers:
-                if pred(col):
-                    s, valid = h(col, s)
-                    col_mask &= valid
-            df[name] = s
-            if required and not nullable:
-                col_mask &= df[name].notnull()
-            keep_mask &= col_mask
-        moved = df[~keep_mask]
-        df = df[keep_mask]
-        return df.reset_index(drop=True), moved.reset_index(drop=True) if not moved.empty else pd.DataFrame()
-
-    def generate_cleaning_script(self, domd):
+        if self.engine is not None:
+            return self.engine.enforce_constraints(df, domd)
+        return compile_constraints(domd).apply(df)
+
+    def generate_cleaning_script(self, domd, profile=None, use_cache=True):
+        # Column statistics give the model the shape of the data without raw rows.
+        profile_text = f"Column Profile: {json.dumps(profile, default=str)}\n" if profile else ""
         input_text = (
             f"DOMD: {json.dumps(domd)}\n"
-            "You are a Python expert. Generate a pandas data cleaning script that strictly enforces every constraint in the DOMD for every row and column. The script should read input.csv, clean the data, and save clean_data.csv. Output only valid Python code. Do not include markdown formatting, the prompt, or any explanation text."
+            f"{profile_text}"
+            "You are a Python expert. Generate a pandas data cleaning script that strictly enforces every constraint in the DOMD for every row and column. The script should read input.csv, clean the data, and save clean_data.csv. Read every column as text (dtype=str). Drop rows that cannot be cleaned. If input.csv has a _row_id column, keep it unchanged in clean_data.csv. Output only valid Python code. Do not include markdown formatting, the prompt, or any explanation text."
         )
         messages = [
             {"role": "system", "content": "You are a Python expert. You must strictly enforce every constraint in the DOMD for every row and column. Output only valid Python code, with no extra text."},
             {"role": "user", "content": input_text}
         ]
         # Use mistralai SDK for Codestral
-        chat_response = self.mistral_client.chat.complete(
-            model=self.codestral_model,
-            messages=messages
-        )
-        result = chat_response.choices[0].message.content
+        result = self.executor.complete(self.codestral_model, messages, use_cache=use_cache)
         import re
         match = re.search(r"```(?:python\n)?(.*?)```", result, re.DOTALL)
         if match:
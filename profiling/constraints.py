@@ -0,0 +1,239 @@
+import re
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# Same cascade, same order as the per-value strptime loop it replaces.
+DATE_FORMATS = ["%Y%m%d", "%Y-%m-%d", "%d%m%Y", "%d/%m/%Y", "%m/%d/%Y", "%Y/%m/%d", "%Y.%m.%d", "%d.%m.%Y"]
+
+# Strict shapes for which pandas' parser and datetime.strptime agree exactly.
+# Anything else (odd lengths, padding, unicode digits) goes through strptime.
+_DATE_SHAPES = {
+    "%Y%m%d": r"[0-9]{8}",
+    "%Y-%m-%d": r"[0-9]{4}-[0-9]{2}-[0-9]{2}",
+    "%d%m%Y": r"[0-9]{8}",
+    "%d/%m/%Y": r"[0-9]{2}/[0-9]{2}/[0-9]{4}",
+    "%m/%d/%Y": r"[0-9]{2}/[0-9]{2}/[0-9]{4}",
+    "%Y/%m/%d": r"[0-9]{4}/[0-9]{2}/[0-9]{2}",
+    "%Y.%m.%d": r"[0-9]{4}\.[0-9]{2}\.[0-9]{2}",
+    "%d.%m.%Y": r"[0-9]{2}\.[0-9]{2}\.[0-9]{4}",
+}
+
+Step = Callable[[pd.Series, Any], Tuple[pd.Series, pd.Series]]
+
+
+def _all_valid(s: pd.Series) -> pd.Series:
+    return pd.Series(True, index=s.index)
+
+
+def _nones(index: pd.Index) -> pd.Series:
+    return pd.Series(np.full(len(index), None, dtype=object), index=index, dtype=object)
+
+
+def _finish(values: np.ndarray, index: pd.Index) -> pd.Series:
+    """Wrap an object array the way Series.apply would infer its dtype."""
+    return pd.Series(values, index=index, dtype=object).infer_objects()
+
+
+def _map_unique(s: pd.Series, func: Callable[[pd.Series], Any]) -> Tuple[pd.Series, pd.Series]:
+    """Run a vectorized ``func`` once per distinct non-null value of ``s`` (as str).
+
+    ``func`` gets the uniques and returns either the normalized uniques or a
+    ``(normalized, valid)`` pair; results are broadcast back onto ``s``. Nulls
+    normalize to None. Without an explicit ``valid``, validity is non-null.
+    """
+    out = np.full(len(s), None, dtype=object)
+    valid = np.zeros(len(s), dtype=bool)
+    notnull = s.notnull().to_numpy()
+    if notnull.any():
+        codes, uniques = pd.factorize(s[notnull].astype(str))
+        result = func(pd.Series(np.asarray(uniques, dtype=object), dtype=object))
+        normed, ok = result if isinstance(result, tuple) else (result, result.notnull())
+        out[notnull] = normed.to_numpy(dtype=object)[codes]
+        valid[notnull] = ok.to_numpy(dtype=bool)[codes]
+    return _finish(out, s.index), pd.Series(valid, index=s.index)
+
+
+def _legacy_norm_date(v: str, fmt: str) -> Any:
+    for f in DATE_FORMATS:
+        try:
+            return datetime.strptime(v, f).strftime(fmt)
+        except ValueError:
+            pass
+    d = re.sub(r"[^0-9]", "", v)
+    return d.zfill(8) if len(d) <= 8 and fmt == "%Y%m%d" else (d[:8] if len(d) > 8 and fmt == "%Y%m%d" else None)
+
+
+def _legacy_date_valid(v: Any, fmt: str, today) -> bool:
+    if v is None or not re.fullmatch(r"\d{8}", v):
+        return False
+    try:
+        return datetime.strptime(v, fmt).date() <= today
+    except ValueError:
+        return False
+
+
+def _normalize_dates(u: pd.Series, fmt: str) -> Tuple[pd.Series, pd.Series]:
+    """Return (normalized, parsed-on-fast-path mask) for unique date strings."""
+    normed = _nones(u.index)
+    fast = pd.Series(False, index=u.index)
+    pending = pd.Series(True, index=u.index)
+    for f in DATE_FORMATS:
+        shaped = pending & u.str.fullmatch(_DATE_SHAPES[f]).fillna(False).astype(bool)
+        if not shaped.any():
+            continue
+        parsed = pd.to_datetime(u[shaped], format=f, errors="coerce")
+        ok = parsed.notna() & (parsed.dt.year >= 1000)
+        hit = ok[ok].index
+        normed[hit] = parsed[hit].dt.strftime(fmt).astype(object)
+        fast[hit] = True
+        # strptime may still accept what pandas rejects (e.g. single-digit
+        # month backtracking), so rejected shaped values fall to the slow path.
+        pending[shaped] = False
+    slow = ~fast
+    if slow.any():
+        normed[slow] = [_legacy_norm_date(v, fmt) for v in u[slow]]
+    return normed, fast
+
+
+def date_step(col: Dict[str, Any]) -> Step:
+    fmt = "%Y%m%d" if "yyyy-mm-dd" not in col.get("constraints", "").lower() else "%Y-%m-%d"
+
+    def step(s, today):
+        def per_unique(u):
+            normed, fast = _normalize_dates(u, fmt)
+            valid = pd.Series(False, index=u.index)
+            digits = normed.notnull() & normed.astype(str).str.fullmatch(r"[0-9]{8}").astype(bool)
+            quick = digits & fast
+            if quick.any():
+                valid[quick] = pd.to_datetime(normed[quick], format=fmt).dt.date <= today
+            for i in normed.index[digits & ~fast]:
+                valid[i] = _legacy_date_valid(normed[i], fmt, today)
+            return normed, valid
+        return _map_unique(s, per_unique)
+    return step
+
+
+def currency_code(col: Dict[str, Any]) -> str:
+    return ((col.get("allowed") or [None])[0] or col.get("sample") or "GBP").upper()
+
+
+def currency_step(col: Dict[str, Any]) -> Step:
+    canon = currency_code(col)
+
+    def step(s, today):
+        normed = _finish(np.full(len(s), canon, dtype=object), s.index)
+        return normed, normed.notnull()
+    return step
+
+
+def pad_step(col: Dict[str, Any]) -> Step:
+    l, t = col.get("length"), col.get("type", "string")
+    if not (l and isinstance(l, int)):
+        return lambda s, today: (s, _all_valid(s))
+
+    def per_unique(u):
+        if t not in ["string", "integer"]:
+            return u
+        return u.str.slice(-l).where(u.str.len() > l, u.str.zfill(l))
+
+    return lambda s, today: _map_unique(s, per_unique)
+
+
+def type_step(col: Dict[str, Any]) -> Step:
+    t = col.get("type", "string")
+
+    def to_int(u):
+        out = _nones(u.index)
+        digits = u.str.isdigit().astype(bool)
+        if digits.any():
+            nums = pd.to_numeric(u[digits], errors="coerce")
+            if pd.api.types.is_signed_integer_dtype(nums):
+                out[digits] = nums.astype(object)
+            else:
+                out[digits] = [int(v) for v in u[digits]]
+        return out
+
+    def to_float(u):
+        out = _nones(u.index)
+        decimal = u.str.match(r"^-?\d+(\.\d+)?$").astype(bool)
+        if decimal.any():
+            nums = pd.to_numeric(u[decimal], errors="coerce")
+            if nums.isna().any():
+                nums[nums.isna()] = [float(v) for v in u[decimal][nums.isna()]]
+            out[decimal] = nums.astype(float).astype(object)
+        return out
+
+    if t not in ["integer", "float"]:
+        return lambda s, today: (s, _all_valid(s))
+
+    return lambda s, today: _map_unique(s, to_int if t == "integer" else to_float)
+
+
+def allowed_step(col: Dict[str, Any]) -> Step:
+    a = col.get("allowed", None)
+
+    def step(s, today):
+        if not a:
+            return s, _all_valid(s)
+        normed = s.where(s.isin(a), None)
+        return normed, normed.notnull()
+    return step
+
+
+def is_currency_column(c: Dict[str, Any]) -> bool:
+    """The heuristic the enforcement step uses to canonicalize currency-like columns."""
+    return c.get("type") == "string" and (
+        "currency" in c.get("constraints", "")
+        or bool(c.get("allowed") and all(isinstance(a, str) and len(a) == 3 for a in c.get("allowed")))
+        or bool(c.get("sample") and isinstance(c.get("sample"), str) and len(c.get("sample")) == 3)
+    )
+
+
+# (predicate on the DOMD column, step factory), applied in this order.
+HANDLERS = [
+    (lambda c: c.get("type") == "date" or ("yyyy" in c.get("constraints", "")), date_step),
+    (is_currency_column, currency_step),
+    (lambda c: c.get("length") is not None and isinstance(c.get("length"), int), pad_step),
+    (lambda c: c.get("type") in ["integer", "float"], type_step),
+    (lambda c: c.get("allowed") is not None, allowed_step),
+]
+
+
+class ConstraintPlan:
+    """DOMD column constraints compiled into vectorized per-column steps."""
+
+    def __init__(self, domd: Dict[str, Any]):
+        self.columns: List[Tuple[str, bool, List[Step]]] = []
+        for col in domd["columns"]:
+            steps = [factory(col) for pred, factory in HANDLERS if pred(col)]
+            required = col.get("required", False) and not col.get("nullable", True)
+            self.columns.append((col["name"], required, steps))
+
+    def evaluate(self, df: pd.DataFrame) -> pd.Series:
+        """Normalize ``df`` in place and return the keep mask."""
+        today = datetime.now().date()
+        keep_mask = pd.Series(True, index=df.index)
+        for name, required, steps in self.columns:
+            s = df[name] if name in df.columns else pd.Series([None] * len(df))
+            col_mask = _all_valid(s)
+            for step in steps:
+                s, valid = step(s, today)
+                col_mask &= valid
+            df[name] = s
+            if required:
+                col_mask &= df[name].notnull()
+            keep_mask &= col_mask
+        return keep_mask
+
+    def apply(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Normalize ``df`` in place and split it into (kept, moved) frames."""
+        keep_mask = self.evaluate(df)
+        moved = df[~keep_mask]
+        df = df[keep_mask]
+        return df.reset_index(drop=True), moved.reset_index(drop=True) if not moved.empty else pd.DataFrame()
+
+
+def compile_constraints(domd: Dict[str, Any]) -> ConstraintPlan:
+    return ConstraintPlan(domd)
@@ -0,0 +1,160 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from .constraints import ConstraintPlan
+from .incremental import row_hashes
+from .utils import primary_key_columns
+
+# ``result()`` columns: duplicate row, row of the key's first occurrence, and
+# whether the rows differ outside the key (conflicting) or not (exact).
+RESULT_COLUMNS = ["row", "first_row", "conflicting"]
+
+
+def _no_duplicates() -> pd.DataFrame:
+    return pd.DataFrame({"row": np.array([], dtype=np.int64), "first_row": np.array([], dtype=np.int64),
+                         "conflicting": np.array([], dtype=bool)})
+
+
+class DuplicateFinder:
+    """In-memory hash strategy for DOMD primary-key duplicates.
+
+    Frames are fed in file order with ``add``; ``result`` lists every
+    occurrence of a key after its first, exactly matched on the key values
+    after the DOMD constraint steps normalize them (so ``2025-12-21`` and
+    ``20251221`` are one date). Rows with a null key value are never
+    duplicates; they fail the required-column check instead.
+
+    With ``keys_only`` the frames need only the key columns and
+    ``conflicting`` is left False; the caller then compares the
+    ``content_hashes`` of the full rows itself.
+    """
+
+    name = "hash"
+
+    def __init__(self, domd: Dict[str, Any], keys_only: bool = False, **_: Any):
+        self.pk = primary_key_columns(domd)
+        self.keys_only = keys_only
+        self._plan = ConstraintPlan({"columns": [c for c in domd["columns"] if c["name"] in self.pk]})
+        self._keys: List[pd.Series] = []
+        self._hashes: List[np.ndarray] = []
+
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """``df`` with its key columns normalized; rows with a null key value dropped."""
+        keys = df[self.pk].copy()
+        self._plan.evaluate(keys)
+        df = df.assign(**{name: keys[name] for name in self.pk})
+        return df[keys.notna().all(axis=1).to_numpy()]
+
+    def _row_hashes(self, df: pd.DataFrame) -> np.ndarray:
+        return np.zeros(len(df), dtype=np.int64) if self.keys_only else row_hashes(df)
+
+    def content_hashes(self, df: pd.DataFrame, offset: int = 0) -> pd.Series:
+        """Content hash of each of ``df``'s rows with a non-null key (normalized), indexed by file row."""
+        df = self._normalize(df.reset_index(drop=True))
+        return pd.Series(row_hashes(df), index=df.index + offset)
+
+    def add(self, df: pd.DataFrame, offset: int = 0) -> None:
+        """Record ``df``'s rows, which start at row ``offset`` of the file."""
+        df = self._normalize(df.reset_index(drop=True))
+        keys = pd.Series(list(zip(*(df[name].astype(str) for name in self.pk))), index=df.index + offset, dtype=object)
+        self._keys.append(keys)
+        self._hashes.append(self._row_hashes(df))
+
+    def result(self) -> pd.DataFrame:
+        keys = pd.concat(self._keys) if self._keys else pd.Series([], dtype=object)
+        if keys.empty:
+            return _no_duplicates()
+        hashes = np.concatenate(self._hashes)
+        codes, _ = pd.factorize(keys)
+        _, first = np.unique(codes, return_index=True)
+        repeat = pd.Series(codes).duplicated().to_numpy()
+        first_at = first[codes[repeat]]
+        rows = keys.index.to_numpy()
+        return pd.DataFrame({"row": rows[repeat], "first_row": rows[first_at],
+                             "conflicting": hashes[repeat] != hashes[first_at]})
+
+    def close(self) -> None:
+        self._keys, self._hashes = [], []
+
+
+class PartitionedDuplicateFinder(DuplicateFinder):
+    """Spill-to-disk strategy for files larger than RAM.
+
+    ``add`` writes a 128-bit key hash, the row's content hash and its
+    position to one of ``partitions`` files chosen by the key hash, so
+    memory holds one frame at a time. ``result`` then loads one partition at
+    a time and finds repeats by sorting it on (key hash, position).
+    """
+
+    name = "partitioned"
+    _DTYPE = np.dtype([("k1", "<u8"), ("k2", "<u8"), ("hash", "<i8"), ("row", "<i8")])
+
+    def __init__(self, domd: Dict[str, Any], partitions: int = 64, spill_dir: Optional[str] = None,
+                 keys_only: bool = False, **_: Any):
+        super().__init__(domd, keys_only)
+        self.partitions = partitions
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._dir = tempfile.mkdtemp(prefix="duplicates_", dir=spill_dir)
+
+    def add(self, df: pd.DataFrame, offset: int = 0) -> None:
+        df = self._normalize(df.reset_index(drop=True))
+        key_text = df[self.pk].astype(object).astype(str)
+        records = np.empty(len(df), dtype=self._DTYPE)
+        # Two independently keyed 64-bit hashes, so collisions are negligible at any file size.
+        records["k1"] = pd.util.hash_pandas_object(key_text, index=False).to_numpy()
+        records["k2"] = pd.util.hash_pandas_object(key_text, index=False, hash_key="duplicate-key-k2").to_numpy()
+        records["hash"] = self._row_hashes(df)
+        records["row"] = df.index.to_numpy() + offset
+        part = records["k1"] % self.partitions
+        for p in np.unique(part):
+            with open(os.path.join(self._dir, f"part-{p:05d}.bin"), "ab") as f:
+                records[part == p].tofile(f)
+
+    def result(self) -> pd.DataFrame:
+        found = []
+        for name in sorted(os.listdir(self._dir)):
+            records = np.fromfile(os.path.join(self._dir, name), dtype=self._DTYPE)
+            records = records[np.lexsort((records["row"], records["k2"], records["k1"]))]
+            repeat = np.zeros(len(records), dtype=bool)
+            repeat[1:] = (records["k1"][1:] == records["k1"][:-1]) & (records["k2"][1:] == records["k2"][:-1])
+            # Index of each run's first record, carried forward over its repeats.
+            first_at = np.maximum.accumulate(np.where(repeat, 0, np.arange(len(records))))
+            found.append(pd.DataFrame({
+                "row": records["row"][repeat],
+                "first_row": records["row"][first_at[repeat]],
+                "conflicting": records["hash"][repeat] != records["hash"][first_at[repeat]],
+            }))
+        if not found:
+            return _no_duplicates()
+        return pd.concat(found, ignore_index=True).sort_values("row", ignore_index=True)
+
+    def close(self) -> None:
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+STRATEGIES = {finder.name: finder for finder in (DuplicateFinder, PartitionedDuplicateFinder)}
+
+
+def get_duplicate_finder(domd: Dict[str, Any], strategy: str = "hash", **options: Any) -> Optional[DuplicateFinder]:
+    """Finder for ``domd``'s primary key, or None when the DOMD defines none."""
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown duplicate strategy '{strategy}'; expected one of {sorted(STRATEGIES)}")
+    if not primary_key_columns(domd):
+        return None
+    return STRATEGIES[strategy](domd, **options)
+
+
+def duplicate_anomalies(dups: pd.DataFrame, pk: List[str]) -> List[Dict[str, Any]]:
+    """Anomaly objects in the ``anomalies.json`` shape, one per duplicate row."""
+    column = ", ".join(pk)
+    return [
+        {"row": int(row), "column": column,
+         "anomaly_type": "conflicting_duplicate_key" if conflicting else "duplicate_key",
+         "details": (f"Primary key repeats row {first} with different values" if conflicting
+                     else f"Exact duplicate of row {first}")}
+        for row, first, conflicting in zip(dups["row"].tolist(), dups["first_row"].tolist(), dups["conflicting"].tolist())
+    ]
@@ -1,11 +1,129 @@
+import os
 import pandas as pd
-from typing import Any
+from typing import Any, Dict, List, Tuple
+from .constraints import compile_constraints
+from .storage import NA_VALUES
+from .utils import process_pool
+
+
+def _enforce_slice(args: Tuple[Dict[str, Any], pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    domd, df = args
+    return compile_constraints(domd).apply(df)
+
+
+def _csv_text(args: Tuple[pd.DataFrame, bool]) -> str:
+    df, header = args
+    return df.to_csv(index=False, header=header)
+
+
+def _concat_split(parts: List[Tuple[pd.DataFrame, pd.DataFrame]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    kept = pd.concat([k for k, _ in parts], ignore_index=True) if parts else pd.DataFrame()
+    moved = [m for _, m in parts if not m.empty]
+    return kept, pd.concat(moved, ignore_index=True) if moved else pd.DataFrame()
+
 
 class ExecutionEngine:
-    """Executes cleaning scripts using Pandas only."""
+    """Executes loading, DOMD constraint enforcement and output writing using Pandas in one process.
+
+    Subclasses spread the same three operations over local cores; all of them
+    hand plain pandas DataFrames to the LLM stages.
+    """
+
+    name = "pandas"
+
+    def __init__(self, workers: int = 0, partition_rows: int = 250_000):
+        self.workers = workers or os.cpu_count() or 1
+        self.partition_rows = partition_rows
+
+    def _slices(self, df: pd.DataFrame) -> List[pd.DataFrame]:
+        size = max(1, min(self.partition_rows, -(-len(df) // self.workers)))
+        return [df.iloc[start:start + size] for start in range(0, len(df), size)]
+
+    def load_csv(self, path: str) -> Any:
+        # Text columns keep leading zeros for the DOMD length/padding rules.
+        return pd.read_csv(path, dtype=str)
+
+    def enforce_constraints(self, df: pd.DataFrame, domd: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        return compile_constraints(domd).apply(df)
+
+    def save_csv(self, df: Any, path: str) -> None:
+        df.to_csv(path, index=False)
+
+
+class DaskEngine(ExecutionEngine):
+    """Partitioned local Dask backend on the multiprocessing scheduler."""
+
+    name = "dask"
+
+    def __init__(self, workers: int = 0, partition_rows: int = 250_000, blocksize: str = "64MB"):
+        super().__init__(workers, partition_rows)
+        self.blocksize = blocksize
+
+    def _compute(self, *collections):
+        import dask
+        return dask.compute(*collections, scheduler="processes", num_workers=self.workers)
 
     def load_csv(self, path: str) -> Any:
-        return pd.read_csv(path)
+        import dask.dataframe as dd
+        (df,) = self._compute(dd.read_csv(path, dtype=str, blocksize=self.blocksize))
+        return df.reset_index(drop=True)
+
+    def enforce_constraints(self, df: pd.DataFrame, domd: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        if len(df) <= self.partition_rows or self.workers == 1:
+            return super().enforce_constraints(df, domd)
+        from dask import delayed
+        parts = [delayed(_enforce_slice)((domd, part)) for part in self._slices(df)]
+        return _concat_split(list(self._compute(*parts)))
 
     def save_csv(self, df: Any, path: str) -> None:
-        df.to_csv(path, index=False)
\ No newline at end of file
+        if len(df) <= self.partition_rows or self.workers == 1:
+            return super().save_csv(df, path)
+        # Partitions are formatted in parallel, then written to one file in order.
+        from dask import delayed
+        texts = self._compute(*[delayed(_csv_text)((part, i == 0)) for i, part in enumerate(self._slices(df))])
+        with open(path, "w", newline="") as f:
+            f.writelines(texts)
+
+
+class ArrowEngine(ExecutionEngine):
+    """PyArrow multithreaded CSV I/O with process-pool constraint enforcement."""
+
+    name = "arrow"
+
+    def load_csv(self, path: str) -> Any:
+        import pyarrow as pa
+        import pyarrow.csv as pv
+        names = pd.read_csv(path, nrows=0).columns
+        table = pv.read_csv(path, convert_options=pv.ConvertOptions(
+            column_types={name: pa.string() for name in names}, null_values=NA_VALUES, strings_can_be_null=True))
+        return table.to_pandas()
+
+    def enforce_constraints(self, df: pd.DataFrame, domd: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        if len(df) <= self.partition_rows or self.workers == 1:
+            return super().enforce_constraints(df, domd)
+        with process_pool(self.workers) as pool:
+            return _concat_split(list(pool.map(_enforce_slice, [(domd, part) for part in self._slices(df)])))
+
+    def save_csv(self, df: Any, path: str) -> None:
+        import pyarrow as pa
+        import pyarrow.csv as pv
+        if df.columns.empty:
+            return super().save_csv(df, path)
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object columns (e.g. raw LLM output) have no Arrow type.
+            return super().save_csv(df, path)
+        pv.write_csv(table, path, write_options=pv.WriteOptions(quoting_style="needed"))
+
+
+ENGINES = {engine.name: engine for engine in (ExecutionEngine, DaskEngine, ArrowEngine)}
+
+
+def get_engine(config: Dict[str, Any]) -> ExecutionEngine:
+    """Build the backend named by ``engine.backend`` in the config (default pandas)."""
+    engine_cfg = dict((config or {}).get("engine") or {})
+    backend = engine_cfg.pop("backend", "pandas")
+    if backend not in ENGINES:
+        raise ValueError(f"Unknown execution engine '{backend}'; expected one of {sorted(ENGINES)}")
+    return ENGINES[backend](**engine_cfg)
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Tuple
+from .cleaning import TAG_SEP
+from .utils import domd_hash, primary_key_columns
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; runs are then not serialized
+    fcntl = None
+
+# Column carrying each row's key through cleaning (see ``ScriptGenerator.clean_data``'s ``tag``).
+KEY = "_pk_key"
+_KEY_SEP = "\x1f"
+_NULL = "\x00"
+
+
+def row_keys(df: pd.DataFrame, pk: List[str]) -> pd.Series:
+    """Primary-key values of each row joined into one string.
+
+    Repeats of a key get an occurrence suffix, so every row has a distinct
+    key and a re-delivered file maps duplicates onto the same entries.
+    """
+    keys = pd.Series("", index=df.index, dtype=object)
+    for n, name in enumerate(pk):
+        text = df[name].astype(object).where(df[name].notna(), _NULL).astype(str)
+        keys = keys + (_KEY_SEP if n else "") + text
+    repeat = keys.groupby(keys).cumcount()
+    return keys.where(repeat == 0, keys + _KEY_SEP + "#" + repeat.astype(str))
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit content hash of each row's text, as signed ints for SQLite."""
+    text = df.astype(object).where(df.notna(), _NULL).astype(str)
+    return pd.util.hash_pandas_object(text, index=False).to_numpy().view(np.int64)
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+class IncrementalIndex:
+    """Persisted results of earlier runs of one feed for one DOMD, keyed on its primary key.
+
+    ``<root>/<domd hash>/<feed>-<feed hash>.sqlite`` maps each row key to its
+    content hash and to the group of outputs it produced: a row cleaned on
+    its own (prevalidated or by script) forms its own group, while an LLM
+    batch forms one group because the model may merge, split or drop rows.
+    ``plan`` diffs a file against the index, ``update`` stores the results
+    for the rows that were processed and ``outputs`` rebuilds the full
+    clean/unclean tables and anomalies in the order of the current file. An
+    exclusive lock on the ``.lock`` file next to the index is held from
+    construction until ``close``, so overlapping runs of a feed wait their turn.
+    """
+
+    def __init__(self, root: str, domd: Dict[str, Any], feed: str = "default"):
+        self.pk = primary_key_columns(domd)
+        if not self.pk:
+            raise ValueError("Incremental mode needs primary-key columns in the DOMD")
+        self.names = [c["name"] for c in domd["columns"]]
+        directory = os.path.join(root, domd_hash(domd))
+        os.makedirs(directory, exist_ok=True)
+        # Readable prefix, plus a hash so feeds that sanitize alike stay apart.
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", feed)[:64]
+        self.path = os.path.join(directory, f"{name}-{hashlib.sha256(feed.encode()).hexdigest()[:8]}.sqlite")
+        self._lock = open(f"{self.path}.lock", "a")
+        if fcntl is not None:
+            fcntl.flock(self._lock, fcntl.LOCK_EX)
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, hash INTEGER, grp INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS rows_grp ON rows (grp)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS results (grp INTEGER, kind TEXT, record TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_grp ON results (grp)")
+        # ``key`` is NULL for anomalies that are not about a single row.
+        self._db.execute("CREATE TABLE IF NOT EXISTS anomalies (key TEXT, record TEXT)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS anomalies_key ON anomalies (key)")
+        self._db.commit()
+
+    def _stored(self) -> pd.DataFrame:
+        rows = self._db.execute("SELECT key, hash, grp FROM rows").fetchall()
+        return pd.DataFrame(rows, columns=["key", "hash", "grp"]).set_index("key")
+
+    def plan(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Diff ``df`` against the index.
+
+        Rows that are new or changed are processed, together with the rest of
+        any stored group that a changed or removed row belonged to, since
+        that group's outputs are replaced as a whole.
+        """
+        keys = row_keys(df, self.pk)
+        hashes = row_hashes(df)
+        stored = self._stored()
+        prior = stored.reindex(keys.to_numpy())
+        new = prior["hash"].isna().to_numpy()
+        changed = ~new & (prior["hash"].to_numpy() != hashes)
+        removed = stored.index.difference(keys.to_numpy())
+        dirty = set(prior["grp"].to_numpy()[changed].tolist()) | set(stored.loc[removed, "grp"].tolist())
+        process = new | changed | prior["grp"].isin(dirty).to_numpy()
+        stats = {
+            "new": int(new.sum()),
+            "changed": int(changed.sum()),
+            "removed": len(removed),
+            "unchanged": int((~new & ~changed).sum()),
+            "reprocessed": int(process.sum()),
+        }
+        return {"keys": keys, "hashes": hashes, "process": process, "removed": list(removed),
+                "dirty": sorted(int(g) for g in dirty), "stats": stats}
+
+    def update(self, plan: Dict[str, Any], clean_df: pd.DataFrame, unclean_df: pd.DataFrame,
+               anomalies: List[Dict[str, Any]]) -> None:
+        """Replace the stored results of the processed and removed rows in one transaction.
+
+        ``clean_df``/``unclean_df`` carry the ``KEY`` tag column and
+        ``anomalies`` rows are positions among the processed rows.
+        """
+        process = plan["process"]
+        keys = plan["keys"][process].tolist()
+        hashes = plan["hashes"][process].tolist()
+        with self._db:
+            for grp in plan["dirty"]:
+                self._db.execute("DELETE FROM results WHERE grp = ?", (grp,))
+            stale = [(key,) for key in keys + plan["removed"]]
+            self._db.executemany("DELETE FROM rows WHERE key = ?", stale)
+            self._db.executemany("DELETE FROM anomalies WHERE key = ?", stale)
+            next_grp = self._db.execute("SELECT COALESCE(MAX(grp), 0) + 1 FROM rows").fetchone()[0]
+            groups: Dict[str, int] = {}
+            results = []
+            for kind, frame in (("clean", clean_df), ("unclean", unclean_df)):
+                if frame.empty:
+                    continue
+                tags = frame[KEY].tolist()
+                for tag, record in zip(tags, _records(frame.drop(columns=KEY))):
+                    if tag not in groups:
+                        groups[tag] = next_grp + len(groups)
+                    results.append((groups[tag], kind, json.dumps(record, default=str)))
+            self._db.executemany("INSERT INTO results (grp, kind, record) VALUES (?, ?, ?)", results)
+            grp_of = {key: grp for tag, grp in groups.items() for key in tag.split(TAG_SEP)}
+            # Rows with no output (dropped by the LLM) still get a group so they count as seen.
+            spare = iter(range(next_grp + len(groups), next_grp + len(groups) + len(keys)))
+            self._db.executemany(
+                "INSERT INTO rows (key, hash, grp) VALUES (?, ?, ?)",
+                [(key, h, grp_of[key] if key in grp_of else next(spare)) for key, h in zip(keys, hashes)],
+            )
+            entries = []
+            for anomaly in anomalies:
+                row = anomaly.get("row")
+                key = keys[row] if isinstance(row, int) and 0 <= row < len(keys) else None
+                entries.append((key, json.dumps(anomaly, default=str)))
+            # Run-level anomalies describe the latest data seen, so they are replaced, not merged.
+            if keys or any(key is None for key, _ in entries):
+                self._db.execute("DELETE FROM anomalies WHERE key IS NULL")
+            self._db.executemany("INSERT INTO anomalies (key, record) VALUES (?, ?)", entries)
+
+    def outputs(self, plan: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame, List[Dict[str, Any]]]:
+        """Full clean/unclean tables and anomalies for the file ``plan`` was made from.
+
+        Groups appear in the order of their first row in the file, and row
+        anomalies point at the rows' current positions.
+        """
+        position = pd.Series(np.arange(len(plan["keys"])), index=plan["keys"].to_numpy())
+        stored = self._stored()
+        first_row = position.groupby(stored["grp"].reindex(position.index).to_numpy()).min()
+        results = self._db.execute("SELECT grp, kind, record FROM results ORDER BY rowid").fetchall()
+        frames = {}
+        for kind in ("clean", "unclean"):
+            picked = [(grp, record) for grp, k, record in results if k == kind]
+            order = np.argsort([first_row.get(grp, len(position)) for grp, _ in picked], kind="stable")
+            df = pd.DataFrame([json.loads(picked[i][1]) for i in order])
+            columns = [n for n in self.names if n in df.columns] + [c for c in df.columns if c not in self.names]
+            frames[kind] = df.reindex(columns=columns)
+        run_level: List[Dict[str, Any]] = []
+        row_level: List[Tuple[int, Dict[str, Any]]] = []
+        for key, record in self._db.execute("SELECT key, record FROM anomalies ORDER BY rowid"):
+            anomaly = json.loads(record)
+            if key is None:
+                run_level.append(anomaly)
+            elif key in position.index:
+                anomaly["row"] = int(position[key])
+                row_level.append((anomaly["row"], anomaly))
+        row_level.sort(key=lambda item: item[0])
+        return frames["clean"], frames["unclean"], run_level + [anomaly for _, anomaly in row_level]
+
+    def close(self) -> None:
+        self._db.close()
+        # Closing the file releases the lock.
+        self._lock.close()
@@ -0,0 +1,169 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+from .llm import RunCancelled
+from .orchestrator import Orchestrator
+from .utils import load_json, save_json
+
+# Top-level stages of a batch run, in order, for progress reporting.
+BATCH_STAGES = ["load_csv", "profile", "detect_duplicates", "detect_anomalies", "clean_data", "save_outputs", "generate_script"]
+
+
+def _spool(source: BinaryIO, path: str, hasher: "hashlib._Hash") -> None:
+    """Copy an upload to ``path`` in 1 MiB blocks while feeding ``hasher``."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with open(path, "wb") as f:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            hasher.update(block)
+            f.write(block)
+
+
+class JobRunner:
+    """Local background runner for Orchestrator jobs.
+
+    Each job lives in ``<root>/<key>``, where the key hashes the uploaded DOMD,
+    the CSV and the config, so concurrent jobs never share files and
+    resubmitting identical uploads returns the finished job at once. Jobs run
+    on a thread pool; ``status.json`` in the job directory carries the state,
+    the current stage and per-stage timings. ``cancel`` stops a job at its
+    next stage, chunk or LLM call.
+    """
+
+    def __init__(self, config: Dict[str, Any], root: str = "outputs/jobs", workers: int = 2,
+                 client_factory: Optional[Callable[[], Any]] = None):
+        # Metrics are always on for jobs: stage spans drive progress and cancellation.
+        self.config = copy.deepcopy(config or {})
+        self.config["metrics"] = {**(self.config.get("metrics") or {}), "enabled": True}
+        self.root = root
+        self.client_factory = client_factory
+        self._config_hash = hashlib.sha256(json.dumps(self.config, sort_keys=True, default=str).encode()).hexdigest()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="profiling-job")
+        self._lock = threading.RLock()
+        self._active: Dict[str, threading.Event] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(root, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def _save_status(self, job: str, **changes: Any) -> Dict[str, Any]:
+        with self._lock:
+            status = self._status.setdefault(job, {})
+            status.update(changes)
+            snapshot = copy.deepcopy(status)
+        path = os.path.join(self.job_dir(job), "status.json")
+        save_json(snapshot, f"{path}.{threading.get_ident()}.tmp")
+        os.replace(f"{path}.{threading.get_ident()}.tmp", path)
+        return snapshot
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if job_id in self._status:
+                return copy.deepcopy(self._status[job_id])
+        path = os.path.join(self.job_dir(job_id), "status.json")
+        return load_json(path) if os.path.exists(path) else None
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Status of every job under ``root``, newest first."""
+        found = [self.status(name) for name in os.listdir(self.root) if not name.startswith(".")]
+        return sorted((s for s in found if s), key=lambda s: s.get("created", 0), reverse=True)
+
+    def submit(self, domd: BinaryIO, csv: BinaryIO, name: Optional[str] = None) -> str:
+        """Queue a job for these uploads and return its id (the content key).
+
+        A finished job for identical uploads and config is reused as is, and
+        a job that is already queued or running is not started twice.
+        """
+        incoming = os.path.join(self.root, ".incoming", uuid.uuid4().hex)
+        os.makedirs(incoming)
+        hasher = hashlib.sha256(self._config_hash.encode())
+        try:
+            _spool(domd, os.path.join(incoming, "domd.json"), hasher)
+            hasher.update(b"\0")
+            _spool(csv, os.path.join(incoming, "input.csv"), hasher)
+            job_id = hasher.hexdigest()[:16]
+            with self._lock:
+                previous = self.status(job_id)
+                if job_id in self._active or (previous and previous.get("state") == "done"):
+                    return job_id
+                self._active[job_id] = threading.Event()
+            os.makedirs(self.job_dir(job_id), exist_ok=True)
+            for filename in ("domd.json", "input.csv"):
+                # Same key, same bytes: a rerun keeps the existing file (and its mtime),
+                # so a cancelled streaming job resumes from its checkpoint.
+                if not os.path.exists(os.path.join(self.job_dir(job_id), filename)):
+                    os.replace(os.path.join(incoming, filename), os.path.join(self.job_dir(job_id), filename))
+        finally:
+            shutil.rmtree(incoming, ignore_errors=True)
+        self._save_status(job_id, job_id=job_id, name=name or job_id, state="queued", stage=None, stages={},
+                          rows_done=0, error=None, created=time.time(), started=None, finished=None)
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            event = self._active.get(job_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def _tracer(self, job_id: str, cancel: threading.Event):
+        @contextmanager
+        def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[None]:
+            if cancel.is_set():
+                raise RunCancelled()
+            top_level = name in BATCH_STAGES
+            if top_level:
+                self._save_status(job_id, stage=name)
+            start = time.perf_counter()
+            yield
+            if top_level:
+                stages = dict(self.status(job_id).get("stages") or {})
+                stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+                self._save_status(job_id, stages=stages)
+        return span
+
+    def _run(self, job_id: str) -> None:
+        cancel = self._active[job_id]
+        job_dir = self.job_dir(job_id)
+        self._save_status(job_id, state="running", started=time.time())
+        # Every job's input is ``input.csv``, so incremental indexes are kept per upload name.
+        incremental = dict(self.config.get("incremental") or {})
+        incremental["feed"] = incremental.get("feed") or self.status(job_id)["name"]
+        try:
+            orchestrator = Orchestrator(
+                {**self.config, "incremental": incremental},
+                client=self.client_factory() if self.client_factory else None,
+                progress=lambda event: self._save_status(job_id, rows_done=event["rows_done"], chunk=event["chunk"]),
+                tracer=self._tracer(job_id, cancel),
+                cancel=cancel,
+            )
+            orchestrator.run(os.path.join(job_dir, "domd.json"), os.path.join(job_dir, "input.csv"), job_dir)
+            final = {"state": "done", "stage": None}
+        except RunCancelled:
+            final = {"state": "cancelled"}
+        except Exception as e:
+            traceback.print_exc()
+            final = {"state": "failed", "error": f"{type(e).__name__}: {e}"}
+        # One critical section, so a resubmit sees either the running job or its final state.
+        with self._lock:
+            self._active.pop(job_id, None)
+            self._save_status(job_id, finished=time.time(), **final)
+
+    def shutdown(self, cancel_running: bool = False) -> None:
+        if cancel_running:
+            with self._lock:
+                for event in self._active.values():
+                    event.set()
+        self._pool.shutdown(wait=True)
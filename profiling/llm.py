@@ -0,0 +1,271 @@
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from .cache import ResponseCache, cache_key
+from .metrics import NULL_METRICS
+
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Transport failures worth retrying: the request never got an HTTP answer.
+# ``mistralai`` talks over httpx; requests covers other injected clients.
+TRANSIENT_ERRORS: Tuple[type, ...] = (TimeoutError, ConnectionError)
+try:
+    import httpx
+    TRANSIENT_ERRORS += (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+except ImportError:
+    pass
+try:
+    import requests
+    TRANSIENT_ERRORS += (requests.Timeout, requests.ConnectionError)
+except ImportError:
+    pass
+
+
+class LLMResponseError(ValueError):
+    """The model answered, but not with something we can use."""
+
+
+class RunCancelled(BaseException):
+    """The run was cancelled. A BaseException so per-batch ``except Exception``
+    fallbacks do not swallow it (like ``asyncio.CancelledError``)."""
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    """Rough prompt size (~4 characters per token), good enough for rate limiting."""
+    return sum(len(m.get("content") or "") for m in messages) // 4 + 1
+
+
+def row_token_sizes(df: Any) -> List[int]:
+    """Estimated tokens each row adds to a ``to_json(orient='records')`` payload."""
+    if len(df) == 0:
+        return []
+    return [len(line) // 4 + 1 for line in df.to_json(orient="records", lines=True).splitlines()]
+
+
+def chunk_by_tokens(sizes: List[int], budget: int, max_rows: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Greedy contiguous ``(start, end)`` row ranges whose sizes fit ``budget``.
+
+    A row larger than the budget still gets a chunk of its own; ``max_rows``
+    also caps the rows per chunk.
+    """
+    bounds, start, total = [], 0, 0
+    for i, size in enumerate(sizes):
+        if i > start and (total + size > budget or (max_rows and i - start >= max_rows)):
+            bounds.append((start, i))
+            start, total = i, 0
+        total += size
+    if start < len(sizes):
+        bounds.append((start, len(sizes)))
+    return bounds
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Unusable answers, transport failures and throttling/server statuses; never other errors."""
+    if isinstance(exc, (LLMResponseError,) + TRANSIENT_ERRORS):
+        return True
+    status = getattr(exc, "status_code", None)
+    return isinstance(status, int) and (status in RETRY_STATUS or status >= 500)
+
+
+class RateLimiter:
+    """Thread-safe requests- and tokens-per-minute limiter (continuously refilled buckets)."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        if not self.rpm and not self.tpm:
+            return
+        if self.tpm:
+            tokens = min(tokens, self.tpm)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed, self._last = now - self._last, now
+                wait = 0.0
+                if self.rpm:
+                    self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+                    if self._requests < 1:
+                        wait = (1 - self._requests) * 60 / self.rpm
+                if self.tpm:
+                    self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+                    if self._tokens < tokens:
+                        wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+                if wait == 0.0:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens
+                    return
+            time.sleep(wait)
+
+
+class LLMExecutor:
+    """Runs chat completions against an injectable client with an optional
+    response cache, rate limiting, jittered exponential-backoff retries and an
+    ordered thread pool."""
+
+    def __init__(self, client: Any, concurrency: int = 1, rate_limiter: Optional[RateLimiter] = None,
+                 max_retries: int = 3, backoff: float = 1.0, max_backoff: float = 30.0,
+                 cache: Optional[ResponseCache] = None, metrics: Any = None,
+                 cancel: Optional[threading.Event] = None):
+        self.client = client
+        self.cancel = cancel
+        self.cache = cache
+        self.metrics = metrics or NULL_METRICS
+        self._local = threading.local()  # retry attempt of the call running on this thread
+        self.concurrency = max(1, int(concurrency or 1))
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def complete(self, model: str, messages: List[Dict[str, str]], parse: Optional[Callable[[str], Any]] = None,
+                 use_cache: bool = True) -> Any:
+        """Single rate-limited call returning the message content, or ``parse(content)``.
+
+        Cached responses skip the client entirely. A response is only cached once
+        it is non-empty and ``parse`` accepted it, so a retry never replays a bad answer.
+        ``use_cache=False`` neither reads nor writes the cache.
+        Raises ``RunCancelled`` once the ``cancel`` event is set.
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            raise RunCancelled()
+        if not self.metrics.enabled:
+            return self._complete(model, messages, parse, {}, use_cache)
+        call = {"prompt_tokens": 0, "completion_tokens": 0, "cached": False, "parse_seconds": 0.0}
+        start = time.perf_counter()
+        error = None
+        try:
+            return self._complete(model, messages, parse, call, use_cache)
+        except LLMResponseError:
+            error = "parse"
+            self.metrics.incr("llm_parse_failures")
+            raise
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.metrics.record_llm_call(model, time.perf_counter() - start, call["prompt_tokens"],
+                                         call["completion_tokens"], getattr(self._local, "attempt", 0),
+                                         call["cached"], call["parse_seconds"], error)
+
+    def _complete(self, model: str, messages: List[Dict[str, str]], parse: Optional[Callable[[str], Any]],
+                  call: Dict[str, Any], use_cache: bool = True) -> Any:
+        key = cache_key(model, messages) if self.cache is not None and use_cache else None
+        content = self.cache.get(key) if key else None
+        cached = content is not None
+        if not cached:
+            prompt_tokens = estimate_tokens(messages)
+            self.rate_limiter.acquire(prompt_tokens)
+            chat_response = self.client.chat.complete(model=model, messages=messages)
+            content = chat_response.choices[0].message.content
+            if self.metrics.enabled:
+                usage = getattr(chat_response, "usage", None)
+                call["prompt_tokens"] = getattr(usage, "prompt_tokens", None) or prompt_tokens
+                call["completion_tokens"] = getattr(usage, "completion_tokens", None) or len(content or "") // 4
+        call["cached"] = cached
+        parse_start = time.perf_counter()
+        result = parse(content) if parse else content
+        call["parse_seconds"] = time.perf_counter() - parse_start
+        if key and not cached and content:
+            self.cache.put(key, model, content)
+        return result
+
+    def retry(self, fn: Callable[[], Any]) -> Any:
+        """Call ``fn`` until it succeeds, a non-retryable error is raised or retries run out."""
+        try:
+            for attempt in range(self.max_retries + 1):
+                self._local.attempt = attempt
+                try:
+                    return fn()
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    self.metrics.incr("llm_retries")
+                    # Full jitter keeps concurrent workers from retrying in lockstep.
+                    time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        finally:
+            self._local.attempt = 0
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> List[Any]:
+        """Apply ``fn`` to every item on the pool; results keep the input order."""
+        items = list(items)
+        if self.concurrency == 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(fn, items))
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"fake API error {status_code}")
+        self.status_code = status_code
+
+
+class FakeLLMClient:
+    """Offline stand-in for ``Mistral`` with configurable latency and failure rate.
+
+    Cleaning prompts (JSON or compact CSV) are answered by echoing the input
+    rows back as cleaned, anomaly prompts with no anomalies, and script
+    prompts with a no-op script.
+    Each call sleeps ``latency`` plus ``latency_per_1k_tokens`` per thousand
+    completion tokens, and estimated token usage is accumulated in
+    ``prompt_tokens``/``completion_tokens`` and returned as ``usage``.
+    """
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None,
+                 latency_per_1k_tokens: float = 0.0):
+        self.latency = latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(complete=self.complete)
+
+    def respond(self, model: str, messages: List[Dict[str, str]]) -> str:
+        prompt = messages[-1]["content"]
+        match = re.search(r"^Input Data Sample: (.*)$", prompt, re.MULTILINE)
+        if "'cleaned' and 'uncleaned'" in prompt and match:
+            return json.dumps({"cleaned": json.loads(match.group(1)), "uncleaned": []})
+        rows = re.search(r"^```csv\n(.*?)```", prompt, re.MULTILINE | re.DOTALL)
+        if "CLEANED" in prompt and rows:
+            header = rows.group(1).split("\n", 1)[0]
+            return f"CLEANED\n{rows.group(1)}UNCLEANED\n{header}\n"
+        if "'anomalies'" in prompt:
+            return json.dumps({"anomalies": []})
+        return "```python\nimport pandas as pd\n```"
+
+    def complete(self, model: str, messages: List[Dict[str, str]]) -> Any:
+        prompt_tokens = estimate_tokens(messages)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            fail = self._random.random() < self.failure_rate
+        if fail:
+            if self.latency:
+                time.sleep(self.latency)
+            raise FakeAPIError(429)
+        content = self.respond(model, messages)
+        completion_tokens = len(content) // 4 + 1
+        with self._lock:
+            self.completion_tokens += completion_tokens
+        delay = self.latency + self.latency_per_1k_tokens * completion_tokens / 1000
+        if delay:
+            time.sleep(delay)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
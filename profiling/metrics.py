@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional
+
+# A tracer is called as ``tracer(name, attributes={...})`` and returns a context
+# manager around the span, so OpenTelemetry's ``tracer.start_as_current_span``
+# can be passed in directly.
+Tracer = Callable[..., ContextManager[Any]]
+
+
+def _quantile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """Thread-safe run metrics: stage wall times, LLM calls, counters and gauges.
+
+    ``stage`` accumulates wall time per name (and opens a tracing span when a
+    tracer is set), ``record_llm_call`` keeps per-model aggregates plus the
+    first ``max_call_records`` individual calls, and ``incr``/``set`` hold
+    named counters and gauges. ``save`` writes ``run_metrics.json`` and,
+    optionally, the same numbers in Prometheus text format.
+    """
+
+    enabled = True
+
+    def __init__(self, tracer: Optional[Tracer] = None, max_call_records: int = 10_000):
+        self.tracer = tracer
+        self.max_call_records = max_call_records
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new run: clear everything recorded so far."""
+        self.started = time.time()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, Any] = {}
+        self.models: Dict[str, Dict[str, Any]] = {}
+        self.calls: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str, **attributes: Any) -> Iterator[None]:
+        span = self.tracer(name, attributes=attributes) if self.tracer else nullcontext()
+        start = time.perf_counter()
+        try:
+            with span:
+                yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                entry = self.stages.setdefault(name, {"seconds": 0.0, "count": 0})
+                entry["seconds"] += seconds
+                entry["count"] += 1
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    def record_llm_call(self, model: str, seconds: float, prompt_tokens: int, completion_tokens: int,
+                        attempt: int = 0, cached: bool = False, parse_seconds: float = 0.0,
+                        error: Optional[str] = None) -> None:
+        with self._lock:
+            stats = self.models.setdefault(model, {
+                "calls": 0, "cached": 0, "errors": 0, "retried_calls": 0, "seconds": 0.0, "parse_seconds": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0, "latencies": [],
+            })
+            stats["calls"] += 1
+            stats["cached"] += cached
+            stats["errors"] += error is not None
+            stats["retried_calls"] += attempt > 0
+            stats["seconds"] += seconds
+            stats["parse_seconds"] += parse_seconds
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            if not cached:
+                stats["latencies"].append(seconds)
+            if len(self.calls) < self.max_call_records:
+                self.calls.append({
+                    "model": model, "seconds": round(seconds, 6), "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens, "attempt": attempt, "cached": cached,
+                    "parse_seconds": round(parse_seconds, 6), "error": error,
+                })
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {}
+            for model, stats in self.models.items():
+                latencies = stats["latencies"]
+                models[model] = {
+                    **{k: v for k, v in stats.items() if k != "latencies"},
+                    "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+                    "latency_p50": _quantile(latencies, 0.5),
+                    "latency_p95": _quantile(latencies, 0.95),
+                    "latency_max": max(latencies) if latencies else None,
+                }
+            return {
+                "started": self.started,
+                "wall_seconds": time.time() - self.started,
+                "stages": {name: dict(entry) for name, entry in self.stages.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "llm": models,
+                "llm_calls": list(self.calls),
+            }
+
+    def to_prometheus(self, prefix: str = "profiling") -> str:
+        snap = self.snapshot()
+        lines = [f"# TYPE {prefix}_stage_seconds gauge"]
+        lines += [f'{prefix}_stage_seconds{{stage="{_label(name)}"}} {entry["seconds"]}' for name, entry in snap["stages"].items()]
+        series = [
+            ("llm_calls_total", "calls"), ("llm_cached_calls_total", "cached"), ("llm_errors_total", "errors"),
+            ("llm_retried_calls_total", "retried_calls"), ("llm_latency_seconds_sum", "seconds"),
+            ("llm_parse_seconds_sum", "parse_seconds"), ("llm_prompt_tokens_total", "prompt_tokens"),
+            ("llm_completion_tokens_total", "completion_tokens"),
+        ]
+        for metric, key in series:
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            lines += [f'{prefix}_{metric}{{model="{_label(model)}"}} {stats[key]}' for model, stats in snap["llm"].items()]
+        for name, value in snap["counters"].items():
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        for name, value in snap["gauges"].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def save(self, output_dir: str, prometheus: bool = False) -> None:
+        with open(f"{output_dir}/run_metrics.json", "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        if prometheus:
+            with open(f"{output_dir}/run_metrics.prom", "w") as f:
+                f.write(self.to_prometheus())
+
+
+class NullMetrics:
+    """Metrics stand-in used when metrics are disabled; every call is a no-op."""
+
+    enabled = False
+    _span = nullcontext()
+
+    def reset(self) -> None:
+        pass
+
+    def stage(self, name: str, **attributes: Any) -> ContextManager[None]:
+        return self._span
+
+    def incr(self, name: str, value: float = 1) -> None:
+        pass
+
+    def set(self, name: str, value: Any) -> None:
+        pass
+
+    def record_llm_call(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def save(self, output_dir: str, prometheus: bool = False) -> None:
+        pass
+
+
+NULL_METRICS = NullMetrics()
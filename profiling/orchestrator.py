@@ -1,30 +1,567 @@
 
+import json
+import os
+import shutil
+import threading
+import numpy as np
 import pandas as pd
+from .anomaly import AnomalyDetector
+from .cache import ResponseCache
 from .cleaning import ScriptGenerator
-from .utils import load_json, save_json
-from typing import Dict, Any
+from .duplicates import duplicate_anomalies, get_duplicate_finder
+from .llm import RunCancelled
+from .executor import get_engine
+from .incremental import KEY, IncrementalIndex
+from .metrics import NULL_METRICS, Metrics, Tracer
+from .profiler import DataProfiler
+from .scripts import ScriptRegistry, ScriptRunner
+from .storage import csv_to_ipc, merge_parquet, read_table, write_parquet
+from .utils import domd_hash, load_json, primary_key_columns, save_json
+from typing import Any, Callable, Dict, List, Optional
 
 
 class Orchestrator:
     """LLM Orchestrator for anomaly detection, cleaning, and script generation."""
 
-    def __init__(self, config: Dict[str, Any]):
-        self.llm = ScriptGenerator()
+    def __init__(self, config: Dict[str, Any], client: Any = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 tracer: Optional[Tracer] = None, cancel: Optional[threading.Event] = None):
+        self.config = config or {}
+        # Setting ``cancel`` stops the run before the next LLM call or chunk.
+        self.cancel = cancel
+        metrics_cfg = self.config.get("metrics") or {}
+        self.metrics = NULL_METRICS
+        if metrics_cfg.get("enabled", False):
+            self.metrics = Metrics(tracer=tracer, max_call_records=metrics_cfg.get("max_call_records", 10_000))
+        self.metrics_prometheus = metrics_cfg.get("prometheus", False)
+        llm_cfg = self.config.get("llm") or {}
+        self.batch_size = llm_cfg.get("batch_size", 5)
+        self.prevalidate = llm_cfg.get("prevalidate", False)
+        anomaly_cfg = self.config.get("anomaly") or {}
+        self.anomaly_mode = anomaly_cfg.get("mode", "whole")
+        self.anomaly_chunk_tokens = anomaly_cfg.get("chunk_tokens", 8000)
+        self.detector = AnomalyDetector(
+            model_dir=anomaly_cfg.get("model_dir"),
+            max_fit_rows=anomaly_cfg.get("max_fit_rows", 100_000),
+            n_jobs=anomaly_cfg.get("n_jobs", -1),
+        )
+        profile_cfg = self.config.get("profile") or {}
+        self.profile_enabled = profile_cfg.get("enabled", False) or self.anomaly_mode == "profile"
+        self.profile_top_k = profile_cfg.get("top_k", 10)
+        self.profile_in_prompts = profile_cfg.get("use_in_prompts", True)
+        pipeline_cfg = self.config.get("pipeline") or {}
+        self.streaming = pipeline_cfg.get("mode", "batch") == "streaming"
+        self.chunk_rows = pipeline_cfg.get("chunk_rows", 50000)
+        self.resume = pipeline_cfg.get("resume", True)
+        incremental_cfg = self.config.get("incremental") or {}
+        self.incremental = incremental_cfg.get("enabled", False)
+        self.incremental_dir = incremental_cfg.get("index_dir", ".cache/incremental")
+        self.incremental_feed = incremental_cfg.get("feed")
+        if self.incremental and self.streaming:
+            raise ValueError("incremental.enabled requires pipeline.mode: batch")
+        duplicates_cfg = self.config.get("duplicates") or {}
+        self.duplicates_enabled = duplicates_cfg.get("enabled", False)
+        self.duplicate_strategy = duplicates_cfg.get("strategy", "auto")
+        if self.duplicate_strategy == "auto":
+            self.duplicate_strategy = "partitioned" if self.streaming else "hash"
+        self.duplicate_options = {"partitions": duplicates_cfg.get("partitions", 64),
+                                  "spill_dir": duplicates_cfg.get("spill_dir")}
+        self.duplicate_pk: List[str] = []
+        self.progress = progress or self._print_progress
+        output_cfg = self.config.get("output") or {}
+        self.output_parquet = output_cfg.get("format", "csv") == "parquet"
+        self.output_csv = not self.output_parquet or output_cfg.get("export_csv", False)
+        self.intermediate = output_cfg.get("intermediate", "csv")
+        script_cfg = self.config.get("script") or {}
+        self.script_mode = script_cfg.get("mode", "llm")
+        self.script_runner = ScriptRunner(
+            ScriptRegistry(script_cfg.get("registry_dir", ".cache/scripts")),
+            timeout_s=script_cfg.get("timeout_s", 120),
+            workers=script_cfg.get("workers", 0),
+            partition_rows=script_cfg.get("partition_rows", 100_000),
+            memory_mb=script_cfg.get("memory_mb", 2048),
+            sample_rows=script_cfg.get("sample_rows", 1000),
+            min_valid_fraction=script_cfg.get("min_valid_fraction", 0.99),
+        )
+        self.engine = get_engine(self.config)
+        cache_cfg = self.config.get("cache") or {}
+        self.cache = None
+        if cache_cfg.get("enabled", False):
+            ttl_days = cache_cfg.get("ttl_days")
+            self.cache = ResponseCache(
+                cache_cfg.get("path", ".cache/llm_responses.sqlite"),
+                max_entries=cache_cfg.get("max_entries"),
+                max_bytes=cache_cfg.get("max_mb") and int(cache_cfg["max_mb"] * 1024 * 1024),
+                ttl_seconds=ttl_days * 86400 if ttl_days else None,
+                bypass=cache_cfg.get("bypass", False),
+            )
+        self._cache_start: Dict[str, int] = {}
+        self.llm = ScriptGenerator(
+            client=client,
+            concurrency=llm_cfg.get("concurrency", 1),
+            requests_per_minute=llm_cfg.get("requests_per_minute"),
+            tokens_per_minute=llm_cfg.get("tokens_per_minute"),
+            max_retries=llm_cfg.get("max_retries", 3),
+            cache=self.cache,
+            engine=self.engine,
+            metrics=self.metrics,
+            cancel=cancel,
+            prompt_format=llm_cfg.get("prompt_format", "json"),
+            batch_tokens=llm_cfg.get("batch_tokens"),
+            max_batch_rows=llm_cfg.get("max_batch_rows"),
+        )
+
+    def _detect_anomalies(self, df: pd.DataFrame, domd: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.anomaly_mode == "profile":
+            return []  # column-level, run once on the finished profile
+        if self.anomaly_mode == "local":
+            return self.detector.detect_records(df, domd)
+        if self.anomaly_mode == "chunked":
+            return self.llm.detect_anomalies_chunked(df, domd, max_tokens=self.anomaly_chunk_tokens)
+        return self.llm.detect_anomalies(df, domd)
+
+    def _find_duplicates(self, domd: Dict[str, Any], frames, keys_only: bool = False) -> Optional[pd.DataFrame]:
+        """Duplicate primary-key rows of the input, fed as ``(offset, frame)`` pairs in file order.
+
+        None when duplicate detection is off or the DOMD has no primary key.
+        With ``keys_only`` the frames hold just the key columns and
+        ``conflicting`` is left for ``_flag_conflicts`` to fill in.
+        """
+        if not self.duplicates_enabled:
+            return None
+        finder = get_duplicate_finder(domd, self.duplicate_strategy, keys_only=keys_only, **self.duplicate_options)
+        if finder is None:
+            return None
+        try:
+            with self.metrics.stage("detect_duplicates", strategy=self.duplicate_strategy):
+                for offset, frame in frames:
+                    finder.add(frame, offset)
+                dups = finder.result()
+        finally:
+            finder.close()
+        if not keys_only:
+            self.metrics.incr("duplicate_rows_exact", int((~dups["conflicting"]).sum()))
+            self.metrics.incr("duplicate_rows_conflicting", int(dups["conflicting"].sum()))
+        self.duplicate_pk = finder.pk
+        return dups
+
+    def _flag_conflicts(self, dups: pd.DataFrame, hasher, chunk: pd.DataFrame, start: int,
+                        first_hashes: Dict[int, int], counts: Dict[str, Any]) -> pd.Series:
+        """Set ``conflicting`` for the duplicates in ``chunk`` (file rows ``start`` onwards).
+
+        Streaming finds duplicates from the key columns alone, so rows are
+        compared here by content hash against their first occurrence.
+        ``first_hashes`` holds the hashes of first occurrences seen so far and
+        is extended with this chunk's, which are also returned for the
+        checkpoint. ``counts`` accumulates the summary's exact/conflicting.
+        """
+        hashes = hasher.content_hashes(chunk, start)
+        firsts = hashes[hashes.index.isin(dups["first_row"].to_numpy())]
+        first_hashes.update(zip(firsts.index.tolist(), firsts.tolist()))
+        lo, hi = np.searchsorted(dups["row"].to_numpy(), [start, start + len(chunk)])
+        if hi > lo:
+            block = dups.iloc[lo:hi]
+            conflicting = hashes.loc[block["row"].to_numpy()].to_numpy() != np.array(
+                [first_hashes[row] for row in block["first_row"].tolist()], dtype=np.int64)
+            dups.iloc[lo:hi, dups.columns.get_loc("conflicting")] = conflicting
+            counts["conflicting"] += int(conflicting.sum())
+            counts["exact"] += int((~conflicting).sum())
+            self.metrics.incr("duplicate_rows_exact", int((~conflicting).sum()))
+            self.metrics.incr("duplicate_rows_conflicting", int(conflicting.sum()))
+        return firsts
+
+    def _split_duplicates(self, df: pd.DataFrame, dups: Optional[pd.DataFrame], start: int = 0):
+        """Split ``df`` (file rows ``start`` onwards) into ``(kept, duplicates, kept_rows, anomalies)``.
+
+        ``kept_rows`` maps positions in ``kept`` back to ``df`` (None if nothing
+        was removed); the anomalies point at file rows.
+        """
+        if dups is None:
+            return df, pd.DataFrame(), None, []
+        lo, hi = np.searchsorted(dups["row"].to_numpy(), [start, start + len(df)])
+        if lo == hi:
+            return df, pd.DataFrame(), None, []
+        is_dup = np.zeros(len(df), dtype=bool)
+        is_dup[dups["row"].to_numpy()[lo:hi] - start] = True
+        anomalies = duplicate_anomalies(dups.iloc[lo:hi], self.duplicate_pk)
+        return (df[~is_dup].reset_index(drop=True), df[is_dup].reset_index(drop=True),
+                np.flatnonzero(~is_dup), anomalies)
+
+    @staticmethod
+    def _remap_rows(anomalies: List[Dict[str, Any]], kept_rows: Optional[np.ndarray], start: int = 0) -> None:
+        """Point row anomalies found on a duplicate-free frame at their file rows."""
+        for anomaly in anomalies:
+            row = anomaly.get("row")
+            if isinstance(row, int):
+                if kept_rows is not None and 0 <= row < len(kept_rows):
+                    row = int(kept_rows[row])
+                anomaly["row"] = row + start
+
+    @staticmethod
+    def _remap_failures(failures: List[Dict[str, Any]], kept_rows: Optional[np.ndarray],
+                        start: int = 0) -> List[Dict[str, Any]]:
+        """``_remap_rows`` for the row ranges of failed anomaly chunks."""
+        remapped = []
+        for failure in failures:
+            first, end = failure["start_row"], failure["end_row"]
+            if kept_rows is not None and 0 <= first < end <= len(kept_rows):
+                first, end = int(kept_rows[first]), int(kept_rows[end - 1]) + 1
+            remapped.append({**failure, "start_row": first + start, "end_row": end + start})
+        return remapped
+
+    @staticmethod
+    def _duplicate_summary(dups: pd.DataFrame, strategy: str) -> Dict[str, Any]:
+        conflicting = int(dups["conflicting"].sum())
+        return {"strategy": strategy, "exact": len(dups) - conflicting, "conflicting": conflicting}
+
+    def _resolve_script(self, df: pd.DataFrame, domd: Dict[str, Any],
+                        profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Registry script for compiled mode (generated once per DOMD); ``code`` is None on fallback."""
+        prompt_profile = profile if self.profile_in_prompts else None
+        # Uncached: a cached response would replay a script the registry already rejected.
+        version, code, checks = self.script_runner.resolve(
+            df, domd, lambda: self.llm.generate_cleaning_script(domd, profile=prompt_profile, use_cache=False))
+        if code is None:
+            print(f"Cleaning script failed validation, falling back to LLM cleaning: {checks.get('error', checks)}")
+        return {"version": version, "code": code, "checks": checks}
+
+    def _clean(self, df: pd.DataFrame, domd: Dict[str, Any], script: Optional[Dict[str, Any]],
+               tag: Optional[str] = None):
+        if script and script["code"] is not None:
+            return self.llm.clean_data_with_script(df, domd, self.script_runner, script["code"],
+                                                   batch_size=self.batch_size, prevalidate=self.prevalidate, tag=tag)
+        return self.llm.clean_data(df, domd, batch_size=self.batch_size, prevalidate=self.prevalidate, tag=tag)
+
+    def _write_script(self, domd: Dict[str, Any], profile: Optional[Dict[str, Any]],
+                      script: Optional[Dict[str, Any]], output_dir: str) -> None:
+        if script and script["code"] is not None:
+            code = script["code"]  # already generated for this DOMD; no extra LLM call
+        else:
+            with self.metrics.stage("generate_script"):
+                code = self.llm.generate_cleaning_script(domd, profile=profile if self.profile_in_prompts else None)
+        with open(f"{output_dir}/cleaning_script.py", "w") as f:
+            f.write(code)
+
+    def _cache_summary(self) -> Optional[Dict[str, Any]]:
+        """Response cache hits/misses/writes/evictions of this run, or None without a cache."""
+        if self.cache is None:
+            return None
+        stats = {k: v - self._cache_start.get(k, 0) for k, v in self.cache.snapshot().items()}
+        lookups = stats["hits"] + stats["misses"]
+        return {**stats, "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None}
+
+    def _count_rows(self, rows_in: int, clean_df: pd.DataFrame, unclean_df: pd.DataFrame) -> None:
+        self.metrics.incr("rows_in", rows_in)
+        self.metrics.incr("rows_cleaned", len(clean_df))
+        self.metrics.incr("rows_unclean", len(unclean_df))
+
+    def _load_input(self, csv_path: str, output_dir: str) -> pd.DataFrame:
+        if self.intermediate == "arrow":
+            # Parsed once into input.arrow; later runs on the same file memory-map it.
+            return read_table(csv_to_ipc(csv_path, f"{output_dir}/input.arrow"))
+        return self.engine.load_csv(csv_path)
+
+    def _remove_stale_outputs(self, output_dir: str) -> None:
+        """Drop output files of a format this run does not write, so readers never pick up old results."""
+        for name in ("clean_data", "unclean_data"):
+            for ext, written in ((".parquet", self.output_parquet), (".csv", self.output_csv)):
+                if not written and os.path.exists(f"{output_dir}/{name}{ext}"):
+                    os.remove(f"{output_dir}/{name}{ext}")
+
+    def _save_output(self, df: pd.DataFrame, output_dir: str, name: str) -> None:
+        if self.output_parquet:
+            write_parquet(df, f"{output_dir}/{name}.parquet")
+        if self.output_csv:
+            self.engine.save_csv(df, f"{output_dir}/{name}.csv")
 
     def run(self, domd_path: str, csv_path: str, output_dir: str) -> None:
+        """Run the pipeline; ``run_metrics.json`` is written even if a stage fails.
+
+        Failing to write the metrics is only reported, so it never replaces the
+        exception of a failed run.
+        """
+        self.metrics.reset()
+        self._cache_start = self.cache.snapshot() if self.cache is not None else {}
+        try:
+            with self.metrics.stage("run", mode="streaming" if self.streaming else "batch"):
+                if self.streaming:
+                    return self.run_streaming(domd_path, csv_path, output_dir)
+                return self.run_batch(domd_path, csv_path, output_dir)
+        finally:
+            for name, value in (self._cache_summary() or {}).items():
+                self.metrics.set(f"cache_{name}", value)
+            try:
+                self.metrics.save(output_dir, prometheus=self.metrics_prometheus)
+            except Exception as e:
+                print(f"Could not save run metrics to {output_dir}: {e}")
+
+    def run_batch(self, domd_path: str, csv_path: str, output_dir: str) -> None:
         domd = load_json(domd_path)
-        df = pd.read_csv(csv_path)
+        # Read as text so DOMD length/padding checks see leading zeros as delivered.
+        with self.metrics.stage("load_csv"):
+            df = self._load_input(csv_path, output_dir)
+
+        profile = None
+        if self.profile_enabled:
+            with self.metrics.stage("profile"):
+                profile = DataProfiler(domd, self.profile_top_k).update(df).result()
+            save_json(profile, f"{output_dir}/profile.json")
+
+        # Primary-key duplicates (every occurrence after the first) skip the
+        # LLM stages and go straight to unclean_data.
+        rows_in = len(df)
+        dups = self._find_duplicates(domd, [(0, df)])
+        df, dup_df, kept_rows, dup_anomalies = self._split_duplicates(df, dups)
+
+        # Incremental mode: only rows that are new or changed since the last
+        # run of this feed and DOMD go through detection and cleaning.
+        index, plan, work = None, None, df
+        if self.incremental:
+            feed = self.incremental_feed or os.path.splitext(os.path.basename(csv_path))[0]
+            index = IncrementalIndex(self.incremental_dir, domd, feed)
+        try:
+            if index is not None:
+                plan = index.plan(df)
+                work = df[plan["process"]].reset_index(drop=True)
+                print(f"Incremental run: {plan['stats']}")
 
-        # 1. Anomaly detection by LLM
-        anomalies = self.llm.detect_anomalies(df, domd)
+            # 1. Anomaly detection by LLM
+            with self.metrics.stage("detect_anomalies", mode=self.anomaly_mode):
+                anomalies = self._detect_anomalies(work, domd) if len(work) or index is None else []
+                if self.anomaly_mode == "profile":
+                    anomalies = self.llm.detect_anomalies_from_profile(profile, domd)
+
+            # 2. Data cleaning by LLM, or by the compiled cleaning script
+            with self.metrics.stage("clean_data"):
+                script = self._resolve_script(df, domd, profile) if self.script_mode == "compiled" else None
+                if index is None:
+                    clean_df, unclean_df = self._clean(df, domd, script)
+                else:
+                    self.llm.routing_stats = {"rows_in": 0, "skipped_llm": 0, "sent_to_llm": 0}
+                    clean_df, unclean_df = pd.DataFrame(columns=[KEY]), pd.DataFrame(columns=[KEY])
+                    if len(work):
+                        keyed = work.assign(**{KEY: plan["keys"][plan["process"]].to_numpy()})
+                        clean_df, unclean_df = self._clean(keyed, domd, script, tag=KEY)
+                    index.update(plan, clean_df, unclean_df, anomalies)
+                    clean_df, unclean_df, anomalies = index.outputs(plan)
+        finally:
+            if index is not None:
+                index.close()
+        self._remap_rows(anomalies, kept_rows)
+        anomalies += dup_anomalies
+        if not dup_df.empty:
+            unclean_df = pd.concat([unclean_df, dup_df], ignore_index=True)
+        self.metrics.incr("anomalies", len(anomalies))
         save_json({"anomalies": anomalies}, f"{output_dir}/anomalies.json")
+        self._count_rows(rows_in, clean_df, unclean_df)
+        with self.metrics.stage("save_outputs"):
+            self._remove_stale_outputs(output_dir)
+            self._save_output(clean_df, output_dir, "clean_data")
+            self._save_output(unclean_df, output_dir, "unclean_data")
+        failure_rows = kept_rows
+        if plan is not None:
+            # Failed anomaly chunks are row ranges of ``work``, the processed rows of ``df``.
+            failure_rows = np.flatnonzero(plan["process"])
+            if kept_rows is not None:
+                failure_rows = kept_rows[failure_rows]
+        summary = {**self.llm.routing_stats,
+                   "anomaly_chunk_failures": self._remap_failures(self.llm.anomaly_failures, failure_rows)}
+        if plan is not None:
+            summary["incremental"] = plan["stats"]
+        if dups is not None:
+            summary["duplicates"] = self._duplicate_summary(dups, self.duplicate_strategy)
+        if script:
+            summary["cleaning_script"] = {"version": script["version"], "checks": script["checks"]}
 
-        # 2. Data cleaning by LLM
-        clean_df, unclean_df = self.llm.clean_data(df, domd)
-        clean_df.to_csv(f"{output_dir}/clean_data.csv", index=False)
-        unclean_df.to_csv(f"{output_dir}/unclean_data.csv", index=False)
+        # 3. Cleaning script (LLM-generated backup, or the registry script that ran)
+        self._write_script(domd, profile, script, output_dir)
+        if self.cache is not None:
+            summary["cache"] = self._cache_summary()
+        save_json(summary, f"{output_dir}/run_summary.json")
 
-        # 3. Generate cleaning script by LLM (for backup)
-        script = self.llm.generate_cleaning_script(domd)
-        with open(f"{output_dir}/cleaning_script.py", "w") as f:
-            f.write(script)
\ No newline at end of file
+    @staticmethod
+    def _print_progress(event: Dict[str, Any]) -> None:
+        print(f"Chunk {event['chunk']} done: rows {event['start_row']}-{event['end_row'] - 1}, "
+              f"{event['rows_done']} rows processed so far")
+
+    def run_streaming(self, domd_path: str, csv_path: str, output_dir: str) -> None:
+        """Process the CSV ``chunk_rows`` rows at a time, appending each chunk's
+        results to the outputs, so memory depends on the chunk size only.
+
+        After every chunk the output file sizes are checkpointed in
+        ``stream_state.json``; a rerun over the same input and DOMD truncates
+        any partial writes and resumes after the last completed chunk.
+        Parquet output is written as one part file per chunk under ``.parts``
+        and merged into a single file at the end.
+        """
+        domd = load_json(domd_path)
+        clean_path = f"{output_dir}/clean_data.csv"
+        unclean_path = f"{output_dir}/unclean_data.csv"
+        anomalies_part = f"{output_dir}/anomalies.jsonl.part"
+        state_path = f"{output_dir}/stream_state.json"
+        parts_dir = f"{output_dir}/.parts"
+        dups_path = f"{parts_dir}/duplicates.npy"
+        outputs = ([clean_path, unclean_path] if self.output_csv else []) + [anomalies_part]
+        pk = primary_key_columns(domd) if self.duplicates_enabled else []
+        # Per-chunk part files, removed from the chunk a resume restarts at.
+        part_dirs = ([f"{parts_dir}/clean_data", f"{parts_dir}/unclean_data"] if self.output_parquet else []) + \
+                    ([f"{parts_dir}/first_hashes"] if pk else [])
+
+        stat = os.stat(csv_path)
+        fingerprint = {
+            "csv": os.path.abspath(csv_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "domd": domd_hash(domd),
+            "chunk_rows": self.chunk_rows,
+            "formats": {"parquet": self.output_parquet, "csv": self.output_csv},
+            "duplicates": self.duplicate_strategy if pk else None,
+        }
+        state = load_json(state_path) if self.resume and os.path.exists(state_path) else None
+        profiler = DataProfiler(domd, self.profile_top_k) if self.profile_enabled else None
+        if state and state.get("fingerprint") == fingerprint:
+            for path in outputs:
+                with open(path, "a") as f:
+                    f.truncate(state["sizes"][path])
+            if profiler is not None and state.get("profiler"):
+                profiler = DataProfiler.from_dict(state["profiler"], domd)
+            for part_dir in part_dirs:
+                for part in os.listdir(part_dir):
+                    if int(part.split("-")[1].split(".")[0]) >= state["chunks_done"]:
+                        os.remove(f"{part_dir}/{part}")
+        else:
+            for path in outputs:
+                open(path, "w").close()
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            for part_dir in part_dirs:
+                os.makedirs(part_dir)
+            state = {
+                "fingerprint": fingerprint,
+                "chunks_done": 0,
+                "sizes": {path: 0 for path in outputs},
+                "summary": {"rows_in": 0, "skipped_llm": 0, "sent_to_llm": 0, "anomaly_chunk_failures": []},
+            }
+            if pk:
+                state["duplicates"] = {"strategy": self.duplicate_strategy, "exact": 0, "conflicting": 0}
+
+        names = [c["name"] for c in domd["columns"]]
+        dups, hasher, first_hashes = None, None, {}
+        if pk and os.path.exists(dups_path):
+            # Saved by the run being resumed, so the file is not scanned again.
+            dups = pd.DataFrame(np.load(dups_path), columns=["row", "first_row"]).assign(conflicting=False)
+            self.duplicate_pk = pk
+            for part in sorted(os.listdir(f"{parts_dir}/first_hashes")):
+                rows, hashes = np.load(f"{parts_dir}/first_hashes/{part}")
+                first_hashes.update(zip(rows.tolist(), hashes.tolist()))
+        elif pk:
+            # Duplicates need the whole file, so a pre-pass over the key columns
+            # finds them before the first chunk; rows are compared chunk by chunk.
+            dups = self._find_duplicates(domd, (
+                (int(c.index[0]), c) for c in pd.read_csv(csv_path, dtype=str, usecols=pk, chunksize=self.chunk_rows)
+            ), keys_only=True)
+            with open(f"{dups_path}.tmp", "wb") as f:
+                np.save(f, dups[["row", "first_row"]].to_numpy(dtype=np.int64))
+            os.replace(f"{dups_path}.tmp", dups_path)
+        if dups is not None:
+            hasher = get_duplicate_finder(domd)
+        script = None
+        for i, chunk in enumerate(pd.read_csv(csv_path, dtype=str, chunksize=self.chunk_rows)):
+            if i < state["chunks_done"]:
+                continue
+            if self.cancel is not None and self.cancel.is_set():
+                raise RunCancelled()
+            start = int(chunk.index[0])
+            chunk = chunk.reset_index(drop=True)
+            columns = names + [c for c in chunk.columns if c not in names]
+
+            if profiler is not None:
+                with self.metrics.stage("profile"):
+                    profiler.update(chunk)
+            rows_in = len(chunk)
+            if dups is not None:
+                with self.metrics.stage("detect_duplicates", strategy=self.duplicate_strategy):
+                    firsts = self._flag_conflicts(dups, hasher, chunk, start, first_hashes,
+                                                  state["duplicates"])
+                np.save(f"{parts_dir}/first_hashes/part-{i:05d}.npy",
+                        np.array([firsts.index.to_numpy(), firsts.to_numpy()], dtype=np.int64))
+            chunk, dup_df, kept_rows, dup_anomalies = self._split_duplicates(chunk, dups, start)
+            with self.metrics.stage("detect_anomalies", mode=self.anomaly_mode):
+                anomalies = self._detect_anomalies(chunk, domd) if len(chunk) else []
+                if not len(chunk):
+                    self.llm.anomaly_failures = []
+            self._remap_rows(anomalies, kept_rows, start)
+            anomalies += dup_anomalies
+            self.metrics.incr("anomalies", len(anomalies))
+            with self.metrics.stage("clean_data"):
+                if self.script_mode == "compiled" and script is None:
+                    script = self._resolve_script(chunk, domd, None)
+                    state["summary"]["cleaning_script"] = {"version": script["version"], "checks": script["checks"]}
+                clean_df, unclean_df = self._clean(chunk, domd, script)
+            if not dup_df.empty:
+                unclean_df = pd.concat([unclean_df, dup_df], ignore_index=True)
+            self._count_rows(rows_in, clean_df, unclean_df)
+
+            with self.metrics.stage("save_outputs"):
+                for df, name in [(clean_df, "clean_data"), (unclean_df, "unclean_data")]:
+                    if self.output_parquet:
+                        write_parquet(df, f"{parts_dir}/{name}/part-{i:05d}.parquet", columns)
+                    if self.output_csv:
+                        path = f"{output_dir}/{name}.csv"
+                        df.reindex(columns=columns).to_csv(path, mode="a", index=False, header=os.path.getsize(path) == 0)
+            with open(anomalies_part, "a") as f:
+                for anomaly in anomalies:
+                    f.write(json.dumps(anomaly) + "\n")
+
+            summary = state["summary"]
+            for key in ("rows_in", "skipped_llm", "sent_to_llm", "script_rows", "llm_requests", "prompt_tokens_estimated"):
+                if key in self.llm.routing_stats:
+                    summary[key] = summary.get(key, 0) + self.llm.routing_stats[key]
+            if "max_prompt_tokens_estimated" in self.llm.routing_stats:
+                summary["max_prompt_tokens_estimated"] = max(summary.get("max_prompt_tokens_estimated", 0),
+                                                             self.llm.routing_stats["max_prompt_tokens_estimated"])
+                summary["prompt_tokens_per_row"] = (round(summary["prompt_tokens_estimated"] / summary["sent_to_llm"], 1)
+                                                    if summary["sent_to_llm"] else None)
+            summary["anomaly_chunk_failures"].extend(self._remap_failures(self.llm.anomaly_failures, kept_rows, start))
+            state["chunks_done"] = i + 1
+            state["sizes"] = {path: os.path.getsize(path) for path in outputs}
+            if profiler is not None:
+                # Checkpointed with the state so both always describe the same chunks.
+                state["profiler"] = profiler.to_dict()
+            save_json(state, f"{state_path}.tmp")
+            os.replace(f"{state_path}.tmp", state_path)
+            self.progress({"chunk": i, "start_row": start, "end_row": start + rows_in, "rows_done": start + rows_in})
+
+        self._remove_stale_outputs(output_dir)
+        if self.output_parquet:
+            with self.metrics.stage("save_outputs"):
+                for name in ("clean_data", "unclean_data"):
+                    parts = sorted(os.listdir(f"{parts_dir}/{name}"))
+                    if parts:
+                        merge_parquet([f"{parts_dir}/{name}/{part}" for part in parts], f"{output_dir}/{name}.parquet")
+                    else:
+                        write_parquet(pd.DataFrame(), f"{output_dir}/{name}.parquet", names)
+
+        profile = None
+        if profiler is not None:
+            profile = profiler.result()
+            save_json(profile, f"{output_dir}/profile.json")
+            if self.anomaly_mode == "profile":
+                with self.metrics.stage("detect_anomalies", mode=self.anomaly_mode), open(anomalies_part, "a") as f:
+                    for anomaly in self.llm.detect_anomalies_from_profile(profile, domd):
+                        f.write(json.dumps(anomaly) + "\n")
+
+        with open(f"{output_dir}/anomalies.json", "w") as out, open(anomalies_part) as part:
+            out.write('{\n  "anomalies": [')
+            for n, line in enumerate(part):
+                out.write(("," if n else "") + "\n    " + line.rstrip("\n"))
+            out.write("\n  ]\n}")
+        if dups is not None:
+            state["summary"]["duplicates"] = state["duplicates"]
+        self._write_script(domd, profile, script, output_dir)
+        if self.cache is not None:
+            # This process's lookups only; a resumed run does not carry them over.
+            state["summary"]["cache"] = self._cache_summary()
+        save_json(state["summary"], f"{output_dir}/run_summary.json")
+        os.remove(anomalies_part)
+        os.remove(state_path)
+        shutil.rmtree(parts_dir, ignore_errors=True)
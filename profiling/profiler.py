@@ -1,17 +1,357 @@
+import io
+import os
+import numpy as np
 import pandas as pd
-from typing import Dict, Any
+from collections import Counter
+from typing import Dict, Any, Iterable, List, Optional
+from .utils import process_pool
+
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.99]
+
+
+def _finite(x: float) -> Optional[float]:
+    """``x`` for a JSON state, with the empty-sketch infinities stored as None."""
+    return None if np.isinf(x) else float(x)
+
+
+def _bound(x: Optional[float], empty: float) -> float:
+    return empty if x is None else float(x)
+
+
+class Moments:
+    """Count, mean and sum of squared deviations (Welford/Chan), mergeable."""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max = np.inf, -np.inf
+
+    def update(self, x: np.ndarray) -> None:
+        if len(x):
+            other = Moments()
+            other.n, other.mean = len(x), float(x.mean())
+            other.m2 = float(((x - other.mean) ** 2).sum())
+            other.min, other.max = float(x.min()), float(x.max())
+            self.merge(other)
+
+    def merge(self, other: "Moments") -> None:
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+
+    @property
+    def std(self) -> Optional[float]:
+        return (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.n, "mean": self.mean, "m2": self.m2, "min": _finite(self.min), "max": _finite(self.max)}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "Moments":
+        moments = cls()
+        moments.n, moments.mean, moments.m2 = int(state["n"]), float(state["mean"]), float(state["m2"])
+        moments.min, moments.max = _bound(state["min"], np.inf), _bound(state["max"], -np.inf)
+        return moments
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit pandas value hashes; merge is a register max."""
+
+    def __init__(self, p: int = 12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, s: pd.Series) -> None:
+        if len(s) == 0:
+            return
+        h = pd.util.hash_pandas_object(s, index=False).to_numpy(dtype=np.uint64)
+        idx = (h >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = h & np.uint64((1 << (64 - self.p)) - 1)
+        bits = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bits[nonzero] = np.floor(np.log2(rest[nonzero].astype(np.float64))).astype(np.int64) + 1
+        rank = (64 - self.p) - bits + 1
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = float(len(self.registers))
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "registers": self.registers.tolist()}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        hll = cls(state["p"])
+        hll.registers = np.asarray(state["registers"], dtype=np.uint8)
+        return hll
+
+
+class TDigest:
+    """Merging t-digest (k1 scale) for approximate quantiles; compression is vectorized."""
+
+    def __init__(self, delta: int = 200):
+        self.delta = delta
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min, self.max = np.inf, -np.inf
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = np.floor(self.delta / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1)))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def update(self, x: np.ndarray) -> None:
+        if len(x):
+            self.min, self.max = min(self.min, float(x.min())), max(self.max, float(x.max()))
+            self._compress(np.r_[self.means, x], np.r_[self.weights, np.ones(len(x))])
+
+    def merge(self, other: "TDigest") -> None:
+        if len(other.weights):
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+            self._compress(np.r_[self.means, other.means], np.r_[self.weights, other.weights])
+
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        if not len(self.weights):
+            return [None] * len(qs)
+        total = self.weights.sum()
+        mids = np.cumsum(self.weights) - self.weights / 2
+        xp = np.r_[0.0, mids, total]
+        fp = np.r_[self.min, self.means, self.max]
+        return [float(v) for v in np.interp(np.asarray(qs) * total, xp, fp)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"delta": self.delta, "means": self.means.tolist(), "weights": self.weights.tolist(),
+                "min": _finite(self.min), "max": _finite(self.max)}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "TDigest":
+        digest = cls(state["delta"])
+        digest.means = np.asarray(state["means"], dtype=np.float64)
+        digest.weights = np.asarray(state["weights"], dtype=np.float64)
+        digest.min, digest.max = _bound(state["min"], np.inf), _bound(state["max"], -np.inf)
+        return digest
+
+
+class ColumnSketch:
+    """All single-pass statistics for one column; every part merges."""
+
+    def __init__(self, numeric: bool, top_k: int = 10):
+        self.numeric = numeric
+        self.top_k = top_k
+        self.rows = 0
+        self.missing = 0
+        self.moments = Moments()
+        self.digest = TDigest()
+        self.hll = HyperLogLog()
+        self.top: Counter = Counter()
+        self.min_length: Optional[int] = None
+        self.max_length: Optional[int] = None
+
+    def update(self, s: pd.Series) -> None:
+        self.rows += len(s)
+        present = s.dropna()
+        self.missing += len(s) - len(present)
+        if present.empty:
+            return
+        self.hll.update(present)
+        text = present.astype(str)
+        lengths = text.str.len()
+        self.min_length = int(lengths.min()) if self.min_length is None else min(self.min_length, int(lengths.min()))
+        self.max_length = int(lengths.max()) if self.max_length is None else max(self.max_length, int(lengths.max()))
+        # Keep a generous candidate list so merged top-k stays close to exact
+        # for skewed columns; near-uniform columns only get approximate counts.
+        self._merge_top(Counter(text.value_counts().head(self.top_k * 100).to_dict()))
+        if self.numeric:
+            x = pd.to_numeric(present, errors="coerce").dropna().to_numpy(dtype=np.float64)
+            self.moments.update(x)
+            self.digest.update(x)
+
+    def _merge_top(self, counts: Counter) -> None:
+        self.top.update(counts)
+        if len(self.top) > self.top_k * 100:
+            self.top = Counter(dict(self.top.most_common(self.top_k * 100)))
+
+    def merge(self, other: "ColumnSketch") -> None:
+        self.rows += other.rows
+        self.missing += other.missing
+        self.moments.merge(other.moments)
+        self.digest.merge(other.digest)
+        self.hll.merge(other.hll)
+        self._merge_top(other.top)
+        for attr, pick in (("min_length", min), ("max_length", max)):
+            mine, theirs = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, theirs if mine is None else mine if theirs is None else pick(mine, theirs))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable state; ``from_dict`` rebuilds an identical sketch."""
+        return {
+            "numeric": self.numeric,
+            "top_k": self.top_k,
+            "rows": self.rows,
+            "missing": self.missing,
+            "moments": self.moments.to_dict(),
+            "digest": self.digest.to_dict(),
+            "hll": self.hll.to_dict(),
+            "top": [[v, c] for v, c in self.top.items()],
+            "min_length": self.min_length,
+            "max_length": self.max_length,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "ColumnSketch":
+        sketch = cls(state["numeric"], state["top_k"])
+        sketch.rows, sketch.missing = state["rows"], state["missing"]
+        sketch.moments = Moments.from_dict(state["moments"])
+        sketch.digest = TDigest.from_dict(state["digest"])
+        sketch.hll = HyperLogLog.from_dict(state["hll"])
+        sketch.top = Counter({v: c for v, c in state["top"]})
+        sketch.min_length, sketch.max_length = state["min_length"], state["max_length"]
+        return sketch
+
+    def result(self) -> Dict[str, Any]:
+        out = {
+            "rows": self.rows,
+            "missing": self.missing,
+            "unique": self.hll.count() if self.rows > self.missing else 0,
+            "min_length": self.min_length,
+            "max_length": self.max_length,
+            "top_values": [[v, c] for v, c in self.top.most_common(self.top_k)],
+            "mean": None,
+            "std": None,
+        }
+        if self.numeric and self.moments.n:
+            out.update({
+                "numeric_count": self.moments.n,
+                "mean": self.moments.mean,
+                "std": self.moments.std,
+                "min": self.moments.min,
+                "max": self.moments.max,
+                "quantiles": dict(zip([f"p{int(q * 100):02d}" for q in QUANTILES], self.digest.quantiles(QUANTILES))),
+            })
+        return out
+
+
+def _sketch_chunk(args):
+    profiler, df = args
+    profiler.update(df)
+    return profiler
+
+
+def _sketch_byte_range(args):
+    """Sketch the CSV lines that start inside ``[start, end)``, parsed in ~block-sized pieces."""
+    profiler, path, names, start, end, block = args
+    with open(path, "rb") as f:
+        f.seek(max(start - 1, 0))
+        if start > 0:
+            f.readline()  # finish the line that straddles ``start``; its owner parses it
+        while f.tell() < end:
+            data = f.read(min(block, end - f.tell()))
+            if not data.endswith(b"\n"):
+                data += f.readline()  # complete the last line
+            profiler.update(pd.read_csv(io.BytesIO(data), header=None, names=names, dtype=str))
+    return profiler
+
 
 class DataProfiler:
-    """Statistical & rule-based data profiler."""
+    """Statistical & rule-based data profiler built on mergeable sketches.
 
-    def profile(self, df: pd.DataFrame, schema: Dict[str, Any]) -> Dict[str, Any]:
-        profile = {}
+    Feed it chunks with ``update`` (or several profilers' results with
+    ``merge``) and read the profile with ``result``; ``profile`` does both for
+    an in-memory frame. DOMD integer/float columns are profiled numerically.
+    """
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None, top_k: int = 10):
+        self.schema = schema
+        self.top_k = top_k
+        self.types = {c["name"]: c.get("type") for c in (schema or {}).get("columns", [])}
+        self.columns: Dict[str, ColumnSketch] = {}
+
+    def _is_numeric(self, name: str, s: pd.Series) -> bool:
+        if name in self.types:
+            return self.types[name] in ("integer", "float")
+        return pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+
+    def update(self, df: pd.DataFrame) -> "DataProfiler":
         for col in df.columns:
-            profile[col] = {
-                "type": str(df[col].dtype),
-                "missing": int(df[col].isnull().sum()),
-                "unique": int(df[col].nunique()),
-                "mean": float(df[col].mean()) if pd.api.types.is_numeric_dtype(df[col]) else None,
-                "std": float(df[col].std()) if pd.api.types.is_numeric_dtype(df[col]) else None,
-            }
-        return profile
\ No newline at end of file
+            if col not in self.columns:
+                self.columns[col] = ColumnSketch(self._is_numeric(col, df[col]), self.top_k)
+            self.columns[col].update(df[col])
+        return self
+
+    def merge(self, other: "DataProfiler") -> "DataProfiler":
+        for col, sketch in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(sketch)
+            else:
+                self.columns[col] = sketch
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable sketch state (the schema is not included)."""
+        return {"top_k": self.top_k, "columns": {col: sketch.to_dict() for col, sketch in self.columns.items()}}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any], schema: Optional[Dict[str, Any]] = None) -> "DataProfiler":
+        profiler = cls(schema, state["top_k"])
+        profiler.columns = {col: ColumnSketch.from_dict(sketch) for col, sketch in state["columns"].items()}
+        return profiler
+
+    def result(self) -> Dict[str, Any]:
+        return {col: {"type": self.types.get(col) or ("numeric" if sketch.numeric else "string"), **sketch.result()}
+                for col, sketch in self.columns.items()}
+
+    def profile(self, df: pd.DataFrame, schema: Dict[str, Any]) -> Dict[str, Any]:
+        return DataProfiler(schema, self.top_k).update(df).result()
+
+    def profile_chunks(self, chunks: Iterable[pd.DataFrame], workers: int = 1) -> Dict[str, Any]:
+        """One streaming pass over ``chunks``; with ``workers`` > 1 chunks are
+        sketched in worker processes (at most 2 per worker in flight) and merged."""
+        if workers <= 1:
+            for chunk in chunks:
+                self.update(chunk)
+            return self.result()
+        with process_pool(workers) as pool:
+            pending = []
+            for chunk in chunks:
+                pending.append(pool.submit(_sketch_chunk, (DataProfiler(self.schema, self.top_k), chunk)))
+                if len(pending) >= 2 * workers:
+                    self.merge(pending.pop(0).result())
+            for future in pending:
+                self.merge(future.result())
+        return self.result()
+
+    def profile_csv(self, path: str, chunksize: int = 100_000, workers: int = 1,
+                    block_bytes: int = 64 * 1024 * 1024) -> Dict[str, Any]:
+        """Profile a CSV in one pass. With ``workers`` > 1 each process parses its
+        own byte range, which assumes no quoted field contains a newline."""
+        if workers <= 1:
+            return self.profile_chunks(pd.read_csv(path, dtype=str, chunksize=chunksize))
+        with open(path, "rb") as f:
+            header = f.readline()
+            body_start = f.tell()
+        names = list(pd.read_csv(io.BytesIO(header), dtype=str).columns)
+        size = os.path.getsize(path)
+        step = max(1, -(-(size - body_start) // workers))
+        ranges = [(s, min(s + step, size)) for s in range(body_start, size, step)]
+        with process_pool(workers) as pool:
+            jobs = [(DataProfiler(self.schema, self.top_k), path, names, s, e, block_bytes) for s, e in ranges]
+            for sketch in pool.map(_sketch_byte_range, jobs):
+                self.merge(sketch)
+        return self.result()
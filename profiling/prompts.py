@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+import re
+import pandas as pd
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .llm import LLMResponseError
+from .validation import compile_validator
+
+# Section markers of a compact cleaning reply.
+CLEANED, UNCLEANED = "CLEANED", "UNCLEANED"
+
+COMPACT_SYSTEM = (
+    "You are a data cleaning expert. Enforce the given DOMD rules exactly (length, padding, type, allowed "
+    "values, required/nullable) without any field-specific logic of your own. Output only the requested CSV "
+    "sections, with no extra text."
+)
+
+COMPACT_TASK = (
+    f"Task: Clean the rows above. Fix values that break a rule (e.g. pad to the required length with leading "
+    f"zeros); keep columns without a rule unchanged. Rows that cannot be fixed are uncleaned. Reply with a line "
+    f"{CLEANED}, the cleaned rows as CSV with the same header, a line {UNCLEANED}, then the uncleaned rows as "
+    f"CSV with the same header. No row under {CLEANED} may break a rule."
+)
+
+
+def encode_rows(df: pd.DataFrame) -> str:
+    """Rows as a CSV block: the header once, empty fields for nulls."""
+    return df.to_csv(index=False, lineterminator="\n")
+
+
+def csv_row_token_sizes(df: pd.DataFrame) -> List[int]:
+    """Estimated tokens each row adds to an ``encode_rows`` block (~4 characters per token)."""
+    if len(df) == 0:
+        return []
+    return [len(line) // 4 + 1 for line in encode_rows(df).splitlines()[1:]]
+
+
+def failing_columns(df: pd.DataFrame, domd: Dict[str, Any]) -> pd.DataFrame:
+    """Boolean frame (same index as ``df``): which DOMD columns fail the rule-based check in each row."""
+    failing = pd.DataFrame(False, index=df.index, columns=[c["name"] for c in domd["columns"]])
+    for column, _, failed in compile_validator(domd).failures(df):
+        failing[column] |= failed
+    return failing
+
+
+def relevant_domd(domd: Dict[str, Any], columns: Sequence[str]) -> List[Dict[str, Any]]:
+    """DOMD entries for ``columns`` (all DOMD columns when none are given), without example values."""
+    wanted = set(columns)
+    picked = [c for c in domd["columns"] if not wanted or c["name"] in wanted]
+    return [{k: v for k, v in c.items() if k != "sample"} for c in picked]
+
+
+def compact_clean_messages(batch_df: pd.DataFrame, domd: Dict[str, Any],
+                           columns: Sequence[str] = ()) -> List[Dict[str, str]]:
+    """Cleaning prompt with the rules of ``columns`` only and the rows as one CSV block."""
+    rules = json.dumps(relevant_domd(domd, columns), separators=(",", ":"))
+    input_text = f"DOMD rules: {rules}\nRows:\n```csv\n{encode_rows(batch_df)}```\n{COMPACT_TASK}"
+    return [
+        {"role": "system", "content": COMPACT_SYSTEM},
+        {"role": "user", "content": input_text},
+    ]
+
+
+def _fields(line: str) -> List[str]:
+    return [field.strip() for field in next(csv.reader([line]), [])]
+
+
+def _read_section(text: str, header: str) -> List[Dict[str, Any]]:
+    lines = [line for line in text.strip("\n").splitlines() if line.strip()]
+    if not lines:
+        return []
+    # Echoed header lines (one per repeated section, spaced or quoted as the
+    # model likes) are dropped and ``header`` itself is put in front.
+    names = _fields(header)
+    lines = [header] + [line for line in lines if _fields(line) != names]
+    try:
+        df = pd.read_csv(io.StringIO("\n".join(lines) + "\n"), dtype=str)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        raise LLMResponseError(f"Failed to parse CSV section of cleaning reply: {e}")
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+def parse_compact_response(result: Optional[str], header: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """``(cleaned, uncleaned)`` records from a reply in the ``compact_clean_messages`` format.
+
+    A missing header line in a section is taken to be ``header``.
+    """
+    if not result:
+        raise LLMResponseError("Mistral returned empty response for data cleaning.")
+    text = re.sub(r"```[a-zA-Z]*", "", result)
+    markers = list(re.finditer(rf"^\s*({CLEANED}|{UNCLEANED}):?\s*$", text, re.MULTILINE | re.IGNORECASE))
+    if not markers or markers[0].group(1).upper() != CLEANED:
+        raise LLMResponseError(f"Cleaning reply has no {CLEANED} section. Output was: {result}")
+    sections = {CLEANED: "", UNCLEANED: ""}
+    ends = [m.start() for m in markers[1:]] + [len(text)]
+    for marker, end in zip(markers, ends):
+        sections[marker.group(1).upper()] += text[marker.end():end]
+    return _read_section(sections[CLEANED], header), _read_section(sections[UNCLEANED], header)
+
@@ -0,0 +1,247 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .utils import domd_hash
+from .validation import compile_validator
+
+ROW_ID = "_row_id"
+
+# Child entry point: applies the memory/CPU limits (argv[1:], 0 = none) inside
+# the new interpreter, then runs the script as ``__main__``. Setting them here
+# rather than in a ``preexec_fn`` keeps the fork safe in a threaded parent.
+_BOOTSTRAP = """\
+import runpy, sys
+memory_bytes, cpu_seconds = (int(v) for v in sys.argv[1:3])
+try:
+    import resource
+except ImportError:  # not available on Windows; limits are then skipped
+    resource = None
+if resource is not None and memory_bytes:
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+if resource is not None and cpu_seconds:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+sys.argv = ["cleaning_script.py"]
+runpy.run_path("cleaning_script.py", run_name="__main__")
+"""
+
+
+class ScriptError(Exception):
+    """A generated cleaning script failed, timed out or produced unusable output."""
+
+
+class ScriptRegistry:
+    """Versioned store of generated cleaning scripts, one directory per DOMD hash.
+
+    ``<root>/<domd hash>/v001.py`` holds the code and ``index.json`` records
+    each version's validation status, so a schema seen before reuses its
+    latest validated script instead of asking the LLM again.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, domd: Dict[str, Any]) -> str:
+        return os.path.join(self.root, domd_hash(domd))
+
+    def _index(self, domd: Dict[str, Any]) -> Dict[str, Any]:
+        path = os.path.join(self._dir(domd), "index.json")
+        if not os.path.exists(path):
+            return {"versions": []}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_index(self, domd: Dict[str, Any], index: Dict[str, Any]) -> None:
+        path = os.path.join(self._dir(domd), "index.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def versions(self, domd: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._index(domd)["versions"]
+
+    def code(self, domd: Dict[str, Any], version: int) -> str:
+        with open(os.path.join(self._dir(domd), f"v{version:03d}.py")) as f:
+            return f.read()
+
+    def latest(self, domd: Dict[str, Any]) -> Optional[Tuple[int, str]]:
+        """``(version, code)`` of the newest validated script, if any."""
+        for entry in reversed(self.versions(domd)):
+            if entry["status"] == "validated":
+                return entry["version"], self.code(domd, entry["version"])
+        return None
+
+    def rejected(self, domd: Dict[str, Any], code: str) -> Optional[int]:
+        """Version number of a rejected script with exactly this code, if any."""
+        for entry in self.versions(domd):
+            if entry["status"] == "rejected" and self.code(domd, entry["version"]) == code:
+                return entry["version"]
+        return None
+
+    def add(self, domd: Dict[str, Any], code: str) -> int:
+        os.makedirs(self._dir(domd), exist_ok=True)
+        index = self._index(domd)
+        version = len(index["versions"]) + 1
+        with open(os.path.join(self._dir(domd), f"v{version:03d}.py"), "w") as f:
+            f.write(code)
+        index["versions"].append({"version": version, "created": time.time(), "status": "pending", "checks": {}})
+        self._save_index(domd, index)
+        return version
+
+    def mark(self, domd: Dict[str, Any], version: int, status: str, checks: Dict[str, Any]) -> None:
+        index = self._index(domd)
+        for entry in index["versions"]:
+            if entry["version"] == version:
+                entry.update({"status": status, "checks": checks})
+        self._save_index(domd, index)
+
+
+class ScriptRunner:
+    """Runs a registry script over a DataFrame in subprocesses.
+
+    Each partition is written to ``input.csv`` (plus a ``_row_id`` column) in
+    its own temporary directory and the script runs there with ``python -I``,
+    a scrubbed environment (no API keys), memory/CPU rlimits and a wall-clock
+    timeout; ``clean_data.csv`` is read back as text. Up to ``workers``
+    partitions run at once.
+
+    This is not a sandbox: the script runs as the app's user, with the app's
+    filesystem and network access. Only run scripts from a registry you trust.
+    """
+
+    def __init__(self, registry: ScriptRegistry, timeout_s: float = 120, workers: int = 0,
+                 partition_rows: int = 100_000, memory_mb: Optional[int] = 2048,
+                 sample_rows: int = 1000, min_valid_fraction: float = 0.99):
+        self.registry = registry
+        self.timeout_s = timeout_s
+        self.workers = workers or os.cpu_count() or 1
+        self.partition_rows = partition_rows
+        self.memory_mb = memory_mb
+        self.sample_rows = sample_rows
+        self.min_valid_fraction = min_valid_fraction
+
+    def run_partition(self, code: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Script output for ``df``, with ``_row_id`` mapping rows back to ``df``'s positions."""
+        with tempfile.TemporaryDirectory(prefix="cleaning_script_") as tmp:
+            with open(os.path.join(tmp, "cleaning_script.py"), "w") as f:
+                f.write(code)
+            df.assign(**{ROW_ID: np.arange(len(df))}).to_csv(os.path.join(tmp, "input.csv"), index=False)
+            env = {"PATH": os.environ.get("PATH", ""), "HOME": tmp, "TMPDIR": tmp, "LANG": "C.UTF-8"}
+            limits = [int(self.memory_mb or 0) * 1024 * 1024, int(self.timeout_s) + 1 if self.timeout_s else 0]
+            try:
+                proc = subprocess.run(
+                    [sys.executable, "-I", "-c", _BOOTSTRAP, *map(str, limits)], cwd=tmp, env=env,
+                    stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=self.timeout_s,
+                    start_new_session=True,
+                )
+            except subprocess.TimeoutExpired:
+                raise ScriptError(f"Cleaning script timed out after {self.timeout_s}s")
+            if proc.returncode != 0:
+                raise ScriptError(f"Cleaning script exited with {proc.returncode}: {proc.stderr.strip()[-2000:]}")
+            out_path = os.path.join(tmp, "clean_data.csv")
+            if not os.path.exists(out_path):
+                raise ScriptError("Cleaning script did not write clean_data.csv")
+            try:
+                out = pd.read_csv(out_path, dtype=str)
+            except pd.errors.EmptyDataError:
+                out = pd.DataFrame(columns=list(df.columns) + [ROW_ID])
+        if ROW_ID in out.columns:
+            ids = pd.to_numeric(out[ROW_ID], errors="coerce")
+            if ids.isna().any() or not ids.between(0, len(df) - 1).all() or ids.duplicated().any():
+                raise ScriptError(f"Cleaning script corrupted the {ROW_ID} column")
+            return out.assign(**{ROW_ID: ids.astype(int)})
+        if len(out) != len(df):
+            raise ScriptError(f"Cleaning script dropped {ROW_ID} and changed the row count; rows cannot be matched")
+        return out.assign(**{ROW_ID: np.arange(len(df))})
+
+    def check(self, code: str, df: pd.DataFrame, domd: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate the script on a random sample of ``df``.
+
+        It passes when every DOMD column is present, at least
+        ``min_valid_fraction`` of its output rows satisfy the rule-based DOMD
+        check and no sample row that already satisfied the DOMD was dropped.
+        """
+        sample = df.sample(n=min(self.sample_rows, len(df)), random_state=0).reset_index(drop=True)
+        checks: Dict[str, Any] = {"sample_rows": len(sample)}
+        start = time.perf_counter()
+        try:
+            out = self.run_partition(code, sample)
+        except ScriptError as e:
+            return {**checks, "passed": False, "error": str(e)}
+        checks["seconds"] = round(time.perf_counter() - start, 3)
+        names = [c["name"] for c in domd["columns"]]
+        missing = [n for n in names if n not in out.columns]
+        if missing:
+            return {**checks, "passed": False, "error": f"Output is missing DOMD columns {missing}"}
+        validator = compile_validator(domd)
+        valid_fraction = float(validator.valid_rows(out[names]).mean()) if len(out) else 1.0
+        already_valid = set(np.flatnonzero(validator.valid_rows(sample).to_numpy()))
+        lost = len(already_valid - set(out[ROW_ID]))
+        checks.update({"output_rows": len(out), "valid_fraction": valid_fraction, "valid_rows_dropped": lost})
+        checks["passed"] = valid_fraction >= self.min_valid_fraction and lost == 0
+        return checks
+
+    def resolve(self, df: pd.DataFrame, domd: Dict[str, Any],
+                generate: Callable[[], str]) -> Tuple[Optional[int], Optional[str], Dict[str, Any]]:
+        """Find or create a script for ``domd`` that passes ``check`` on ``df``.
+
+        The latest validated version is rechecked on this data; without one,
+        ``generate`` is called once and the result is stored as a new version,
+        unless it repeats a rejected version's code. Returns
+        ``(None, None, checks)`` when no usable script exists.
+        """
+        latest = self.registry.latest(domd)
+        if latest:
+            version, code = latest
+            checks = self.check(code, df, domd)
+            if checks["passed"]:
+                return version, code, checks
+        code = generate()
+        rejected = self.registry.rejected(domd, code)
+        if rejected is not None:
+            return None, None, {"passed": False, "error": f"Generated script repeats rejected version {rejected}"}
+        version = self.registry.add(domd, code)
+        checks = self.check(code, df, domd)
+        self.registry.mark(domd, version, "validated" if checks["passed"] else "rejected", checks)
+        return (version, code, checks) if checks["passed"] else (None, None, checks)
+
+    def run(self, code: str, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Clean ``df`` partition by partition.
+
+        Returns ``(cleaned, dropped, failed)``: script output, input rows the
+        script discarded, and input rows of partitions that errored or timed
+        out (for the caller's fallback path). Each carries ``_row_id``, the
+        row's position in ``df``.
+        """
+        df = df.reset_index(drop=True)
+        bounds = [(s, min(s + self.partition_rows, len(df))) for s in range(0, len(df), self.partition_rows)]
+
+        def run_one(bound):
+            start, end = bound
+            try:
+                return self.run_partition(code, df.iloc[start:end]), None
+            except ScriptError as e:
+                return None, str(e)
+
+        cleaned, dropped, failed = [], [], []
+        with ThreadPoolExecutor(max_workers=min(self.workers, max(len(bounds), 1))) as pool:
+            for (start, end), (out, error) in zip(bounds, pool.map(run_one, bounds)):
+                if error is not None:
+                    print(f"Cleaning script failed for rows {start}-{end - 1}: {error}")
+                    failed.append(df.iloc[start:end].assign(**{ROW_ID: np.arange(start, end)}))
+                    continue
+                keep = np.zeros(end - start, dtype=bool)
+                keep[out[ROW_ID].to_numpy()] = True
+                cleaned.append(out.assign(**{ROW_ID: out[ROW_ID] + start}))
+                dropped.append(df.iloc[start:end].assign(**{ROW_ID: np.arange(start, end)})[~keep])
+
+        def concat(parts):
+            parts = [p for p in parts if not p.empty]
+            return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        return concat(cleaned), concat(dropped), concat(failed)
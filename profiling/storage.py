@@ -0,0 +1,164 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+from typing import List, Optional, Sequence
+
+ROW_GROUP_ROWS = 64_000
+# pandas.read_csv's default NA markers, so Arrow-parsed input matches the pandas path.
+NA_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+             "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]
+
+
+def text_table(df: pd.DataFrame, columns: Optional[Sequence[str]] = None) -> pa.Table:
+    """Arrow table with every column as nullable text.
+
+    Outputs mix LLM-returned JSON values with raw strings; storing their text
+    form (as CSV would) keeps one schema across chunks and runs.
+    """
+    columns = list(columns) if columns is not None else [str(c) for c in df.columns]
+    arrays = []
+    for name in columns:
+        if name not in df.columns:
+            arrays.append(pa.nulls(len(df), pa.string()))
+            continue
+        s = df[name]
+        arrays.append(pa.array(s.astype(str).astype(object).where(s.notna(), None), type=pa.string(), from_pandas=True))
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def write_parquet(df: pd.DataFrame, path: str, columns: Optional[Sequence[str]] = None) -> None:
+    pq.write_table(text_table(df, columns), path, row_group_size=ROW_GROUP_ROWS)
+
+
+def merge_parquet(parts: List[str], path: str) -> None:
+    """Concatenate part files into one Parquet file, one row group at a time."""
+    writer = None
+    try:
+        for part in parts:
+            source = pq.ParquetFile(part)
+            if writer is None:
+                writer = pq.ParquetWriter(path, source.schema_arrow)
+            for i in range(source.num_row_groups):
+                writer.write_table(source.read_row_group(i))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def csv_to_ipc(csv_path: str, ipc_path: str, block_bytes: int = 16 * 1024 * 1024) -> str:
+    """Convert a CSV to an Arrow IPC file of text columns in bounded memory.
+
+    The source size and mtime are stored in the schema metadata, so an
+    existing IPC file for the same source is reused instead of re-parsed.
+    """
+    stat = os.stat(csv_path)
+    source = {b"source_size": str(stat.st_size).encode(), b"source_mtime": repr(stat.st_mtime).encode()}
+    if os.path.exists(ipc_path):
+        try:
+            with pa.memory_map(ipc_path) as f:
+                metadata = pa.ipc.open_file(f).schema.metadata or {}
+            if all(metadata.get(k) == v for k, v in source.items()):
+                return ipc_path
+        except pa.ArrowInvalid:
+            pass
+    names = pd.read_csv(csv_path, nrows=0).columns
+    reader = pv.open_csv(
+        csv_path,
+        read_options=pv.ReadOptions(block_size=block_bytes),
+        convert_options=pv.ConvertOptions(column_types={name: pa.string() for name in names}, null_values=NA_VALUES,
+                                            strings_can_be_null=True),
+    )
+    schema = reader.schema.with_metadata(source)
+    with pa.OSFile(f"{ipc_path}.tmp", "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    os.replace(f"{ipc_path}.tmp", ipc_path)
+    return ipc_path
+
+
+def read_table(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read an Arrow IPC (memory-mapped), Parquet or CSV file as text columns."""
+    if path.endswith(".arrow"):
+        with pa.memory_map(path) as f:
+            table = pa.ipc.open_file(f).read_all()
+            return (table.select(list(columns)) if columns else table).to_pandas()
+    if path.endswith(".parquet"):
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return pd.read_csv(path, dtype=str, usecols=columns)
+
+
+class TablePager:
+    """Server-side slices of an output file, with column projection.
+
+    Parquet pages only read the row groups overlapping the requested range;
+    Arrow IPC pages slice record batches of a memory map; CSV pages skip rows
+    while parsing. Nothing outside the page is materialized. Use it as a
+    context manager (or call ``close``) to release the open file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._source = None
+        if path.endswith(".parquet"):
+            self._parquet = pq.ParquetFile(path, memory_map=True)
+            meta = self._parquet.metadata
+            self.columns = self._parquet.schema_arrow.names
+            self.num_rows = meta.num_rows
+            self._group_starts = [0]
+            for i in range(meta.num_row_groups):
+                self._group_starts.append(self._group_starts[-1] + meta.row_group(i).num_rows)
+        elif path.endswith(".arrow"):
+            self._source = pa.memory_map(path)
+            self._ipc = pa.ipc.open_file(self._source)
+            self.columns = self._ipc.schema.names
+            self.num_rows = sum(self._ipc.get_batch(i).num_rows for i in range(self._ipc.num_record_batches))
+        else:
+            try:
+                self.columns = list(pd.read_csv(path, nrows=0).columns)
+            except pd.errors.EmptyDataError:  # an empty frame's CSV has no header
+                self.columns, self.num_rows = [], 0
+                return
+            with open(path, "rb") as f:
+                # Line count, less the header; assumes no quoted newlines.
+                self.num_rows = max(sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")) - 1, 0)
+
+    def page(self, start: int, stop: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        start, stop = max(start, 0), min(stop, self.num_rows)
+        columns = list(columns) if columns else list(self.columns)
+        if stop <= start:
+            return pd.DataFrame(columns=columns)
+        if self.path.endswith(".parquet"):
+            groups = [i for i in range(len(self._group_starts) - 1)
+                      if self._group_starts[i] < stop and self._group_starts[i + 1] > start]
+            table = self._parquet.read_row_groups(groups, columns=columns)
+            offset = start - self._group_starts[groups[0]]
+            df = table.slice(offset, stop - start).to_pandas()
+        elif self.path.endswith(".arrow"):
+            parts, seen = [], 0
+            for i in range(self._ipc.num_record_batches):
+                batch = self._ipc.get_batch(i)
+                lo, hi = max(start - seen, 0), min(stop - seen, batch.num_rows)
+                if hi > lo:
+                    parts.append(batch.select(columns).slice(lo, hi - lo))
+                seen += batch.num_rows
+                if seen >= stop:
+                    break
+            df = pa.Table.from_batches(parts).to_pandas()
+        else:
+            df = pd.read_csv(self.path, dtype=str, usecols=columns, skiprows=range(1, start + 1), nrows=stop - start)
+        df.index = range(start, start + len(df))
+        return df
+
+    def close(self) -> None:
+        if self.path.endswith(".parquet"):
+            self._parquet.close()
+        if self._source is not None:
+            self._source.close()
+
+    def __enter__(self) -> "TablePager":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
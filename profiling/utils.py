@@ -1,5 +1,8 @@
+import hashlib
 import json
-from typing import Any, Dict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
 
 def load_json(path: str) -> Dict[str, Any]:
     with open(path, "r") as f:
@@ -7,4 +10,22 @@ def load_json(path: str) -> Dict[str, Any]:
 
 def save_json(data: Dict[str, Any], path: str) -> None:
     with open(path, "w") as f:
-        json.dump(data, f, indent=2)
\ No newline at end of file
+        json.dump(data, f, indent=2)
+
+def domd_hash(domd: Dict[str, Any]) -> str:
+    """Stable content hash of a DOMD, used to key per-schema artifacts."""
+    return hashlib.sha256(json.dumps(domd, sort_keys=True).encode("utf-8")).hexdigest()
+
+def primary_key_columns(domd: Dict[str, Any]) -> List[str]:
+    """Primary-key columns: those flagged ``primary_key`` in the DOMD, else the
+    top-level ``primary_key`` (a column name or list of names)."""
+    flagged = [c["name"] for c in domd.get("columns", []) if c.get("primary_key")]
+    if flagged:
+        return flagged
+    top = domd.get("primary_key") or []
+    return [top] if isinstance(top, str) else list(top)
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool whose workers are spawned rather than forked, so they never
+    inherit locks held by the parent's LLM or job threads."""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
@@ -0,0 +1,124 @@
+import re
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .constraints import currency_code, is_currency_column
+
+Check = Callable[[pd.Series], pd.Series]
+
+
+def _as_text(s: pd.Series) -> pd.Series:
+    """String form of values; integral floats (ints upcast by NaNs) lose the ``.0``."""
+    text = s.astype(str)
+    if pd.api.types.is_float_dtype(s):
+        integral = np.isfinite(s) & (s % 1 == 0) & (s.abs() < 2 ** 63)
+        text[integral] = s[integral].astype("int64").astype(str)
+    return text
+
+
+def _per_unique(s: pd.Series, check: Check) -> np.ndarray:
+    """Evaluate ``check`` once per distinct non-null value (as str); nulls pass."""
+    ok = np.ones(len(s), dtype=bool)
+    notnull = s.notnull().to_numpy()
+    if notnull.any():
+        codes, uniques = pd.factorize(_as_text(s[notnull]))
+        passed = check(pd.Series(np.asarray(uniques, dtype=object), dtype=object))
+        ok[notnull] = passed.to_numpy(dtype=bool)[codes]
+    return ok
+
+
+def _date_check(col: Dict[str, Any]) -> Check:
+    fmt = "%Y%m%d" if "yyyy-mm-dd" not in col.get("constraints", "").lower() else "%Y-%m-%d"
+    shape = r"[0-9]{8}" if fmt == "%Y%m%d" else r"[0-9]{4}-[0-9]{2}-[0-9]{2}"
+
+    def check(u):
+        ok = u.str.fullmatch(shape).astype(bool)
+        parsed = pd.to_datetime(u.where(ok), format=fmt, errors="coerce")
+        return ok & parsed.notna() & (parsed <= pd.Timestamp(datetime.now().date()))
+    return check
+
+
+def _scale(length: Any) -> Optional[Tuple[int, int]]:
+    """Parse a decimal ``"precision,scale"`` length such as ``"5,2"``."""
+    m = re.fullmatch(r"\s*(\d+)\s*,\s*(\d+)\s*", str(length)) if isinstance(length, str) else None
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+def _type_checks(col: Dict[str, Any]) -> List[Tuple[str, Check]]:
+    t, length = col.get("type", "string"), col.get("length")
+    int_length = length if isinstance(length, int) and not isinstance(length, bool) and length > 0 else None
+    checks: List[Tuple[str, Check]] = []
+    if t == "date":
+        checks.append(("date_format", _date_check(col)))
+    elif t == "integer":
+        checks.append(("type", lambda u: u.str.fullmatch(r"[0-9]+").astype(bool)))
+        if int_length:
+            checks.append(("length", lambda u: u.str.len() <= int_length))
+    elif t == "float":
+        checks.append(("type", lambda u: u.str.fullmatch(r"-?[0-9]+(\.[0-9]+)?").astype(bool)))
+        scale = _scale(length)
+        if scale:
+            precision, decimals = scale
+            parts = r"-?([0-9]+)(?:\.([0-9]+))?"
+
+            def digits_fit(u):
+                m = u.str.extract(parts)
+                whole = m[0].str.lstrip("0").str.len().fillna(0)
+                frac = m[1].str.len().fillna(0)
+                return (whole <= precision - decimals) & (frac <= decimals)
+            checks.append(("precision", digits_fit))
+    elif int_length:
+        checks.append(("length", lambda u: u.str.len() == int_length))
+    if t == "string" and "digit" in col.get("constraints", "").lower():
+        checks.append(("format", lambda u: u.str.fullmatch(r"[0-9]+").astype(bool)))
+    if is_currency_column(col) and currency_code(col).isalpha():
+        # Enforcement rewrites these to one code, so anything else needs cleaning.
+        code = currency_code(col)
+        checks.append(("allowed", lambda u: u == code))
+    allowed = col.get("allowed")
+    if allowed:
+        allowed_str = [str(a) for a in allowed]
+        checks.append(("allowed", lambda u: u.isin(allowed_str)))
+    return checks
+
+
+class RowValidator:
+    """Rule-based DOMD check that flags rows needing no cleaning at all.
+
+    It is deliberately strict about raw values (exact lengths, formats and
+    allowed values) so that only rows the LLM could not improve skip it.
+    """
+
+    def __init__(self, domd: Dict[str, Any]):
+        self.columns = [
+            (col["name"], col.get("required", False) and not col.get("nullable", True), _type_checks(col))
+            for col in domd["columns"]
+        ]
+
+    def failures(self, df: pd.DataFrame) -> Iterator[Tuple[str, str, np.ndarray]]:
+        """Yield ``(column, anomaly_type, failing-row mask)`` for every check that fails somewhere."""
+        for name, required, checks in self.columns:
+            if name not in df.columns:
+                if required:
+                    yield name, "missing_column", np.ones(len(df), dtype=bool)
+                continue
+            s = df[name]
+            if required:
+                missing = s.isnull().to_numpy()
+                if missing.any():
+                    yield name, "missing", missing
+            for label, check in checks:
+                failed = ~_per_unique(s, check)
+                if failed.any():
+                    yield name, label, failed
+
+    def valid_rows(self, df: pd.DataFrame) -> pd.Series:
+        ok = np.ones(len(df), dtype=bool)
+        for _, _, failed in self.failures(df):
+            ok &= ~failed
+        return pd.Series(ok, index=df.index)
+
+
+def compile_validator(domd: Dict[str, Any]) -> RowValidator:
+    return RowValidator(domd)
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+import yaml
+
+# Tests import ``profiling`` from the repository root, however pytest is invoked.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def config(tmp_path):
+    """``config/config.yaml`` with every cache, registry and index directory under ``tmp_path``."""
+    with open(os.path.join(ROOT, "config", "config.yaml")) as f:
+        cfg = yaml.safe_load(f)
+    cfg["cache"]["path"] = str(tmp_path / "cache" / "llm_responses.sqlite")
+    cfg["script"]["registry_dir"] = str(tmp_path / "cache" / "scripts")
+    cfg["anomaly"]["model_dir"] = str(tmp_path / "cache" / "models")
+    cfg["incremental"]["index_dir"] = str(tmp_path / "cache" / "incremental")
+    cfg["duplicates"]["spill_dir"] = str(tmp_path / "cache" / "spill")
+    cfg["jobs"]["root"] = str(tmp_path / "jobs")
+    cfg["llm"]["requests_per_minute"] = None
+    return cfg
+
+
+@pytest.fixture
+def stock(tmp_path):
+    """``(domd_path, csv_path)``: 300 synthetic stock rows for ``outputs/domd.json``
+    (primary key date/site/article) with a few rule violations and 4 duplicate keys."""
+    from benchmarks.synthetic import synthetic_frame
+    from profiling.utils import load_json
+
+    domd_path = os.path.join(ROOT, "outputs", "domd.json")
+    df = synthetic_frame(load_json(domd_path), 300, violation_rate=0.05, seed=7)
+    repeats = df.iloc[[3, 3, 120, 250]].copy()
+    repeats.iloc[1, df.columns.get_loc("stock_units")] = "77"  # same key, different values
+    df = pd.concat([df.iloc[:200], repeats, df.iloc[200:]], ignore_index=True)
+    csv_path = str(tmp_path / "input.csv")
+    df.to_csv(csv_path, index=False)
+    return domd_path, csv_path
+
@@ -0,0 +1,51 @@
+"""Chunked anomaly detection: chunk-relative rows map back to the frame, failed chunks are reported."""
+import json
+import re
+
+import pandas as pd
+import pytest
+
+from profiling.cleaning import ScriptGenerator
+from profiling.llm import FakeAPIError, FakeLLMClient
+
+DOMD = {"columns": [{"name": "id", "type": "string"}, {"name": "note", "type": "string"}]}
+ROWS = pd.DataFrame({"id": [f"r{i}" for i in range(200)], "note": ["some text to fill the prompt"] * 200})
+
+
+class AnomalyClient(FakeLLMClient):
+    """Flags the rows whose id is in ``flag`` (by chunk position) and fails chunks holding an id in ``fail``."""
+
+    def __init__(self, flag=(), fail=()):
+        super().__init__()
+        self.flag, self.fail = set(flag), set(fail)
+
+    def respond(self, model, messages):
+        records = json.loads(re.search(r"^Input Data Sample: (.*)$", messages[-1]["content"], re.MULTILINE).group(1))
+        ids = [record["id"] for record in records]
+        if self.fail & set(ids):
+            raise FakeAPIError(400)
+        return json.dumps({"anomalies": [{"row": i, "column": "id", "anomaly_type": "flagged", "details": rid}
+                                         for i, rid in enumerate(ids) if rid in self.flag]})
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_chunk_rows_map_to_frame_positions(concurrency):
+    flag = ["r0", "r37", "r38", "r120", "r199"]
+    client = AnomalyClient(flag=flag)
+    generator = ScriptGenerator(client=client, concurrency=concurrency)
+    anomalies = generator.detect_anomalies_chunked(ROWS, DOMD, max_tokens=600)
+    assert client.calls > 3  # the budget really split the frame
+    assert generator.anomaly_failures == []
+    assert sorted((a["row"], a["details"]) for a in anomalies) == [(int(rid[1:]), rid) for rid in flag]
+    assert all(ROWS["id"][a["row"]] == a["details"] for a in anomalies)
+
+
+def test_failed_chunks_are_reported_with_their_rows():
+    client = AnomalyClient(flag=["r5", "r150"], fail=["r100"])
+    generator = ScriptGenerator(client=client, max_retries=1)
+    anomalies = generator.detect_anomalies_chunked(ROWS, DOMD, max_tokens=600)
+    assert [a["row"] for a in anomalies] == [5, 150]
+    [failure] = generator.anomaly_failures
+    assert failure["start_row"] <= 100 < failure["end_row"]
+    assert failure["end_row"] - failure["start_row"] < len(ROWS)
+    assert "400" in failure["error"]
@@ -0,0 +1,58 @@
+"""Local AnomalyDetector: vectorized DOMD rule checks and per-DOMD persisted IsolationForest models."""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from profiling.anomaly import AnomalyDetector
+from profiling.validation import compile_validator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_outputs():
+    with open(os.path.join(ROOT, "outputs", "domd.json")) as f:
+        domd = json.load(f)
+    return domd, pd.read_csv(os.path.join(ROOT, "outputs", "input.csv"), dtype=str)
+
+
+def test_rule_anomalies_point_at_failing_rows():
+    domd, df = load_outputs()
+    df.loc[4, "stock_units"] = "abc"
+    df.loc[9, "site"] = None
+    anomalies = AnomalyDetector(domd, n_jobs=1).detect_records(df)
+    rule_rows = {a["row"] for a in anomalies if a["anomaly_type"] != "outlier"}
+    assert {4, 9} <= rule_rows
+    assert rule_rows == set(np.flatnonzero(~compile_validator(domd).valid_rows(df).to_numpy()))
+    assert any(a["row"] == 4 and a["column"] == "stock_units" and "'abc'" in a["details"] for a in anomalies)
+    assert [a["row"] for a in anomalies] == sorted(a["row"] for a in anomalies)
+
+
+def test_outlier_is_flagged_and_model_is_reused(tmp_path):
+    domd, df = load_outputs()
+    rng = np.random.default_rng(0)
+    df = pd.concat([df] * 10, ignore_index=True)
+    df["stock_units"] = rng.integers(1, 10, len(df)).astype(str)
+    df.loc[123, ["stock_units", "retail_value", "cost_value"]] = ["9999999", "99999.0", "99999.0"]
+    model_dir = str(tmp_path / "models")
+
+    first = AnomalyDetector(domd, model_dir=model_dir, n_jobs=1)
+    outliers = [a["row"] for a in first.detect_records(df) if a["anomaly_type"] == "outlier"]
+    assert 123 in outliers
+    assert len(os.listdir(model_dir)) == 1
+
+    # A new detector (a later run) loads the saved forest instead of fitting one.
+    second = AnomalyDetector(domd, model_dir=model_dir, n_jobs=1)
+    second.fit = None
+    assert [a["row"] for a in second.detect_records(df) if a["anomaly_type"] == "outlier"] == outliers
+
+
+def test_models_are_kept_per_domd(tmp_path):
+    domd, df = load_outputs()
+    other = {"columns": [c for c in domd["columns"] if c["name"] != "cost_value"]}
+    detector = AnomalyDetector(model_dir=str(tmp_path), n_jobs=1)
+    detector.fit(df, domd)
+    detector.fit(df, other)
+    assert len(os.listdir(tmp_path)) == 2
+    assert detector.load(domd)["columns"] != detector.load(other)["columns"]
@@ -0,0 +1,40 @@
+"""ResponseCache eviction across instances sharing one file."""
+import os
+
+from profiling.cache import ResponseCache
+
+
+def test_eviction_counts_entries_written_by_other_instances(tmp_path):
+    path = os.path.join(str(tmp_path), "cache.sqlite")
+    first = ResponseCache(path, max_entries=4)
+    second = ResponseCache(path, max_entries=4)
+    for i in range(4):
+        first.put(f"a{i}", "m", "x")
+    for i in range(4):
+        second.put(f"b{i}", "m", "x")
+    count, = first._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+    assert count <= 4
+    assert second.get("b3") == "x"
+    assert first.get("a0") is None
+    assert first.stats["misses"] == 1 and second.stats["hits"] == 1
+    first.close()
+    second.close()
+
+
+def test_eviction_by_size(tmp_path):
+    cache = ResponseCache(os.path.join(str(tmp_path), "cache.sqlite"), max_bytes=250)
+    for i in range(10):
+        cache.put(str(i), "m", "y" * 100)
+    total, = cache._db.execute("SELECT SUM(size) FROM responses").fetchone()
+    assert total <= 250
+    assert cache.get("9") == "y" * 100
+    cache.close()
+
+
+def test_snapshot_counts_lookups(tmp_path):
+    cache = ResponseCache(os.path.join(str(tmp_path), "cache.sqlite"))
+    cache.put("k", "m", "v")
+    cache.get("k")
+    cache.get("missing")
+    assert cache.snapshot() == {"hits": 1, "misses": 1, "writes": 1, "evictions": 0}
+    cache.close()
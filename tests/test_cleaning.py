@@ -0,0 +1,83 @@
+"""clean_data routing: rows that already satisfy the DOMD never reach the LLM."""
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from profiling.cleaning import TAG_SEP, ScriptGenerator
+from profiling.llm import FakeLLMClient
+from profiling.validation import compile_validator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class RecordingClient(FakeLLMClient):
+    """FakeLLMClient that keeps every prompt it answered."""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def respond(self, model, messages):
+        self.prompts.append(messages[-1]["content"])
+        return super().respond(model, messages)
+
+
+@pytest.fixture
+def sample():
+    with open(os.path.join(ROOT, "sample_data", "domd.json")) as f:
+        domd = json.load(f)
+    return domd, pd.read_csv(os.path.join(ROOT, "sample_data", "input.csv"), dtype=str)
+
+
+def by_id(df):
+    return df.astype(str).sort_values("id").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("prompt_format", ["json", "compact"])
+def test_prevalidated_rows_skip_the_llm(sample, prompt_format):
+    domd, df = sample
+    failing = df[~compile_validator(domd).valid_rows(df)]
+    client = RecordingClient()
+    generator = ScriptGenerator(client=client, prompt_format=prompt_format)
+    clean_df, unclean_df = generator.clean_data(df, domd, batch_size=5, prevalidate=True)
+
+    stats = generator.routing_stats
+    assert (stats["rows_in"], stats["skipped_llm"], stats["sent_to_llm"]) == (len(df), len(df) - len(failing), len(failing))
+    assert len(client.prompts) == stats["llm_requests"] == 1
+    assert "David" in client.prompts[0] and "Alice" not in client.prompts[0]
+
+    # Same outputs as sending every row (the fake client echoes rows back as cleaned).
+    full_clean, full_unclean = ScriptGenerator(client=FakeLLMClient(), prompt_format=prompt_format).clean_data(df, domd)
+    pd.testing.assert_frame_equal(by_id(clean_df), by_id(full_clean))
+    assert len(unclean_df) == len(full_unclean)
+
+
+def test_all_valid_input_makes_no_llm_calls(sample):
+    domd, df = sample
+    valid = df[compile_validator(domd).valid_rows(df)]
+    client = FakeLLMClient()
+    generator = ScriptGenerator(client=client)
+    clean_df, unclean_df = generator.clean_data(valid, domd, prevalidate=True)
+    assert client.calls == 0
+    assert generator.routing_stats["sent_to_llm"] == 0
+    # Prevalidated rows still go through the post-processing enforcement.
+    assert len(clean_df) + len(unclean_df) == len(valid)
+
+
+def test_tags_follow_rows_through_routing(sample):
+    domd, df = sample
+    tagged = df.assign(key=[f"k{i}" for i in range(len(df))])
+    clean_df, unclean_df = ScriptGenerator(client=FakeLLMClient()).clean_data(tagged, domd, batch_size=5,
+                                                                              prevalidate=True, tag="key")
+    # Prevalidated rows keep their own tag; the one-row LLM batch carries the failing row's.
+    assert sorted(pd.concat([clean_df, unclean_df])["key"]) == ["k0", "k1", "k2", "k3", "k4"]
+
+
+def test_llm_batch_outputs_carry_all_batch_tags(sample):
+    domd, df = sample
+    tagged = df.assign(key=[f"k{i}" for i in range(len(df))])
+    clean_df, unclean_df = ScriptGenerator(client=FakeLLMClient()).clean_data(tagged, domd, batch_size=5, tag="key")
+    groups = set(pd.concat([clean_df, unclean_df])["key"])
+    assert groups == {TAG_SEP.join(f"k{i}" for i in range(len(df)))}
@@ -0,0 +1,36 @@
+"""Hash and partitioned duplicate finders agree, including the key-only streaming pre-pass."""
+import pandas as pd
+import pytest
+
+from profiling.duplicates import get_duplicate_finder
+
+DOMD = {"columns": [{"name": "id", "type": "string", "primary_key": True, "length": 4,
+                     "constraints": "pad with leading zeros"},
+                    {"name": "amount", "type": "string"}]}
+ROWS = pd.DataFrame({"id": ["1", "0002", "0001", "3", None, "0003", "2", "1"],
+                     "amount": ["a", "b", "a", "c", "d", "x", "b", "a"]})
+
+
+@pytest.mark.parametrize("strategy", ["hash", "partitioned"])
+def test_finders_find_normalized_key_repeats(strategy, tmp_path):
+    finder = get_duplicate_finder(DOMD, strategy, spill_dir=str(tmp_path))
+    finder.add(ROWS.iloc[:4], 0)
+    finder.add(ROWS.iloc[4:], 4)
+    dups = finder.result()
+    finder.close()
+    assert dups["row"].tolist() == [2, 5, 6, 7]
+    assert dups["first_row"].tolist() == [0, 3, 1, 0]
+    assert dups["conflicting"].tolist() == [False, True, False, False]
+
+
+@pytest.mark.parametrize("strategy", ["hash", "partitioned"])
+def test_keys_only_pass_and_content_hashes(strategy, tmp_path):
+    finder = get_duplicate_finder(DOMD, strategy, keys_only=True, spill_dir=str(tmp_path))
+    finder.add(ROWS[["id"]], 0)
+    dups = finder.result()
+    finder.close()
+    assert dups["row"].tolist() == [2, 5, 6, 7]
+    assert not dups["conflicting"].any()
+    hashes = get_duplicate_finder(DOMD).content_hashes(ROWS)
+    assert 4 not in hashes.index
+    assert [hashes[r] != hashes[f] for r, f in zip(dups["row"], dups["first_row"])] == [False, True, False, False]
@@ -0,0 +1,136 @@
+"""Incremental runs: a re-delivered file rebuilt from the index matches a full run, per feed and DOMD."""
+import json
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from profiling.incremental import IncrementalIndex
+from profiling.llm import FakeAPIError, FakeLLMClient
+from profiling.orchestrator import Orchestrator
+from profiling.utils import load_json
+
+MARKER = "424242"
+
+
+class FailingAnomalyClient(FakeLLMClient):
+    """Fails the anomaly chunk that holds a row with ``MARKER``."""
+
+    def respond(self, model, messages):
+        prompt = messages[-1]["content"]
+        if "'anomalies'" in prompt and MARKER in prompt:
+            raise FakeAPIError(400)
+        return super().respond(model, messages)
+
+
+def run(config, domd_path, csv_path, output_dir, client=None):
+    os.makedirs(output_dir, exist_ok=True)
+    client = client or FakeLLMClient()
+    Orchestrator(config, client=client).run(domd_path, str(csv_path), str(output_dir))
+    return client
+
+
+def read_outputs(output_dir):
+    """Header and sorted rows of each output, and the sorted anomalies.
+
+    A full run writes prevalidated rows before LLM-cleaned ones while the
+    index rebuilds them in file order, so only the contents are compared.
+    """
+    outputs = {}
+    for name in ("clean_data.csv", "unclean_data.csv"):
+        with open(os.path.join(output_dir, name)) as f:
+            header, *rows = f.read().splitlines()
+        outputs[name] = (header, sorted(rows))
+    anomalies = load_json(os.path.join(output_dir, "anomalies.json"))["anomalies"]
+    outputs["anomalies"] = sorted(json.dumps(a, sort_keys=True) for a in anomalies)
+    return outputs
+
+
+def redeliver(csv_path, path):
+    """The stock file with one changed row, one removed row and one new row."""
+    df = pd.read_csv(csv_path, dtype=str)
+    df.loc[260, "stock_units"] = MARKER
+    added = df.iloc[[10]].assign(date="20300101")
+    df = pd.concat([df.drop(index=50), added], ignore_index=True)
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def incremental(config):
+    config["incremental"]["enabled"] = True
+    config["cache"]["enabled"] = False
+    config["output"]["format"] = "csv"
+    config["anomaly"].update(mode="chunked", chunk_tokens=1500)
+    return config
+
+
+def test_incremental_runs_match_full_runs(incremental, stock, tmp_path):
+    domd_path, csv_path = stock
+    second = redeliver(csv_path, tmp_path / "second.csv")
+    full = dict(incremental, incremental={"enabled": False})
+    full_first = run(full, domd_path, csv_path, tmp_path / "full_first")
+    run(full, domd_path, second, tmp_path / "full_second")
+
+    config = dict(incremental, incremental={**incremental["incremental"], "feed": "stock"})
+    first = run(config, domd_path, csv_path, tmp_path / "inc_first")
+    assert read_outputs(tmp_path / "inc_first") == read_outputs(tmp_path / "full_first")
+    assert first.calls == full_first.calls
+
+    rerun = run(config, domd_path, second, tmp_path / "inc_second")
+    assert read_outputs(tmp_path / "inc_second") == read_outputs(tmp_path / "full_second")
+    stats = load_json(tmp_path / "inc_second" / "run_summary.json")["incremental"]
+    assert (stats["new"], stats["changed"], stats["removed"]) == (1, 1, 1)
+    assert stats["reprocessed"] < 20
+    assert 0 < rerun.calls < first.calls
+
+
+def test_failed_chunk_rows_point_at_file_rows(incremental, stock, tmp_path):
+    domd_path, csv_path = stock
+    incremental["incremental"]["feed"] = "stock"
+    run(incremental, domd_path, csv_path, tmp_path / "first")
+    df = pd.read_csv(csv_path, dtype=str)
+    df.loc[260, "stock_units"] = MARKER  # file row 260 is past the duplicates, so both remaps apply
+    second = tmp_path / "second.csv"
+    df.to_csv(second, index=False)
+
+    run(incremental, domd_path, second, tmp_path / "out", client=FailingAnomalyClient())
+    [failure] = load_json(tmp_path / "out" / "run_summary.json")["anomaly_chunk_failures"]
+    assert failure["start_row"] <= 260 < failure["end_row"]
+    assert failure["end_row"] - failure["start_row"] < 20  # the reprocessed rows, not the whole file
+
+
+def test_feeds_keep_separate_indexes(incremental, stock, tmp_path):
+    domd_path, csv_path = stock
+    other = tmp_path / "other.csv"
+    pd.read_csv(csv_path, dtype=str).iloc[:100].to_csv(other, index=False)
+    run(incremental, domd_path, csv_path, tmp_path / "a1")
+    run(incremental, domd_path, other, tmp_path / "b1")
+    run(incremental, domd_path, csv_path, tmp_path / "a2")
+    stats = load_json(tmp_path / "a2" / "run_summary.json")["incremental"]
+    assert (stats["new"], stats["changed"], stats["removed"], stats["reprocessed"]) == (0, 0, 0, 0)
+    domd_dirs = os.listdir(incremental["incremental"]["index_dir"])
+    assert len(domd_dirs) == 1
+    indexes = [n for n in os.listdir(os.path.join(incremental["incremental"]["index_dir"], domd_dirs[0]))
+               if n.endswith(".sqlite")]
+    assert sorted(n.split("-")[0] for n in indexes) == ["input", "other"]
+
+
+def test_overlapping_runs_of_a_feed_wait_for_each_other(tmp_path):
+    pytest.importorskip("fcntl")
+    domd = {"columns": [{"name": "id", "type": "string", "primary_key": True}]}
+    first = IncrementalIndex(str(tmp_path), domd, "feed")
+    opened = threading.Event()
+
+    def second():
+        IncrementalIndex(str(tmp_path), domd, "feed").close()
+        opened.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not opened.wait(0.3)
+    IncrementalIndex(str(tmp_path), domd, "other feed").close()  # other feeds are not blocked
+    first.close()
+    assert opened.wait(10)
+    thread.join()
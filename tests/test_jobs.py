@@ -0,0 +1,127 @@
+"""JobRunner: identical uploads share a job, cancellation, and resuming a cancelled streaming job."""
+import io
+import os
+import threading
+import time
+
+import pytest
+
+from profiling.jobs import JobRunner
+from profiling.llm import FakeLLMClient
+
+
+class GateClient(FakeLLMClient):
+    """Blocks call number ``block_at`` until ``release`` is set."""
+
+    def __init__(self, block_at=1):
+        super().__init__()
+        self.block_at = block_at
+        self.reached = threading.Event()
+        self.release = threading.Event()
+
+    def respond(self, model, messages):
+        if self.calls == self.block_at:
+            self.reached.set()
+            assert self.release.wait(10)
+        return super().respond(model, messages)
+
+
+def uploads(stock):
+    domd_path, csv_path = stock
+    with open(domd_path, "rb") as d, open(csv_path, "rb") as c:
+        return io.BytesIO(d.read()), io.BytesIO(c.read())
+
+
+def wait_for(runner, job_id, states=("done", "failed", "cancelled"), timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = runner.status(job_id)
+        if status and status["state"] in states:
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {runner.status(job_id)}")
+
+
+def read_outputs(job_dir):
+    """Output bytes of a job, without its status and timings."""
+    outputs = {}
+    for name in sorted(os.listdir(job_dir)):
+        if name not in ("status.json", "run_metrics.json"):
+            with open(os.path.join(job_dir, name), "rb") as f:
+                outputs[name] = f.read()
+    return outputs
+
+
+@pytest.fixture
+def streaming(config):
+    config["pipeline"].update(mode="streaming", chunk_rows=40)
+    config["cache"]["enabled"] = False
+    return config
+
+
+def test_identical_uploads_share_one_job(config, stock, tmp_path):
+    clients = []
+    gate = GateClient()
+    runner = JobRunner(config, root=str(tmp_path / "jobs"), client_factory=lambda: clients.append(gate) or gate)
+    try:
+        first = runner.submit(*uploads(stock))
+        assert gate.reached.wait(10)
+        assert runner.submit(*uploads(stock)) == first  # still running: not started twice
+        gate.release.set()
+        assert wait_for(runner, first)["state"] == "done"
+        assert runner.submit(*uploads(stock)) == first  # finished: reused as is
+        assert len(clients) == 1
+
+        domd, csv = uploads(stock)
+        other = runner.submit(domd, io.BytesIO(csv.getvalue() + csv.getvalue().splitlines(True)[1]))
+        assert other != first
+        assert wait_for(runner, other)["state"] == "done"
+        assert [job["job_id"] for job in runner.jobs()] == [other, first]
+    finally:
+        gate.release.set()
+        runner.shutdown()
+
+
+def test_cancel_stops_a_running_job(config, stock, tmp_path):
+    gate = GateClient()
+    runner = JobRunner(config, root=str(tmp_path / "jobs"), client_factory=lambda: gate)
+    try:
+        job_id = runner.submit(*uploads(stock))
+        assert gate.reached.wait(10)
+        assert runner.status(job_id)["state"] == "running"
+        assert runner.cancel(job_id)
+        gate.release.set()
+        status = wait_for(runner, job_id)
+        assert status["state"] == "cancelled" and status["finished"] is not None
+        assert not runner.cancel(job_id)  # no longer active
+        assert not runner.cancel("unknown")
+    finally:
+        gate.release.set()
+        runner.shutdown()
+
+
+def test_cancelled_streaming_job_resumes_to_the_same_outputs(streaming, stock, tmp_path):
+    full_client = FakeLLMClient()
+    full = JobRunner(streaming, root=str(tmp_path / "full"), client_factory=lambda: full_client)
+    full_id = full.submit(*uploads(stock))
+    assert wait_for(full, full_id)["state"] == "done"
+    full.shutdown()
+
+    gate, resumed_client = GateClient(block_at=12), FakeLLMClient()
+    clients = [gate, resumed_client]
+    runner = JobRunner(streaming, root=str(tmp_path / "jobs"), client_factory=lambda: clients.pop(0))
+    try:
+        job_id = runner.submit(*uploads(stock))
+        assert gate.reached.wait(30)
+        runner.cancel(job_id)
+        gate.release.set()
+        assert wait_for(runner, job_id)["state"] == "cancelled"
+        assert os.path.exists(os.path.join(runner.job_dir(job_id), "stream_state.json"))
+
+        assert runner.submit(*uploads(stock)) == job_id  # a cancelled job is run again
+        assert wait_for(runner, job_id)["state"] == "done"
+    finally:
+        gate.release.set()
+        runner.shutdown()
+    assert read_outputs(runner.job_dir(job_id)) == read_outputs(full.job_dir(full_id))
+    assert 0 < resumed_client.calls < full_client.calls  # resumed from the checkpoint, not rerun
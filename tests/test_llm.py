@@ -0,0 +1,80 @@
+"""LLMExecutor retries, rate limiting and ordering against the offline FakeLLMClient."""
+import threading
+import time
+
+import pytest
+
+from profiling.llm import FakeAPIError, FakeLLMClient, LLMExecutor, LLMResponseError, RateLimiter, is_retryable
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def test_is_retryable():
+    assert is_retryable(FakeAPIError(429))
+    assert is_retryable(FakeAPIError(503))
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ConnectionResetError())
+    assert is_retryable(LLMResponseError("bad json"))
+    assert not is_retryable(FakeAPIError(400))
+    assert not is_retryable(FakeAPIError(401))
+    assert not is_retryable(KeyError("choices"))
+    assert not is_retryable(AttributeError("'NoneType' object has no attribute 'content'"))
+
+
+def test_retry_recovers_from_rate_limit_errors():
+    client = FakeLLMClient(failure_rate=0.5, seed=3)
+    executor = LLMExecutor(client, max_retries=20, backoff=0.0)
+    for _ in range(10):
+        assert executor.retry(lambda: executor.complete("m", MESSAGES)) == "```python\nimport pandas as pd\n```"
+    # Every failed call was retried, never given up on.
+    assert client.calls > 10
+
+
+def test_retry_gives_up_after_max_retries():
+    client = FakeLLMClient(failure_rate=1.0)
+    executor = LLMExecutor(client, max_retries=2, backoff=0.0)
+    with pytest.raises(FakeAPIError):
+        executor.retry(lambda: executor.complete("m", MESSAGES))
+    assert client.calls == 3
+
+
+def test_programming_errors_are_not_retried():
+    client = FakeLLMClient()
+    executor = LLMExecutor(client, max_retries=5, backoff=0.0)
+    with pytest.raises(KeyError):
+        executor.retry(lambda: executor.complete("m", MESSAGES, parse=lambda content: {}["missing"]))
+    assert client.calls == 1
+
+
+def test_rate_limiter_paces_requests():
+    limiter = RateLimiter(requests_per_minute=600)  # one request per 0.1s once the burst is spent
+    limiter._requests = 0.0
+    start = time.monotonic()
+    for _ in range(5):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.45
+
+
+def test_rate_limiter_is_shared_between_threads():
+    limiter = RateLimiter(requests_per_minute=1200)
+    limiter._requests = 0.0
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 0.35
+
+
+def test_map_keeps_input_order():
+    client = FakeLLMClient(latency=0.01)
+    executor = LLMExecutor(client, concurrency=8)
+    # Later items finish first, so completion order is the reverse of input order.
+    items = list(range(16))
+    results = executor.map(lambda i: (time.sleep((16 - i) * 0.005), i)[1], items)
+    assert results == items
+    prompts = [[{"role": "user", "content": f"prompt {i}"}] for i in items]
+    echoed = executor.map(lambda messages: executor.complete("m", messages, parse=lambda c: messages[0]["content"]),
+                          prompts)
+    assert echoed == [f"prompt {i}" for i in items]
@@ -0,0 +1,135 @@
+"""Metrics aggregation, Prometheus export, the tracer hook and a run's run_metrics.json."""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from profiling.llm import FakeAPIError, FakeLLMClient, LLMExecutor
+from profiling.metrics import NULL_METRICS, Metrics
+from profiling.orchestrator import Orchestrator
+
+
+class RecordingTracer:
+    def __init__(self):
+        self.spans = []
+        self.open = []
+
+    @contextmanager
+    def __call__(self, name, attributes=None):
+        self.open.append(name)
+        try:
+            yield
+        finally:
+            self.open.remove(name)
+            self.spans.append((name, attributes))
+
+
+def test_stages_counters_and_gauges_accumulate():
+    metrics = Metrics()
+    for _ in range(3):
+        with metrics.stage("clean"):
+            pass
+    with pytest.raises(ValueError):
+        with metrics.stage("detect"):
+            raise ValueError()
+    threads = [threading.Thread(target=lambda: [metrics.incr("rows_in", 2) for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    metrics.set("cache_hits", 5)
+    snap = metrics.snapshot()
+    assert snap["stages"]["clean"]["count"] == 3
+    assert snap["stages"]["detect"]["count"] == 1  # a failing stage is still timed
+    assert snap["counters"] == {"rows_in": 800}
+    assert snap["gauges"] == {"cache_hits": 5}
+    metrics.reset()
+    assert metrics.snapshot()["stages"] == {} and metrics.snapshot()["counters"] == {}
+
+
+def test_llm_calls_are_aggregated_per_model():
+    metrics = Metrics(max_call_records=2)
+    metrics.record_llm_call("small", 0.5, 100, 20)
+    metrics.record_llm_call("small", 1.5, 100, 20, attempt=1)
+    metrics.record_llm_call("small", 0.0, 100, 20, cached=True)
+    metrics.record_llm_call("large", 2.0, 10, 0, error="parse")
+    snap = metrics.snapshot()
+    small, large = snap["llm"]["small"], snap["llm"]["large"]
+    assert (small["calls"], small["cached"], small["retried_calls"], small["prompt_tokens"]) == (3, 1, 1, 300)
+    assert small["latency_mean"] == 1.0  # cached calls are left out of the latencies
+    assert small["latency_max"] == 1.5
+    assert large["errors"] == 1
+    assert len(snap["llm_calls"]) == 2
+
+
+def test_prometheus_text():
+    metrics = Metrics()
+    with metrics.stage("clean"):
+        pass
+    metrics.record_llm_call('model "x"', 0.5, 100, 20)
+    metrics.incr("rows_in", 10)
+    metrics.set("cache_hit_rate", 0.25)
+    metrics.set("backend", "pandas")
+    text = metrics.to_prometheus()
+    assert 'profiling_stage_seconds{stage="clean"}' in text
+    assert 'profiling_llm_calls_total{model="model \\"x\\""} 1' in text
+    assert "profiling_rows_in_total 10" in text
+    assert "profiling_cache_hit_rate 0.25" in text
+    assert "backend" not in text  # non-numeric gauges are JSON only
+
+
+def test_tracer_receives_stage_spans():
+    tracer = RecordingTracer()
+    metrics = Metrics(tracer=tracer)
+    with metrics.stage("run", mode="batch"):
+        with metrics.stage("clean"):
+            assert tracer.open == ["run", "clean"]
+    assert tracer.spans == [("clean", {}), ("run", {"mode": "batch"})]
+
+
+def test_executor_records_calls_and_parse_failures():
+    metrics = Metrics()
+    executor = LLMExecutor(FakeLLMClient(failure_rate=1.0), max_retries=1, backoff=0.0, metrics=metrics)
+    with pytest.raises(FakeAPIError):
+        executor.retry(lambda: executor.complete("m", [{"role": "user", "content": "hi"}]))
+    snap = metrics.snapshot()
+    assert snap["llm"]["m"]["calls"] == 2
+    assert snap["llm"]["m"]["errors"] == 2
+    assert snap["llm"]["m"]["retried_calls"] == 1
+    assert snap["counters"]["llm_retries"] == 1
+
+
+def test_null_metrics_records_nothing(tmp_path):
+    with NULL_METRICS.stage("clean", mode="batch"):
+        NULL_METRICS.incr("rows_in")
+        NULL_METRICS.set("cache_hits", 1)
+        NULL_METRICS.record_llm_call("m", 1.0, 1, 1)
+    NULL_METRICS.save(str(tmp_path))
+    assert not NULL_METRICS.enabled
+    assert os.listdir(tmp_path) == []
+
+
+def test_run_writes_metrics_and_traces_stages(config, stock, tmp_path):
+    config["metrics"].update({"enabled": True, "prometheus": True})
+    tracer = RecordingTracer()
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    Orchestrator(config, client=FakeLLMClient(), tracer=tracer).run(*stock, str(output_dir))
+    with open(output_dir / "run_metrics.json") as f:
+        snap = json.load(f)
+    assert snap["counters"]["rows_in"] == 304
+    assert snap["counters"]["rows_cleaned"] + snap["counters"]["rows_unclean"] <= 304
+    assert snap["llm"] and all(stats["calls"] for stats in snap["llm"].values())
+    assert "run" in snap["stages"]
+    assert set(snap["stages"]) <= {name for name, _ in tracer.spans}
+    assert (output_dir / "run_metrics.prom").exists()
+
+
+def test_disabled_metrics_write_no_file(config, stock, tmp_path):
+    config["metrics"]["enabled"] = False
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    Orchestrator(config, client=FakeLLMClient()).run(*stock, str(output_dir))
+    assert not (output_dir / "run_metrics.json").exists()
@@ -0,0 +1,38 @@
+"""DataProfiler sketch state survives a JSON round trip (the streaming checkpoint)."""
+import json
+import os
+
+import pandas as pd
+
+from profiling.profiler import DataProfiler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_json_state_resumes_like_an_uninterrupted_profile():
+    with open(os.path.join(ROOT, "sample_data", "domd.json")) as f:
+        domd = json.load(f)
+    df = pd.read_csv(os.path.join(ROOT, "sample_data", "input.csv"), dtype=str)
+    half = len(df) // 2
+    whole = DataProfiler(domd).update(df.iloc[:half]).update(df.iloc[half:])
+
+    state = json.loads(json.dumps(DataProfiler(domd).update(df.iloc[:half]).to_dict(), allow_nan=False))
+    resumed = DataProfiler.from_dict(state, domd).update(df.iloc[half:])
+    assert resumed.result() == whole.result()
+
+
+def test_empty_sketches_round_trip():
+    profiler = DataProfiler({"columns": [{"name": "amount", "type": "float"}]})
+    profiler.update(pd.DataFrame({"amount": [None, None]}, dtype=object))
+    state = json.loads(json.dumps(profiler.to_dict(), allow_nan=False))
+    assert DataProfiler.from_dict(state, profiler.schema).result() == profiler.result()
+
+
+def test_worker_processes_match_a_serial_profile():
+    with open(os.path.join(ROOT, "sample_data", "domd.json")) as f:
+        domd = json.load(f)
+    path = os.path.join(ROOT, "sample_data", "input.csv")
+    serial = DataProfiler(domd).profile_csv(path)
+    assert DataProfiler(domd).profile_csv(path, workers=2) == serial
+    chunks = pd.read_csv(path, dtype=str, chunksize=50)
+    assert DataProfiler(domd).profile_chunks(chunks, workers=2) == serial
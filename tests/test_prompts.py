@@ -0,0 +1,47 @@
+"""Compact cleaning replies: CSV sections, with JSON answers tolerated."""
+import json
+
+import pandas as pd
+import pytest
+
+from profiling.cleaning import ScriptGenerator
+from profiling.llm import FakeLLMClient, LLMResponseError
+from profiling.prompts import parse_compact_response
+
+DOMD = {"columns": [{"name": "id", "type": "string", "length": 3}, {"name": "name", "type": "string"}]}
+BATCH = pd.DataFrame({"id": ["1", "002"], "name": ["a", None]})
+
+
+@pytest.fixture
+def parse():
+    generator = ScriptGenerator(client=FakeLLMClient(), prompt_format="compact")
+    return generator._clean_request(BATCH, DOMD)[1]
+
+
+def test_compact_reply(parse):
+    cleaned, uncleaned = parse("CLEANED\nid,name\n001,a\nUNCLEANED\nid,name\n002,\n")
+    assert cleaned == [{"id": "001", "name": "a"}]
+    assert uncleaned == [{"id": "002", "name": None}]
+
+
+def test_compact_reply_without_headers_or_uncleaned_rows():
+    assert parse_compact_response("```\nCLEANED\n001,a\n```", "id,name") == ([{"id": "001", "name": "a"}], [])
+
+
+@pytest.mark.parametrize("echo", ["id, name", " id ,name ", '"id","name"'])
+def test_echoed_headers_are_not_read_as_rows(echo):
+    reply = f"CLEANED\n{echo}\n001,a\n{echo}\n003,c\nUNCLEANED\n{echo}\n002,\n"
+    assert parse_compact_response(reply, "id,name") == (
+        [{"id": "001", "name": "a"}, {"id": "003", "name": "c"}], [{"id": "002", "name": None}])
+
+
+@pytest.mark.parametrize("wrap", ["{}", "```json\n{}\n```", "```JSON\n{}\n```", "```\n{}\n```", "  \n{}"])
+def test_json_reply_is_accepted(parse, wrap):
+    reply = wrap.replace("{}", json.dumps({"cleaned": [{"id": "001", "name": "a"}], "uncleaned": []}))
+    assert parse(reply) == ([{"id": "001", "name": "a"}], [])
+
+
+@pytest.mark.parametrize("reply", ["", "[1, 2]", "Sorry, I cannot help with that."])
+def test_unusable_reply_raises_response_error(parse, reply):
+    with pytest.raises(LLMResponseError):
+        parse(reply)
@@ -0,0 +1,65 @@
+"""ScriptRunner subprocess execution: row mapping, the limits set in the child and registry versions."""
+import os
+
+import pandas as pd
+import pytest
+
+from profiling.llm import FakeLLMClient
+from profiling.orchestrator import Orchestrator
+from profiling.scripts import ROW_ID, ScriptError, ScriptRegistry, ScriptRunner
+from profiling.utils import load_json
+
+resource = pytest.importorskip("resource")
+
+COPY = "import pandas as pd\ndf = pd.read_csv('input.csv', dtype=str)\ndf[df.index % 2 == 0].to_csv('clean_data.csv', index=False)\n"
+
+
+@pytest.fixture
+def runner(tmp_path):
+    return ScriptRunner(ScriptRegistry(str(tmp_path / "registry")), timeout_s=10, memory_mb=512)
+
+
+def test_run_partition_maps_rows_back(runner):
+    out = runner.run_partition(COPY, pd.DataFrame({"a": [str(i) for i in range(6)]}))
+    assert out[ROW_ID].tolist() == [0, 2, 4]
+    assert out["a"].tolist() == ["0", "2", "4"]
+
+
+def test_memory_limit_applies_in_the_child(runner):
+    with pytest.raises(ScriptError, match="MemoryError"):
+        runner.run_partition("x = bytearray(1024 * 1024 * 1024)\n", pd.DataFrame({"a": ["1"]}))
+
+
+def test_repeated_rejected_script_is_not_registered_again(runner):
+    domd = {"columns": [{"name": "a", "type": "string"}]}
+    df = pd.DataFrame({"a": ["x", "y"]})
+    broken = "raise SystemExit(3)\n"
+    for _ in range(2):
+        version, code, checks = runner.resolve(df, domd, lambda: broken)
+        assert (version, code, checks["passed"]) == (None, None, False)
+    assert [v["status"] for v in runner.registry.versions(domd)] == ["rejected"]
+    assert "repeats rejected version 1" in checks["error"]
+
+
+class CodestralCounter(FakeLLMClient):
+    def __init__(self):
+        super().__init__()
+        self.script_calls = 0
+
+    def respond(self, model, messages):
+        if model == "codestral-latest":
+            self.script_calls += 1
+        return super().respond(model, messages)
+
+
+def test_compiled_mode_regenerates_past_the_response_cache(config, stock, tmp_path):
+    config["script"]["mode"] = "compiled"
+    client = CodestralCounter()
+    for run in range(3):
+        os.makedirs(tmp_path / f"out{run}")
+        Orchestrator(config, client=client).run(*stock, str(tmp_path / f"out{run}"))
+    # The fake's script never writes clean_data.csv, so each run regenerates and is
+    # rejected; the identical code is recorded once rather than as v001-v003.
+    assert client.script_calls >= 3
+    registry = ScriptRegistry(config["script"]["registry_dir"])
+    assert [v["status"] for v in registry.versions(load_json(stock[0]))] == ["rejected"]
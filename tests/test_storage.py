@@ -0,0 +1,36 @@
+"""Arrow IPC / Parquet / CSV reads and paging release their files."""
+import pandas as pd
+import pytest
+
+from profiling.storage import TablePager, csv_to_ipc, read_table, write_parquet
+
+ROWS = pd.DataFrame({"id": [f"{i:04d}" for i in range(300)], "name": [f"n{i}" for i in range(300)], "note": None})
+
+
+@pytest.fixture(params=["arrow", "parquet", "csv"])
+def table_path(request, tmp_path):
+    csv_path = str(tmp_path / "rows.csv")
+    ROWS.to_csv(csv_path, index=False)
+    if request.param == "csv":
+        return csv_path
+    if request.param == "arrow":
+        return csv_to_ipc(csv_path, str(tmp_path / "rows.arrow"), block_bytes=1024)
+    path = str(tmp_path / "rows.parquet")
+    write_parquet(ROWS, path)
+    return path
+
+
+def test_read_table_projects_columns(table_path):
+    df = read_table(table_path, columns=["id"])
+    assert list(df.columns) == ["id"]
+    assert df["id"].tolist() == ROWS["id"].tolist()
+
+
+def test_pager_pages_and_closes(table_path):
+    with TablePager(table_path) as pager:
+        assert pager.num_rows == 300
+        page = pager.page(250, 320, ["name"])
+    assert page.index.tolist() == list(range(250, 300))
+    assert page["name"].tolist() == ROWS["name"].tolist()[250:]
+    if table_path.endswith(".arrow"):
+        assert pager._source.closed
@@ -0,0 +1,88 @@
+"""Streaming runs: an interrupted run resumes from its checkpoint to the outputs of an uninterrupted one."""
+import os
+import threading
+
+import pytest
+
+from profiling.llm import FakeLLMClient, RunCancelled
+from profiling.orchestrator import Orchestrator
+
+
+class Stop(Exception):
+    pass
+
+
+def stop_after(chunk):
+    def progress(event):
+        if event["chunk"] == chunk:
+            raise Stop()
+    return progress
+
+
+def run(config, stock, output_dir, client=None, **kwargs):
+    os.makedirs(output_dir, exist_ok=True)
+    client = client or FakeLLMClient()
+    Orchestrator(config, client=client, **{"progress": lambda event: None, **kwargs}).run(*stock, str(output_dir))
+    return client
+
+
+def read_outputs(output_dir):
+    """Every output file's bytes; run_metrics.json holds timings and is left out."""
+    outputs = {}
+    for name in sorted(os.listdir(output_dir)):
+        if name != "run_metrics.json":
+            with open(os.path.join(output_dir, name), "rb") as f:
+                outputs[name] = f.read()
+    return outputs
+
+
+@pytest.fixture
+def streaming(config):
+    config["pipeline"].update(mode="streaming", chunk_rows=40)
+    config["cache"]["enabled"] = False
+    return config
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "csv"])
+def test_interrupted_run_resumes_to_the_same_outputs(streaming, stock, tmp_path, fmt):
+    streaming["output"]["format"] = fmt
+    full_client = run(streaming, stock, tmp_path / "full")
+
+    with pytest.raises(Stop):
+        run(streaming, stock, tmp_path / "resumed", progress=stop_after(2))
+    assert os.path.exists(tmp_path / "resumed" / "stream_state.json")
+    if fmt == "csv":
+        # A crash while appending leaves a partial row behind; the resume truncates it.
+        with open(tmp_path / "resumed" / "clean_data.csv", "a") as f:
+            f.write("20250101,0001,partial")
+    resumed_client = run(streaming, stock, tmp_path / "resumed")
+
+    assert read_outputs(tmp_path / "resumed") == read_outputs(tmp_path / "full")
+    assert not os.path.exists(tmp_path / "resumed" / "stream_state.json")
+    assert 0 < resumed_client.calls < full_client.calls
+
+
+def test_cancelled_run_resumes_to_the_same_outputs(streaming, stock, tmp_path):
+    run(streaming, stock, tmp_path / "full")
+    cancel = threading.Event()
+
+    def progress(event):
+        if event["chunk"] == 3:
+            cancel.set()
+    with pytest.raises(RunCancelled):
+        run(streaming, stock, tmp_path / "resumed", progress=progress, cancel=cancel)
+    run(streaming, stock, tmp_path / "resumed")
+    assert read_outputs(tmp_path / "resumed") == read_outputs(tmp_path / "full")
+
+
+def test_changed_input_starts_over(streaming, stock, tmp_path):
+    domd_path, csv_path = stock
+    with pytest.raises(Stop):
+        run(streaming, stock, tmp_path / "out", progress=stop_after(1))
+    with open(csv_path) as f:
+        lines = f.readlines()
+    with open(csv_path, "w") as f:
+        f.writelines(lines[:-20])
+    run(streaming, stock, tmp_path / "out")
+    run(streaming, stock, tmp_path / "fresh")
+    assert read_outputs(tmp_path / "out") == read_outputs(tmp_path / "fresh")